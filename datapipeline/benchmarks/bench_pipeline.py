@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""Benchmark the pipeline scripts offline and compare against a stored baseline.
+
+Each case runs in a fresh subprocess (so peak RSS belongs to that case alone)
+against ``HubStub`` (test/hub_stub.py) serving a synthetic catalog in place of
+the Hub and OpenRouter. Request
+counts are taken on the server side. A case regresses when wall time, peak RSS
+or request count exceeds the baseline by more than its tolerance; any regression
+makes the run exit non-zero.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from functools import partial
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(ROOT / "datapipeline"))
+sys.path.insert(0, str(ROOT / "test"))
+
+from hub_stub import HubStub
+
+BASELINE_FILE = Path(__file__).with_name("pipeline-baseline.json")
+VMS_FILE = ROOT / "datapipeline" / "vms.json"
+CASES = ("stage_candidates", "update_models", "update_models_warm", "generate_golden_dataset")
+DEFAULT_SIZES = (100, 1000)
+# Allowed growth over the baseline, relative and absolute (to absorb noise on tiny runs).
+TOLERANCE = {"wall_s": (0.5, 0.25), "peak_rss_mb": (0.25, 8.0), "requests": (0.05, 2)}
+
+
+def _peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes.
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def run_case(case: str, workdir: Path, workers: int) -> dict:
+    """Run one case in this process; called in the benchmark subprocess."""
+    import generate_golden_dataset
+    import ingest_candidates
+    import update_models
+
+    staging = workdir / "staging_candidates.jsonl"
+    ingest_candidates.STAGING_FILE = update_models.STAGING_FILE = staging
+    update_models.OUTPUT_FILE = workdir / "models.json"
+    generate_golden_dataset.DUMP_DIR = workdir / "vm_skus"
+    generate_golden_dataset.RAW_FILE = workdir / "vms.json"
+    generate_golden_dataset.INTERMEDIATE_FILE = workdir / "parsed_gpus.json"
+    generate_golden_dataset.OUTPUT_FILE = workdir / "azure-gpus.json"
+
+    started = time.perf_counter()
+    if case == "stage_candidates":
+        sources = {
+            **ingest_candidates.SOURCES,
+            "huggingface_hub": partial(ingest_candidates.fetch_huggingface_hub, limit=None),
+            "openrouter_index": partial(ingest_candidates.fetch_openrouter_index, limit=None),
+        }
+        ingest_candidates.stage_candidates(sources, deadline=3600)
+    elif case in ("update_models", "update_models_warm"):
+        # --full: measure deriving the whole catalog, not an incremental run over the change feed.
+        update_models.main(["--workers", str(workers), "--cache-dir", str(workdir / "cache"), "--full"])
+    elif case == "generate_golden_dataset":
+        generate_golden_dataset.main([])
+    else:
+        raise ValueError(f"unknown case {case}")
+    return {"wall_s": time.perf_counter() - started, "peak_rss_mb": _peak_rss_mb()}
+
+
+def _prepare(case: str, services: HubStub, workdir: Path) -> None:
+    """Write the inputs a case reads, independent of the cases run before it."""
+    if case == "update_models":
+        shutil.rmtree(workdir / "cache", ignore_errors=True)
+        with (workdir / "staging_candidates.jsonl").open("w") as fh:
+            for i in range(services.size):
+                model_id = services.model_id(i)
+                fh.write(json.dumps({"model_id": model_id, "provider": model_id.split("/")[0]}) + "\n")
+    elif case == "generate_golden_dataset":
+        raw = json.loads(VMS_FILE.read_text())
+        skus = [{**raw[i % len(raw)], "name": f"{raw[i % len(raw)]['name']}_{i}"} for i in range(services.size)]
+        (workdir / "vms.json").write_text(json.dumps(skus))
+
+
+def _spawn(case: str, services: HubStub, workdir: Path, workers: int) -> dict:
+    env = {**os.environ, "HF_ENDPOINT": services.url, "OPENROUTER_ENDPOINT": services.url, "HF_HUB_DISABLE_TELEMETRY": "1"}
+    command = [sys.executable, __file__, "--child", case, "--workdir", str(workdir), "--workers", str(workers)]
+    services.reset()
+    subprocess.run(command, env=env, check=True)
+    result = json.loads((workdir / "result.json").read_text())
+    result["requests"] = sum(services.requests.values())
+    result["requests_by_kind"] = dict(sorted(services.requests.items()))
+    return result
+
+
+def run_suite(
+    cases: tuple[str, ...],
+    sizes: tuple[int, ...],
+    latency: float,
+    error_rate: float,
+    workers: int,
+    repeat: int = 1,
+) -> dict[str, dict]:
+    """Run every case ``repeat`` times per size, keeping the fastest wall time and highest RSS."""
+    results: dict[str, dict] = {}
+    for size in sizes:
+        with HubStub(catalog=size, latency=latency, error_rate=error_rate) as services, tempfile.TemporaryDirectory() as tmp:
+            workdir = Path(tmp)
+            for _ in range(repeat):
+                for case in cases:
+                    if case == "update_models_warm" and "update_models" not in cases:
+                        # Warm the metadata cache first; that run is not recorded.
+                        _prepare("update_models", services, workdir)
+                        _spawn("update_models", services, workdir, workers)
+                    _prepare(case, services, workdir)
+                    result = _spawn(case, services, workdir, workers)
+                    best = results.setdefault(f"{case}@{size}", result)
+                    best["wall_s"] = min(best["wall_s"], result["wall_s"])
+                    best["peak_rss_mb"] = max(best["peak_rss_mb"], result["peak_rss_mb"])
+    return results
+
+
+def compare(results: dict[str, dict], baseline: dict[str, dict]) -> list[str]:
+    regressions = []
+    for key, result in results.items():
+        expected = baseline.get(key)
+        if expected is None:
+            continue
+        for metric, (relative, absolute) in TOLERANCE.items():
+            limit = expected[metric] * (1 + relative) + absolute
+            if result[metric] > limit:
+                regressions.append(
+                    f"REGRESSION {key} {metric}: {result[metric]:.3f} > {limit:.3f} (baseline {expected[metric]:.3f})"
+                )
+    return regressions
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cases", nargs="+", choices=CASES, default=list(CASES))
+    parser.add_argument("--sizes", nargs="+", type=int, default=list(DEFAULT_SIZES), help="catalog sizes (100 to 50000)")
+    parser.add_argument("--latency", type=float, default=0.002, help="seconds added to every fake response")
+    parser.add_argument("--error-rate", type=float, default=0.01, help="fraction of retryable requests answered 429/503")
+    parser.add_argument("--workers", type=int, default=16, help="update_models --workers")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per case; the fastest wall time counts")
+    parser.add_argument("--baseline", type=Path, default=BASELINE_FILE)
+    parser.add_argument("--update-baseline", action="store_true", help="store this run as the new baseline")
+    parser.add_argument("--child", choices=CASES, help=argparse.SUPPRESS)
+    parser.add_argument("--workdir", type=Path, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        result = run_case(args.child, args.workdir, args.workers)
+        (args.workdir / "result.json").write_text(json.dumps(result))
+        return 0
+
+    settings = {"latency": args.latency, "error_rate": args.error_rate, "workers": args.workers}
+    results = run_suite(
+        tuple(args.cases), tuple(args.sizes), args.latency, args.error_rate, args.workers, args.repeat
+    )
+    print(f"{'case':<36} {'wall s':>8} {'peak MB':>8} {'requests':>9}")
+    for key, r in results.items():
+        print(f"{key:<36} {r['wall_s']:>8.2f} {r['peak_rss_mb']:>8.1f} {r['requests']:>9}")
+
+    stored = json.loads(args.baseline.read_text()) if args.baseline.exists() else {}
+    if args.update_baseline:
+        recorded = {key: {m: round(r[m], 3) for m in TOLERANCE} for key, r in results.items()}
+        merged = {**stored.get("results", {}), **recorded}
+        args.baseline.write_text(json.dumps({"settings": settings, "results": dict(sorted(merged.items()))}, indent=2) + "\n")
+        print(f"Updated {args.baseline}")
+        return 0
+    if not stored:
+        print(f"No baseline at {args.baseline}; run with --update-baseline to create one")
+        return 0
+    if stored.get("settings") != settings:
+        print(f"Baseline was recorded with {stored.get('settings')}, not {settings}; comparison skipped")
+        return 0
+    regressions = compare(results, stored["results"])
+    for line in regressions:
+        print(line, file=sys.stderr)
+    if not regressions:
+        print("No regressions against baseline")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
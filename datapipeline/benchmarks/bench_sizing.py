@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""Measure fit_grid throughput against the scalar estimate_with_sku port."""
+
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import sizing
+
+
+def synthetic_models(count: int, seed: int = 0) -> list[dict]:
+    rng = np.random.default_rng(seed)
+    return [
+        {
+            "model_id": f"synthetic/model-{i}",
+            "params_b": float(rng.choice([1, 3, 7, 8, 13, 32, 70, 123, 405, 685])),
+            "layers": int(rng.integers(16, 128)),
+            "hidden": int(rng.choice([2048, 4096, 5120, 8192, 12288, 16384])),
+        }
+        for i in range(count)
+    ]
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--models", type=int, default=2000, help="synthetic models in the grid")
+    parser.add_argument("--scalar-sample", type=int, default=20, help="models timed with the scalar port")
+    args = parser.parse_args(argv)
+
+    _, skus = sizing.load_inputs()
+    models = synthetic_models(args.models)
+    per_model = len(sizing.PRECISIONS) * len(sizing.CTX_OPTIONS) * len(sizing.BATCH_OPTIONS)
+
+    start = time.perf_counter()
+    sizing.fit_grid(models, skus)
+    vector_time = time.perf_counter() - start
+    vector_rate = len(models) * per_model / vector_time
+
+    sample = models[: args.scalar_sample]
+    start = time.perf_counter()
+    for m in sample:
+        for precision in sizing.PRECISIONS:
+            for ctx in sizing.CTX_OPTIONS:
+                for batch in sizing.BATCH_OPTIONS:
+                    sizing.estimate_with_sku(m["params_b"], m["layers"], m["hidden"], ctx, batch, precision, skus)
+    scalar_rate = len(sample) * per_model / (time.perf_counter() - start)
+
+    print(f"grid: {len(models)} models x {per_model} configs x {len(skus)} SKUs")
+    print(f"vectorized: {vector_rate:,.0f} configs/s ({vector_time:.3f}s)")
+    print(f"scalar:     {scalar_rate:,.0f} configs/s")
+    print(f"speedup:    {vector_rate / scalar_rate:.0f}x")
+
+
+if __name__ == "__main__":
+    main()
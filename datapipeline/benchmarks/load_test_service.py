@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""Load-test the sizing service and report latency percentiles and throughput.
+
+Starts ``sizing_service`` in-process on a free port (or targets ``--url``) and
+drives it from ``--concurrency`` keep-alive connections. Queries cycle through
+``--distinct`` combinations of model x precision x ctx x batch, so a small value
+measures cache hits and a large one mostly misses. ``--batch N`` sends N queries
+per POST instead of one GET each.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import itertools
+import json
+import sys
+import threading
+import time
+from pathlib import Path
+from urllib.parse import urlencode, urlsplit
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from instrumentation import Histogram
+from sizing import BATCH_OPTIONS, CTX_OPTIONS, PRECISIONS, load_inputs
+from sizing_service import SizingService
+
+
+def _queries(distinct: int) -> list[dict]:
+    models, _ = load_inputs()
+    combos = itertools.product(PRECISIONS, CTX_OPTIONS, BATCH_OPTIONS, (m["model_id"] for m in models))
+    return [
+        {"model": model, "precision": p, "ctx": ctx, "batch": batch}
+        for p, ctx, batch, model in itertools.islice(combos, distinct)
+    ]
+
+
+async def _request(reader, writer, host: str, method: str, path: str, body: bytes = b"") -> tuple[int, bytes]:
+    writer.write(
+        f"{method} {path} HTTP/1.1\r\nHost: {host}\r\nContent-Length: {len(body)}\r\n\r\n".encode() + body
+    )
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while (line := await reader.readline()) not in (b"\r\n", b""):
+        name, _, value = line.decode("latin-1").partition(":")
+        if name.lower() == "content-length":
+            length = int(value)
+    return status, await reader.readexactly(length)
+
+
+async def run_load(url: str, queries: list[dict], requests: int, concurrency: int, batch: int) -> dict:
+    parts = urlsplit(url)
+    histogram = Histogram()
+    errors = 0
+    next_query = itertools.cycle(queries).__next__
+    remaining = iter(range(requests))
+
+    async def client() -> None:
+        nonlocal errors
+        reader, writer = await asyncio.open_connection(parts.hostname, parts.port)
+        try:
+            for _ in remaining:
+                if batch > 1:
+                    body = json.dumps({"queries": [next_query() for _ in range(batch)]}).encode()
+                    args = ("POST", "/fit", body)
+                else:
+                    args = ("GET", "/fit?" + urlencode(next_query()))
+                started = time.perf_counter()
+                status, _ = await _request(reader, writer, parts.netloc, *args)
+                histogram.add(time.perf_counter() - started)
+                errors += status != 200
+        finally:
+            writer.close()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    wall = time.perf_counter() - started
+
+    reader, writer = await asyncio.open_connection(parts.hostname, parts.port)
+    _, health = await _request(reader, writer, parts.netloc, "GET", "/health")
+    writer.close()
+    summary = histogram.summary()
+    return {
+        "requests": requests,
+        "queries": requests * batch,
+        "errors": errors,
+        "wall_s": round(wall, 3),
+        "requests_per_s": round(requests / wall, 1),
+        "queries_per_s": round(requests * batch / wall, 1),
+        "p50_ms": round(summary["p50_s"] * 1000, 3),
+        "p99_ms": round(summary["p99_s"] * 1000, 3),
+        "cache": json.loads(health)["cache"],
+    }
+
+
+def _start_local_service() -> str:
+    """Run the service on its own event loop thread so it does not share the client's loop."""
+    ready = threading.Event()
+    address: list[str] = []
+
+    def serve() -> None:
+        async def main() -> None:
+            server = await SizingService().start(port=0)
+            host, port = server.sockets[0].getsockname()[:2]
+            address.append(f"http://{host}:{port}")
+            ready.set()
+            await server.serve_forever()
+
+        asyncio.run(main())
+
+    threading.Thread(target=serve, daemon=True).start()
+    ready.wait()
+    return address[0]
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="running service to test (default: start one in-process)")
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--batch", type=int, default=1, help="queries per request")
+    parser.add_argument("--distinct", type=int, default=1000, help="distinct queries cycled through")
+    args = parser.parse_args(argv)
+
+    url = args.url or _start_local_service()
+    result = asyncio.run(run_load(url, _queries(args.distinct), args.requests, args.concurrency, args.batch))
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""Keyed diff between staging runs, appended to a change feed next to the staging file.
+
+Each ``stage_candidates`` run appends one ``run`` event (with the digest of the
+staging file it wrote) followed by one event per change against the previous
+staging file: ``added``, ``removed``, or ``changed`` with the popularity, license
+or tag differences. Popularity moves of less than ``POPULARITY_CHANGE`` are not
+reported, since download counts drift on every run.
+
+Consumers keep a byte offset into the feed (``update_models.py`` keeps it in its
+cache directory) and read only the events appended since.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+from datetime import UTC, datetime
+from pathlib import Path
+
+POPULARITY_CHANGE = 0.1
+
+
+def change_feed_path(staging: Path) -> Path:
+    """``staging_candidates.jsonl`` -> ``staging_candidates.changes.jsonl``."""
+    return staging.with_name(staging.name.split(".", 1)[0] + ".changes.jsonl")
+
+
+def file_digest(path: Path) -> str:
+    return hashlib.sha256(path.read_bytes()).hexdigest()
+
+
+def _popularity_changed(old: float, new: float) -> bool:
+    return abs(new - old) > POPULARITY_CHANGE * max(abs(old), abs(new))
+
+
+def diff_staging(previous: dict[str, dict], current: list[dict]) -> list[dict]:
+    """Events turning ``previous`` (keyed by model id) into ``current``, in ``current`` order."""
+    remaining = dict(previous)
+    events = []
+    for record in current:
+        model_id = record["model_id"]
+        old = remaining.pop(model_id, None)
+        if old is None:
+            events.append({"op": "added", **record})
+            continue
+        changes: dict[str, object] = {}
+        if _popularity_changed(old.get("popularity_score") or 0.0, record["popularity_score"]):
+            changes["popularity_score"] = [old.get("popularity_score"), record["popularity_score"]]
+        if old.get("license") != record["license"]:
+            changes["license"] = [old.get("license"), record["license"]]
+        old_tags, new_tags = set(old.get("tags") or ()), set(record["tags"])
+        if old_tags != new_tags:
+            changes["tags"] = {"added": sorted(new_tags - old_tags), "removed": sorted(old_tags - new_tags)}
+        if changes:
+            events.append({"op": "changed", "model_id": model_id, "changes": changes})
+    events.extend({"op": "removed", "model_id": model_id} for model_id in remaining)
+    return events
+
+
+def append_run(feed: Path, events: list[dict], staging_digest: str) -> None:
+    """Append one run to ``feed`` in a single write, so readers never see half a run."""
+    run = datetime.now(UTC).isoformat(timespec="seconds")
+    lines = [{"op": "run", "run": run, "staging_sha256": staging_digest, "changes": len(events)}]
+    lines.extend({"run": run, **event} for event in events)
+    with feed.open("a") as fh:
+        fh.write("".join(json.dumps(line) + "\n" for line in lines))
+
+
+def read_feed(feed: Path, offset: int = 0) -> tuple[list[dict], int]:
+    """Events after byte ``offset`` and the offset to resume from (whole lines only)."""
+    if not feed.exists():
+        return [], 0
+    with feed.open("rb") as fh:
+        fh.seek(offset)
+        data = fh.read()
+    complete = data[: data.rfind(b"\n") + 1]
+    events = [json.loads(line) for line in complete.splitlines() if line.strip()]
+    return events, offset + len(complete)
+
+
+def load_cursor(path: Path) -> dict | None:
+    try:
+        cursor = json.loads(path.read_text())
+        int(cursor["offset"])
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+    return cursor
+
+
+def save_cursor(path: Path, offset: int, staging: Path, state: dict | None = None) -> None:
+    """Record ``offset`` with the staging file and consumer ``state`` its rows were derived from."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(json.dumps({"offset": offset, "staging_sha256": file_digest(staging), "state": state or {}}))
+    tmp.replace(path)
+
+
+def changes_since(
+    feed: Path, cursor: Path, staging: Path, state: dict | None = None
+) -> tuple[set[str] | None, int]:
+    """Model ids added or changed since ``cursor``, and the feed offset read up to.
+
+    Returns ``None`` instead of ids when the changes cannot be trusted to be
+    complete: no cursor yet, a cursor saved under a different ``state``, a feed
+    that was truncated or removed, or a staging file that no longer matches the
+    last run in the feed (edited by hand).
+    """
+    saved = load_cursor(cursor)
+    size = feed.stat().st_size if feed.exists() else 0
+    if saved is None or saved.get("state", {}) != (state or {}) or not feed.exists() or saved["offset"] > size:
+        return None, size
+    offset = int(saved["offset"])
+    events, end = read_feed(feed, offset)
+    runs = [e for e in events if e["op"] == "run"]
+    if runs and runs[-1]["staging_sha256"] != file_digest(staging):
+        return None, end
+    if not runs and (end > offset or saved.get("staging_sha256") != file_digest(staging)):
+        return None, end
+    return {e["model_id"] for e in events if e["op"] in ("added", "changed")}, end
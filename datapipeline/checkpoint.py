@@ -0,0 +1,104 @@
+"""Append-only journal of derived rows so an interrupted refresh can resume.
+
+Each writer (the main process or one shard of a process pool) appends to its
+own ``shard-<n>.jsonl`` file; a header line records the options the rows were
+derived with. Every row is flushed as soon as it is derived, so a crash or
+Ctrl-C loses at most the rows still in flight.
+"""
+
+from __future__ import annotations
+
+import json
+import threading
+from pathlib import Path
+from typing import Self
+
+JOURNAL_VERSION = 1
+
+
+class JournalWriter:
+    """Appends ``{"model_id", "input_hash", "row"}`` records to one shard file."""
+
+    def __init__(self, path: Path, options: dict) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        size = path.stat().st_size if path.exists() else 0
+        torn = False
+        if size:
+            with path.open("rb") as fh:
+                fh.seek(size - 1)
+                torn = fh.read(1) != b"\n"
+        self._fh = path.open("a")
+        self._lock = threading.Lock()
+        if not size:
+            self._write({"version": JOURNAL_VERSION, "options": options})
+        elif torn:
+            # A record torn by a crash must not swallow the next one.
+            self._fh.write("\n")
+
+    def _write(self, record: dict) -> None:
+        self._fh.write(json.dumps(record, sort_keys=True) + "\n")
+        self._fh.flush()
+
+    def append(self, model_id: str, input_hash: str, row: dict) -> None:
+        with self._lock:
+            self._write({"model_id": model_id, "input_hash": input_hash, "row": row})
+
+    def close(self) -> None:
+        self._fh.close()
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+class CheckpointJournal:
+    """The set of shard files under ``directory`` for runs with the same ``options``."""
+
+    def __init__(self, directory: Path, options: dict) -> None:
+        self.directory = directory
+        self.options = options
+
+    def _shards(self) -> list[Path]:
+        if not self.directory.exists():
+            return []
+        return sorted(self.directory.glob("shard-*.jsonl"), key=lambda p: int(p.stem.split("-", 1)[1]))
+
+    def load(self, expected: dict[str, str] | None = None) -> dict[str, tuple[str, dict]]:
+        """Return ``model_id -> (input_hash, row)`` from every usable shard.
+
+        Later records win, except that a record matching the ``expected`` input
+        hash is never replaced by a stale one from another shard. Shards written
+        with other options can never be resumed and are deleted; malformed lines
+        (a record torn by a crash) are skipped.
+        """
+        rows: dict[str, tuple[str, dict]] = {}
+        for path in self._shards():
+            with path.open() as fh:
+                try:
+                    header = json.loads(fh.readline())
+                except json.JSONDecodeError:
+                    header = {}
+                if header.get("version") != JOURNAL_VERSION or header.get("options") != self.options:
+                    fh.close()
+                    path.unlink()
+                    continue
+                for line in fh:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+                    model_id = record["model_id"]
+                    want = (expected or {}).get(model_id)
+                    if want is not None and record["input_hash"] != want and rows.get(model_id, ("",))[0] == want:
+                        continue
+                    rows[model_id] = (record["input_hash"], record["row"])
+        return rows
+
+    def writer(self, shard: int) -> JournalWriter:
+        return JournalWriter(self.directory / f"shard-{shard}.jsonl", self.options)
+
+    def clear(self) -> None:
+        for path in self._shards():
+            path.unlink()
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""Export models and SKUs as one compact, content-hashed catalog for the static site.
+
+The catalog is columnar: each table stores one array per field instead of
+repeating every key on every row. String columns are stored in whichever of
+these forms serializes smallest:
+
+- a plain array;
+- ``{"dict": [...], "codes": [...]}``: interned values, ``-1`` for null;
+- ``{"dict": [...], "codes": [...], "sep": "/", "rest": [...]}``: the part before the
+  first ``sep`` interned (e.g. the provider in ``org/model``), the remainder plain.
+
+``catalog.<hash>.json`` is written together with ``.gz`` and, when the optional
+``brotli`` package is installed, ``.br`` variants. ``manifest.json`` names the
+current files, so only the manifest needs a short cache lifetime. ``--check``
+exits non-zero when the committed export no longer matches the row files; CI
+runs it before building the site.
+"""
+
+from __future__ import annotations
+
+import argparse
+import gzip
+import hashlib
+import json
+from pathlib import Path
+
+import instrumentation
+from sizing import MODELS_FILE, SKUS_FILE
+
+FORMAT_VERSION = 1
+EXPORT_DIR = Path(__file__).resolve().parents[1] / "public" / "catalog"
+MANIFEST_FILE = "manifest.json"
+HASH_LENGTH = 12
+
+
+def _size(value: object) -> int:
+    return len(json.dumps(value, separators=(",", ":")))
+
+
+def encode_column(values: list) -> list | dict:
+    candidates: list[list | dict] = [values]
+    if values and all(isinstance(v, str) or v is None for v in values):
+        dictionary = sorted({v for v in values if v is not None})
+        index = {v: i for i, v in enumerate(dictionary)}
+        candidates.append({"dict": dictionary, "codes": [index[v] if v is not None else -1 for v in values]})
+        if all(isinstance(v, str) and "/" in v for v in values):
+            heads, rests = zip(*(v.split("/", 1) for v in values))
+            prefixes = sorted(set(heads))
+            index = {v: i for i, v in enumerate(prefixes)}
+            candidates.append({"dict": prefixes, "codes": [index[h] for h in heads], "sep": "/", "rest": list(rests)})
+    return min(candidates, key=_size)
+
+
+def decode_column(column: list | dict) -> list:
+    if isinstance(column, list):
+        return column
+    values = [column["dict"][code] if code >= 0 else None for code in column["codes"]]
+    if "sep" in column:
+        return [f"{head}{column['sep']}{rest}" for head, rest in zip(values, column["rest"])]
+    return values
+
+
+def encode_table(rows: list[dict]) -> dict:
+    """Columnar form of ``rows``; fields missing from a row are stored as null."""
+    fields = list(dict.fromkeys(key for row in rows for key in row))
+    return {"rows": len(rows), "columns": {f: encode_column([row.get(f) for row in rows]) for f in fields}}
+
+
+def decode_table(table: dict) -> list[dict]:
+    """Inverse of ``encode_table``; null fields are dropped from each row."""
+    columns = {field: decode_column(column) for field, column in table["columns"].items()}
+    return [
+        {field: values[i] for field, values in columns.items() if values[i] is not None} for i in range(table["rows"])
+    ]
+
+
+def build_catalog(models: list[dict], skus: list[dict]) -> dict:
+    return {"format": FORMAT_VERSION, "tables": {"models": encode_table(models), "skus": encode_table(skus)}}
+
+
+def _compress_brotli(data: bytes) -> bytes | None:
+    try:
+        import brotli
+    except ImportError:
+        return None
+    return brotli.compress(data, quality=11)
+
+
+def export_catalog(catalog: dict, out_dir: Path = EXPORT_DIR) -> dict:
+    """Write the hashed catalog files and manifest; remove files of older exports."""
+    data = json.dumps(catalog, separators=(",", ":"), sort_keys=True).encode()
+    digest = hashlib.sha256(data).hexdigest()
+    name = f"catalog.{digest[:HASH_LENGTH]}.json"
+    variants = {"identity": data, "gzip": gzip.compress(data, compresslevel=9, mtime=0)}
+    compressed = _compress_brotli(data)
+    if compressed is None:
+        instrumentation.error("brotli is not installed; skipping the .br catalog variant")
+    else:
+        variants["br"] = compressed
+    suffixes = {"identity": "", "gzip": ".gz", "br": ".br"}
+
+    out_dir.mkdir(parents=True, exist_ok=True)
+    files = {}
+    for encoding, payload in variants.items():
+        path = out_dir / (name + suffixes[encoding])
+        path.write_bytes(payload)
+        files[encoding] = {"path": path.name, "bytes": len(payload)}
+    manifest = {
+        "format": FORMAT_VERSION,
+        "catalog": {"sha256": digest, "files": files},
+        "tables": {table: body["rows"] for table, body in catalog["tables"].items()},
+    }
+    tmp = out_dir / (MANIFEST_FILE + ".tmp")
+    tmp.write_text(json.dumps(manifest, indent=2) + "\n")
+    tmp.replace(out_dir / MANIFEST_FILE)
+    current = {f["path"] for f in files.values()}
+    for stale in out_dir.glob("catalog.*.json*"):
+        if stale.name not in current:
+            stale.unlink()
+    return manifest
+
+
+def check_export(catalog: dict, out_dir: Path = EXPORT_DIR) -> list[str]:
+    """Problems keeping ``out_dir`` from serving ``catalog``; empty when the export is current."""
+    data = json.dumps(catalog, separators=(",", ":"), sort_keys=True).encode()
+    digest = hashlib.sha256(data).hexdigest()
+    try:
+        manifest = json.loads((out_dir / MANIFEST_FILE).read_text())
+    except (OSError, ValueError) as exc:
+        return [f"cannot read {out_dir / MANIFEST_FILE}: {exc}"]
+    if manifest.get("format") != FORMAT_VERSION or manifest["catalog"]["sha256"] != digest:
+        return [f"{out_dir / MANIFEST_FILE} is stale; rerun export_artifacts.py"]
+    paths = [out_dir / f["path"] for f in manifest["catalog"]["files"].values()]
+    return [f"missing {path}" for path in paths if not path.exists()]
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--models", type=Path, default=MODELS_FILE)
+    parser.add_argument("--skus", type=Path, default=SKUS_FILE)
+    parser.add_argument("--out-dir", type=Path, default=EXPORT_DIR)
+    parser.add_argument("--check", action="store_true", help="only verify the export matches the row files")
+    args = parser.parse_args(argv)
+
+    catalog = build_catalog(json.loads(args.models.read_text()), json.loads(args.skus.read_text()))
+    if args.check:
+        problems = check_export(catalog, args.out_dir)
+        if problems:
+            raise SystemExit("\n".join(problems))
+        print(f"{args.out_dir / MANIFEST_FILE} is current")
+        return
+    manifest = export_catalog(catalog, args.out_dir)
+    for encoding, f in manifest["catalog"]["files"].items():
+        print(f"{encoding:<8} {f['path']:<32} {f['bytes']:>8} bytes")
+    print(f"Wrote {args.out_dir / MANIFEST_FILE}")
+
+
+if __name__ == "__main__":
+    main()
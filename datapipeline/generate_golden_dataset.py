@@ -1,53 +1,115 @@
+import argparse
 import json
 from pathlib import Path
 
+import instrumentation
+import sku_ingest
+from gpu_resolver import SPECS_FILE, GpuResolver
+
+# one `az vm list-skus` dump per region (see get_az_vm_with_gpus.sh); the
+# single-region vms.json is used when no per-region dumps exist
+DUMP_DIR = Path(__file__).with_name('vm_skus')
 RAW_FILE = Path(__file__).with_name('vms.json')
 INTERMEDIATE_FILE = Path(__file__).with_name('parsed_gpus.json')
 OUTPUT_FILE = Path(__file__).resolve().parents[1] / 'data' / 'azure-gpus.json'
 
-# map VM family strings to (GPU model, memory per GPU in GB)
-FAMILY_TO_GPU = {
-    'Standard NCASv3_T4 Family': ('T4', 16),
-    'StandardNCADSA100v4Family': ('A100', 40),
-    'StandardNCadsH100v5Family': ('H100', 80),
-    'standard NDAMSv4_A100Family': ('A100', 80),
-    'standardNDSH100v5Family': ('H100', 80),
-    'StandardNVADSA10v5Family': ('A10', 24),
-    'standardNVSv4Family': ('MI25', 16),
-}
-
-def main():
-    raw = json.loads(RAW_FILE.read_text())
+
+def _number(value, kind):
+    try:
+        return kind(value)
+    except (TypeError, ValueError):
+        return 0
+
+
+def dump_files():
+    dumps = sorted(DUMP_DIR.glob('*.json')) if DUMP_DIR.is_dir() else []
+    return dumps or [RAW_FILE]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Reduce the VM SKU dumps to the golden GPU SKU dataset.')
+    parser.add_argument('dumps', nargs='*', type=Path, help='SKU dumps to read (default: vm_skus/*.json, else vms.json)')
+    parser.add_argument('--processes', type=int, default=None, help='dumps parsed in parallel (default: CPU count)')
+    parser.add_argument('--specs', type=Path, default=SPECS_FILE, help='GPU spec table and family rules')
+    parser.add_argument('--strict', action='store_true', help='exit non-zero when a SKU cannot be resolved')
+    instrumentation.add_arguments(parser)
+    args = parser.parse_args(argv)
+    run = instrumentation.start_run('generate_golden_dataset', args.profile, args.profile_stage, OUTPUT_FILE.parent)
+    with run.span('generate_golden_dataset'):
+        golden, unresolved = _generate(run, args.dumps or dump_files(), GpuResolver.from_file(args.specs), args.processes)
+    print(f'Wrote {len(golden)} SKUs to {OUTPUT_FILE}')
+    print(f'Run report: {instrumentation.write_report(OUTPUT_FILE)}')
+    if unresolved and args.strict:
+        raise SystemExit(f'{len(unresolved)} SKUs did not match any rule in {args.specs}')
+
+
+def _generate(run, dumps, resolver, processes=None):
+    with run.span('load'):
+        catalog = sku_ingest.load_catalog(dumps, processes)
+    run.count('skus.dumps', len(dumps))
+    run.count('skus.raw', len(catalog))
     parsed = []
-    for item in raw:
-        sku = item.get('name')
-        family = item.get('family')
-        gpu_model, vram = FAMILY_TO_GPU.get(family, ('Unknown', 0))
-        gpus = 0
-        for cap in item.get('capabilities', []):
-            if cap.get('name') == 'GPUs':
-                try:
-                    gpus = int(cap['value'])
-                except ValueError:
-                    gpus = 0
-                break
-        parsed.append({'sku': sku, 'family': family, 'gpu_model': gpu_model, 'gpus_per_vm': gpus, 'vram_gb': vram})
+    unresolved = []
+    for item in catalog:
+        sku = item['name']
+        family = item['family']
+        resolution = resolver.resolve(sku, family)
+        if resolution is None:
+            # kept in the intermediate file so the gap is visible, but never sized
+            unresolved.append({'sku': sku, 'family': family})
+            instrumentation.error(f'No GPU rule matches {sku} (family {family!r}); add one to gpu_specs.json')
+            gpu = {'gpu_model': 'Unknown', 'vram_gb': 0}
+            docs_url = ''
+        else:
+            gpu = resolution.spec.fields()
+            docs_url = resolution.docs_url
+        caps = item['capabilities']
+        parsed.append({
+            'sku': sku,
+            'family': family,
+            'gpus_per_vm': _number(caps.get('GPUs'), int),
+            'vcpus': _number(caps.get('vCPUs'), int),
+            'memory_gb': _number(caps.get('MemoryGB'), float),
+            'rdma_enabled': caps.get('RdmaEnabled') == 'True',
+            'docs_url': docs_url,
+            **gpu,
+            'regions': sku_ingest.available_regions(item),
+            'availability': item['regions'],
+        })
+    run.count('skus.unresolved', len(unresolved))
+    run.set('unresolved_skus', unresolved)
 
     # write intermediate file with family info
-    INTERMEDIATE_FILE.write_text(json.dumps(parsed, indent=2))
+    with run.span('write_intermediate'):
+        INTERMEDIATE_FILE.write_text(json.dumps(parsed, indent=2))
 
-    # reduce to golden dataset used by application
+    # reduce to golden dataset used by application; null fields (e.g. fp8 on
+    # GPUs without it) are dropped like in the other row files
     golden = [
-        {
+        {k: v for k, v in {
             'sku': p['sku'],
             'gpu_model': p['gpu_model'],
             'gpus_per_vm': p['gpus_per_vm'],
             'vram_gb': p['vram_gb'],
-        }
+            'docs_url': p['docs_url'],
+            'mem_bw_gbs': p['mem_bw_gbs'],
+            'fp16_tflops': p['fp16_tflops'],
+            'int8_tops': p['int8_tops'],
+            'vcpus': p['vcpus'],
+            'memory_gb': p['memory_gb'],
+            'rdma_enabled': p['rdma_enabled'],
+            'fp8_tflops': p['fp8_tflops'],
+            'interconnect': p['interconnect'],
+            'interconnect_gbs': p['interconnect_gbs'],
+            'regions': p['regions'],
+        }.items() if v is not None}
         for p in parsed if p['gpu_model'] != 'Unknown'
     ]
     golden.sort(key=lambda x: x['sku'])
-    OUTPUT_FILE.write_text(json.dumps(golden, indent=2))
+    with run.span('write_golden'):
+        OUTPUT_FILE.write_text(json.dumps(golden, indent=2))
+    run.count('skus.golden', len(golden))
+    return golden, unresolved
 
 if __name__ == '__main__':
     main()
@@ -1,5 +1,22 @@
 #!/usr/bin/env bash
-az vm list-skus \
-  --location swedencentral \
-  --query "[?capabilities[?name=='GPUs' && to_number(value) >= \`1\`]]" \
-  > vms.json
+# Dump the GPU VM SKUs of every physical region (or of the regions given as
+# arguments) to vm_skus/<region>.json, PARALLEL regions at a time.
+set -euo pipefail
+cd "$(dirname "$0")"
+mkdir -p vm_skus
+
+dump_region() {
+  az vm list-skus \
+    --location "$1" \
+    --resource-type virtualMachines \
+    --query "[?capabilities[?name=='GPUs' && to_number(value) >= \`1\`]]" \
+    > "vm_skus/$1.json.tmp"
+  mv "vm_skus/$1.json.tmp" "vm_skus/$1.json"
+}
+export -f dump_region
+
+if [ "$#" -gt 0 ]; then
+  printf '%s\n' "$@"
+else
+  az account list-locations --query "[?metadata.regionType=='Physical'].name" -o tsv
+fi | xargs -P "${PARALLEL:-8}" -I{} bash -c 'dump_region "$1"' _ {}
@@ -0,0 +1,76 @@
+"""Resolve Azure VM SKUs to GPU specs with the rules in ``gpu_specs.json``.
+
+``gpus`` maps a GPU variant to its per-GPU datasheet numbers: memory, peak HBM
+bandwidth, dense tensor throughput per dtype (TFLOPS, TOPS for int8) and the
+GPU-to-GPU interconnect with its bandwidth. ``rules`` are tried in order; each
+matches the SKU's ``family`` or ``name`` with a case-insensitive regex and names
+a variant. Adding hardware means adding a spec and a rule, not code.
+"""
+
+from __future__ import annotations
+
+import json
+import re
+from dataclasses import dataclass
+from pathlib import Path
+
+SPECS_FILE = Path(__file__).with_name("gpu_specs.json")
+
+
+@dataclass(frozen=True)
+class GpuSpec:
+    variant: str
+    gpu_model: str
+    vram_gb: float
+    mem_bw_gbs: float
+    dense_tflops: dict[str, float]
+    interconnect: str
+    interconnect_gbs: float
+
+    def fields(self) -> dict:
+        """Per-GPU fields of the golden dataset; missing dtypes are ``None``."""
+        return {
+            "gpu_model": self.gpu_model,
+            "vram_gb": self.vram_gb,
+            "mem_bw_gbs": self.mem_bw_gbs,
+            "fp16_tflops": self.dense_tflops["fp16"],
+            "fp8_tflops": self.dense_tflops.get("fp8"),
+            "int8_tops": self.dense_tflops["int8"],
+            "interconnect": self.interconnect,
+            "interconnect_gbs": self.interconnect_gbs,
+        }
+
+
+@dataclass(frozen=True)
+class Resolution:
+    spec: GpuSpec
+    docs_url: str
+
+
+class GpuResolver:
+    """Classifies SKUs by the first matching rule; patterns are compiled once."""
+
+    def __init__(self, config: dict) -> None:
+        self.specs = {variant: GpuSpec(variant=variant, **spec) for variant, spec in config["gpus"].items()}
+        docs_base = config.get("docs_base", "")
+        self._rules: list[tuple[str, re.Pattern, Resolution]] = []
+        for rule in config["rules"]:
+            field = "family" if "family" in rule else "name"
+            if field not in rule:
+                raise ValueError(f"rule {rule} matches neither family nor name")
+            if rule["gpu"] not in self.specs:
+                raise ValueError(f"rule {rule} names unknown GPU {rule['gpu']!r}")
+            docs = docs_base + rule["docs"] if rule.get("docs") else ""
+            resolution = Resolution(self.specs[rule["gpu"]], docs)
+            self._rules.append((field, re.compile(rule[field], re.IGNORECASE), resolution))
+
+    @classmethod
+    def from_file(cls, path: Path = SPECS_FILE) -> GpuResolver:
+        return cls(json.loads(path.read_text()))
+
+    def resolve(self, name: str | None, family: str | None) -> Resolution | None:
+        values = {"name": name or "", "family": family or ""}
+        for field, pattern, resolution in self._rules:
+            if pattern.search(values[field]):
+                return resolution
+        return None
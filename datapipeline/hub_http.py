@@ -0,0 +1,172 @@
+"""Rate-limited, retrying access to the Hugging Face Hub HTTP API."""
+
+from __future__ import annotations
+
+import threading
+import time
+from collections.abc import Iterator
+from urllib.parse import urlencode, urlsplit
+
+import httpx
+import instrumentation
+from huggingface_hub import constants, get_session, hf_hub_url
+from huggingface_hub.hf_api import ModelInfo
+from huggingface_hub.utils import build_hf_headers, hf_raise_for_status
+
+RETRYABLE_STATUS = frozenset({429, 500, 502, 503, 504})
+
+
+def response_revision(response: httpx.Response) -> tuple[str | None, str | None]:
+    """Extract ``(commit_sha, etag)`` from a resolve response or its redirects."""
+    for hop in (response, *response.history):
+        commit = hop.headers.get(constants.HUGGINGFACE_HEADER_X_REPO_COMMIT)
+        if commit:
+            etag = hop.headers.get(constants.HUGGINGFACE_HEADER_X_LINKED_ETAG) or hop.headers.get("ETag")
+            return commit, etag.strip('"') if etag else None
+    return None, None
+
+
+class HostRateLimiter:
+    """Space requests to each host at most ``rate`` per second across threads."""
+
+    def __init__(self, rate: float | None = None) -> None:
+        self.interval = 1.0 / rate if rate else 0.0
+        self._next_slot: dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def wait(self, host: str) -> None:
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(host, now))
+            self._next_slot[host] = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+class HubClient:
+    """Thin Hub client sharing one pooled session, limiter and retry policy.
+
+    ``huggingface_hub`` retries some calls internally and others not at all; doing
+    it here keeps backoff and per-host pacing consistent when many workers share
+    the same endpoint.
+    """
+
+    def __init__(
+        self,
+        endpoint: str | None = None,
+        rate: float | None = None,
+        retries: int = 3,
+        backoff: float = 0.5,
+        max_backoff: float = 8.0,
+        timeout: float = 10.0,
+    ) -> None:
+        self.endpoint = (endpoint or constants.ENDPOINT).rstrip("/")
+        self.limiter = HostRateLimiter(rate)
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.timeout = timeout
+        self.session = get_session()
+        self.request_count = 0
+        self._count_lock = threading.Lock()
+
+    def _delay(self, attempt: int, response: httpx.Response | None) -> float:
+        retry_after = response.headers.get("Retry-After") if response is not None else None
+        if retry_after:
+            try:
+                return min(float(retry_after), self.max_backoff)
+            except ValueError:
+                pass
+        return min(self.backoff * 2**attempt, self.max_backoff)
+
+    def request(
+        self, method: str, url: str, headers: dict[str, str] | None = None, stream: bool = False
+    ) -> httpx.Response:
+        """Send a request with pacing and retries; ``stream=True`` leaves the body unread.
+
+        Streamed responses must be closed by the caller.
+        """
+        host = urlsplit(url).netloc
+        request_headers = build_hf_headers()
+        request_headers.update(headers or {})
+        attempt = 0
+        while True:
+            self.limiter.wait(host)
+            with self._count_lock:
+                self.request_count += 1
+            instrumentation.count("http.requests")
+            started = time.perf_counter()
+            try:
+                request = self.session.build_request(method, url, headers=request_headers, timeout=self.timeout)
+                response = self.session.send(request, stream=stream, follow_redirects=True)
+            except httpx.TransportError as e:
+                instrumentation.count(f"http.errors.{type(e).__name__}")
+                if attempt >= self.retries:
+                    raise
+                instrumentation.count("http.retries")
+                time.sleep(self._delay(attempt, None))
+                attempt += 1
+                continue
+            instrumentation.observe(f"http.{method}", time.perf_counter() - started, urlsplit(url).path)
+            instrumentation.count(f"http.status.{response.status_code}")
+            if not stream:
+                instrumentation.count("http.bytes", len(response.content))
+            if response.status_code in RETRYABLE_STATUS and attempt < self.retries:
+                instrumentation.count("http.retries")
+                response.close()
+                time.sleep(self._delay(attempt, response))
+                attempt += 1
+                continue
+            if stream and response.status_code >= 400:
+                response.read()
+            hf_raise_for_status(response)
+            return response
+
+    def read_range(self, url: str, start: int, length: int) -> bytes:
+        """Read ``length`` bytes at ``start`` without transferring the rest of the file.
+
+        Servers that ignore ``Range`` answer 200 with the whole body; the stream is
+        then cut off as soon as the requested span has arrived.
+        """
+        headers = {"Range": f"bytes={start}-{start + length - 1}", "Accept-Encoding": "identity"}
+        response = self.request("GET", url, headers, stream=True)
+        skip = start if response.status_code == 200 else 0
+        data = bytearray()
+        try:
+            for chunk in response.iter_raw():
+                data += chunk
+                instrumentation.count("http.bytes", len(chunk))
+                if len(data) >= skip + length:
+                    break
+        finally:
+            response.close()
+        return bytes(data[skip : skip + length])
+
+    def file_url(self, repo: str, filename: str, revision: str | None = None) -> str:
+        return hf_hub_url(repo, filename, revision=revision, endpoint=self.endpoint)
+
+    def get_file(self, repo: str, filename: str, revision: str | None = None) -> httpx.Response:
+        return self.request("GET", self.file_url(repo, filename, revision))
+
+    def file_revision(self, repo: str, filename: str) -> tuple[str | None, str | None]:
+        """Return the ``(commit_sha, etag)`` currently served for a file, via HEAD."""
+        return response_revision(self.request("HEAD", self.file_url(repo, filename)))
+
+    def model_info(self, repo: str) -> ModelInfo:
+        return ModelInfo(**self.request("GET", f"{self.endpoint}/api/models/{repo}").json())
+
+    def list_models(
+        self, author: str, expand: tuple[str, ...], page_size: int = 1000, max_pages: int | None = None
+    ) -> Iterator[dict]:
+        """Page through ``author``'s models (most downloaded first) with ``expand`` fields."""
+        params = [("author", author), ("sort", "downloads"), ("direction", "-1"), ("limit", str(page_size))]
+        params += [("expand[]", field) for field in expand]
+        url: str | None = f"{self.endpoint}/api/models?{urlencode(params)}"
+        pages = 0
+        while url and (max_pages is None or pages < max_pages):
+            response = self.request("GET", url)
+            pages += 1
+            yield from response.json()
+            url = response.links.get("next", {}).get("url")
@@ -3,16 +3,39 @@
 
 from __future__ import annotations
 
+import argparse
+import heapq
 import json
-from dataclasses import dataclass, asdict
+import os
+import queue
+import threading
+import time
+from collections.abc import Callable, Iterable, Iterator
+from dataclasses import asdict, dataclass
+from functools import partial
 from pathlib import Path
-from typing import Iterable
+from urllib.parse import urlencode
 from urllib.request import Request, urlopen
 
-from huggingface_hub import HfApi
-from huggingface_hub.utils import HfHubHTTPError
+import httpx
+import instrumentation
+from change_feed import append_run, change_feed_path, diff_staging, file_digest
+from huggingface_hub import constants, get_session
+from huggingface_hub.utils import HfHubHTTPError, build_hf_headers, hf_raise_for_status
 
-STAGING_FILE = Path(__file__).resolve().parent / "staging_candidates.json"
+STAGING_FILE = Path(__file__).resolve().parent / "staging_candidates.jsonl"
+OPENROUTER_ENDPOINT = os.environ.get("OPENROUTER_ENDPOINT", "https://openrouter.ai").rstrip("/")
+DEFAULT_DEADLINE = 30.0
+# Upper bound for one source request; sources also stop at the staging deadline.
+REQUEST_TIMEOUT = 10.0
+# The Hub serves at most this many models per listing page.
+HUB_PAGE_SIZE = 1000
+# Candidates staged per run; the cut is taken with a heap, so only these are ever sorted.
+STAGING_TOP_N = 50_000
+# Candidates are handed from source threads to the merger in batches; the queue
+# holds at most QUEUE_BATCHES of them so a fast source cannot outrun the merge.
+BATCH_SIZE = 256
+QUEUE_BATCHES = 16
 
 COMMUNITY_RANKINGS = [
     {"model_id": "meta-llama/Llama-3.1-70B-Instruct", "score": 98.0},
@@ -33,122 +56,343 @@ class Candidate:
     tags: list[str]
 
 
+class Deadline:
+    """Wall-clock budget shared by every source in one staging run."""
+
+    def __init__(self, seconds: float) -> None:
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+
+SourceFetcher = Callable[..., Iterable[Candidate]]
+SOURCES: dict[str, SourceFetcher] = {}
+
+
+def register_source(name: str) -> Callable[[SourceFetcher], SourceFetcher]:
+    """Add a fetcher to the parallel fan-out in ``stage_candidates``.
+
+    Fetchers are called as ``fetch(deadline=Deadline)``, yield candidates as they
+    page through their listing, and should bound their own network timeouts by
+    ``deadline.remaining()``. Registration order decides merge precedence.
+    """
+
+    def decorator(fetch: SourceFetcher) -> SourceFetcher:
+        SOURCES[name] = fetch
+        return fetch
+
+    return decorator
+
+
 def _provider_from_model_id(model_id: str) -> str:
     return model_id.split("/", 1)[0] if "/" in model_id else model_id
 
 
-def _fetch_json(url: str, headers: dict[str, str] | None = None) -> dict:
+def _fetch_json(url: str, headers: dict[str, str] | None = None, timeout: float = REQUEST_TIMEOUT) -> dict:
     req = Request(url, headers=headers or {})
-    with urlopen(req, timeout=10) as response:
+    with urlopen(req, timeout=timeout) as response:
         return json.load(response)
 
 
-def fetch_huggingface_hub(limit: int = 50) -> list[Candidate]:
-    api = HfApi()
-    candidates: list[Candidate] = []
+def _request_timeout(deadline: Deadline | None) -> float:
+    """Per-request timeout, never longer than what is left of ``deadline``."""
+    return min(REQUEST_TIMEOUT, deadline.remaining()) if deadline else REQUEST_TIMEOUT
+
+
+@register_source("huggingface_hub")
+def fetch_huggingface_hub(limit: int | None = 50, deadline: Deadline | None = None) -> Iterator[Candidate]:
+    """Page through the text-generation listing, most downloaded first.
+
+    Only the current page is held in memory. Each page request is bounded by the
+    time left before ``deadline``, and no page is requested once it has expired.
+    """
+    params = {"filter": "text-generation", "sort": "downloads", "direction": "-1"}
+    params["limit"] = str(min(limit, HUB_PAGE_SIZE) if limit else HUB_PAGE_SIZE)
+    url: str | None = f"{constants.ENDPOINT}/api/models?{urlencode(params)}"
+    session, headers = get_session(), build_hf_headers()
+    remaining = limit
     try:
-        models = api.list_models(
-            filter="text-generation",
-            sort="downloads",
-            direction=-1,
-            limit=limit,
-        )
-    except HfHubHTTPError:
-        models = []
-    for model in models:
-        model_id = model.modelId
-        card_data = getattr(model, "cardData", None) or {}
-        candidates.append(
-            Candidate(
-                model_id=model_id,
-                provider=_provider_from_model_id(model_id),
-                license=card_data.get("license") or None,
-                source="huggingface_hub",
-                popularity_score=float(model.downloads or 0),
-                tags=list({*(model.tags or []), "hub-listing"}),
-            )
-        )
-    return candidates
+        while url and remaining != 0:
+            if deadline and deadline.expired():
+                return
+            response = session.get(url, headers=headers, timeout=_request_timeout(deadline))
+            hf_raise_for_status(response)
+            url = response.links.get("next", {}).get("url")
+            for model in response.json()[:remaining]:
+                if deadline and deadline.expired():
+                    return
+                model_id = model["id"]
+                card_data = model.get("cardData") or {}
+                yield Candidate(
+                    model_id=model_id,
+                    provider=_provider_from_model_id(model_id),
+                    license=card_data.get("license") or None,
+                    source="huggingface_hub",
+                    popularity_score=float(model.get("downloads") or 0),
+                    tags=sorted({*(model.get("tags") or []), "hub-listing"}),
+                )
+                if remaining is not None:
+                    remaining -= 1
+    except (HfHubHTTPError, httpx.TransportError):
+        return
 
 
-def fetch_community_rankings() -> list[Candidate]:
-    candidates: list[Candidate] = []
+@register_source("community_rankings")
+def fetch_community_rankings(deadline: Deadline | None = None) -> Iterator[Candidate]:
     for entry in COMMUNITY_RANKINGS:
         model_id = entry["model_id"]
-        candidates.append(
-            Candidate(
-                model_id=model_id,
-                provider=_provider_from_model_id(model_id),
-                license=None,
-                source="community_rankings",
-                popularity_score=float(entry["score"]),
-                tags=["community-ranking"],
-            )
+        yield Candidate(
+            model_id=model_id,
+            provider=_provider_from_model_id(model_id),
+            license=None,
+            source="community_rankings",
+            popularity_score=float(entry["score"]),
+            tags=["community-ranking"],
         )
-    return candidates
 
 
-def fetch_openrouter_index(limit: int = 80) -> list[Candidate]:
-    candidates: list[Candidate] = []
+@register_source("openrouter_index")
+def fetch_openrouter_index(limit: int | None = 80, deadline: Deadline | None = None) -> Iterator[Candidate]:
+    if deadline and deadline.expired():
+        return
     try:
         data = _fetch_json(
-            "https://openrouter.ai/api/v1/models",
+            f"{OPENROUTER_ENDPOINT}/api/v1/models",
             headers={"User-Agent": "azure-llm-sizer"},
+            timeout=_request_timeout(deadline),
         )
-    except Exception:
-        return candidates
+    except (OSError, ValueError):
+        return
     for entry in data.get("data", [])[:limit]:
         model_id = entry.get("hugging_face_id") or ""
         if not model_id:
             continue
         modalities = entry.get("architecture", {}).get("input_modalities") or []
-        candidates.append(
-            Candidate(
+        yield Candidate(
+            model_id=model_id,
+            provider=_provider_from_model_id(model_id),
+            license=None,
+            source="openrouter_index",
+            popularity_score=0.0,
+            tags=sorted({"vendor-index", *modalities}),
+        )
+
+
+def _rank_key(item: Candidate) -> tuple[float, str]:
+    return (-item.popularity_score, item.model_id)
+
+
+class CandidateMerger:
+    """Merge candidates by ``model_id`` as they arrive from concurrent sources.
+
+    Each candidate carries the rank of its source. Where sources disagree on the
+    license, the lowest rank wins, so the result does not depend on the order in
+    which batches happen to arrive. Sources and tags are kept as sets while
+    merging and only sorted once, when ``ranked`` builds the output.
+    """
+
+    def __init__(self) -> None:
+        self._merged: dict[str, Candidate] = {}
+        self._license_rank: dict[str, int] = {}
+        self._sources: dict[str, set[str]] = {}
+        self._tags: dict[str, set[str]] = {}
+
+    def __len__(self) -> int:
+        return len(self._merged)
+
+    def add(self, candidate: Candidate, rank: int = 0) -> None:
+        model_id = candidate.model_id
+        existing = self._merged.get(model_id)
+        if existing is None:
+            self._merged[model_id] = Candidate(
                 model_id=model_id,
-                provider=_provider_from_model_id(model_id),
-                license=None,
-                source="openrouter_index",
-                popularity_score=0.0,
-                tags=list({"vendor-index", *modalities}),
+                provider=candidate.provider,
+                license=candidate.license,
+                source=candidate.source,
+                popularity_score=candidate.popularity_score,
+                tags=[],
             )
-        )
-    return candidates
+            self._sources[model_id] = set(candidate.source.split("+"))
+            self._tags[model_id] = set(candidate.tags)
+            if candidate.license is not None:
+                self._license_rank[model_id] = rank
+            return
+        self._tags[model_id].update(candidate.tags)
+        self._sources[model_id].update(candidate.source.split("+"))
+        existing.popularity_score = max(existing.popularity_score, candidate.popularity_score)
+        if candidate.license is not None and rank < self._license_rank.get(model_id, rank + 1):
+            existing.license = candidate.license
+            self._license_rank[model_id] = rank
+
+    def _finish(self, candidate: Candidate) -> Candidate:
+        candidate.source = "+".join(sorted(self._sources[candidate.model_id]))
+        candidate.tags = sorted(self._tags[candidate.model_id])
+        return candidate
+
+    def ranked(self, top_n: int | None = None) -> list[Candidate]:
+        """Return candidates by descending popularity, keeping only ``top_n`` via a heap."""
+        if top_n is None:
+            chosen = sorted(self._merged.values(), key=_rank_key)
+        else:
+            chosen = heapq.nsmallest(top_n, self._merged.values(), key=_rank_key)
+        return [self._finish(candidate) for candidate in chosen]
 
 
-def merge_candidates(*sources: Iterable[Candidate]) -> list[Candidate]:
-    merged: dict[str, Candidate] = {}
-    for source in sources:
+def merge_candidates(*sources: Iterable[Candidate], top_n: int | None = None) -> list[Candidate]:
+    merger = CandidateMerger()
+    for rank, source in enumerate(sources):
         for candidate in source:
-            existing = merged.get(candidate.model_id)
-            if existing is None:
-                merged[candidate.model_id] = candidate
+            merger.add(candidate, rank)
+    return merger.ranked(top_n)
+
+
+def _run_source(rank: int, name: str, fetch: SourceFetcher, deadline: Deadline, results: queue.Queue) -> None:
+    last = time.perf_counter()
+
+    def hand_off(batch: list[Candidate], finished: bool, error: Exception | None = None) -> bool:
+        nonlocal last
+        now = time.perf_counter()
+        instrumentation.observe(f"source.{name}", now - last)
+        instrumentation.count(f"source.{name}.candidates", len(batch))
+        last = now
+        try:
+            results.put((rank, batch, finished, error), timeout=deadline.remaining())
+        except queue.Full:
+            return False
+        return True
+
+    batch: list[Candidate] = []
+    with instrumentation.span(f"source.{name}"):
+        try:
+            for candidate in fetch(deadline=deadline):
+                batch.append(candidate)
+                if len(batch) >= BATCH_SIZE:
+                    if not hand_off(batch, False):
+                        return
+                    batch = []
+                if deadline.expired():
+                    break
+        except Exception as exc:  # noqa: BLE001
+            # A failing source must not take down the others; its error is reported.
+            hand_off(batch, True, exc)
+            return
+        hand_off(batch, True)
+
+
+def collect_sources(
+    sources: dict[str, SourceFetcher] | None = None,
+    deadline: float = DEFAULT_DEADLINE,
+) -> CandidateMerger:
+    """Stream every source concurrently into one ``CandidateMerger``.
+
+    Whatever a source yielded before the deadline is kept and the run is reported
+    as partial. Sources still running at that point are not waited for: their
+    requests time out by the deadline, after which they stop iterating (their
+    daemon threads cannot hold up the process either way).
+    """
+    sources = SOURCES if sources is None else sources
+    names = list(sources)
+    budget = Deadline(deadline)
+    results: queue.Queue = queue.Queue(maxsize=QUEUE_BATCHES)
+    for rank, (name, fetch) in enumerate(sources.items()):
+        threading.Thread(target=_run_source, args=(rank, name, fetch, budget, results), daemon=True).start()
+    merger = CandidateMerger()
+    finished: set[int] = set()
+    while len(finished) < len(names):
+        try:
+            rank, batch, done, error = results.get(timeout=budget.remaining())
+        except queue.Empty:
+            break
+        for candidate in batch:
+            merger.add(candidate, rank)
+        if done:
+            finished.add(rank)
+        if error is not None:
+            instrumentation.error(f"Source {names[rank]} failed: {error}")
+    for rank, name in enumerate(names):
+        if rank not in finished:
+            instrumentation.count("sources.missed_deadline")
+            instrumentation.error(f"Source {name} missed the {deadline:g}s deadline; staging is partial")
+    return merger
+
+
+def write_staging(candidates: Iterable[Candidate], path: Path = STAGING_FILE) -> None:
+    """Write one JSON object per line, replacing ``path`` only once complete.
+
+    The staging file is a snapshot that the next run diffs against, so it is
+    replaced rather than appended to; the append-only record of runs is the
+    change feed next to it.
+    """
+    tmp = path.with_name(path.name + ".tmp")
+    with tmp.open("w") as fh:
+        for candidate in candidates:
+            fh.write(json.dumps(asdict(candidate)) + "\n")
+    tmp.replace(path)
+
+
+def read_staging(path: Path = STAGING_FILE) -> Iterator[dict]:
+    """Yield staged candidate records, skipping blank or malformed lines."""
+    if not path.exists():
+        return
+    with path.open() as fh:
+        for line in fh:
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
                 continue
-            existing.tags = sorted(set(existing.tags).union(candidate.tags))
-            existing_source = set(existing.source.split("+"))
-            new_source = set(candidate.source.split("+"))
-            existing.source = "+".join(sorted(existing_source.union(new_source)))
-            existing.popularity_score = max(existing.popularity_score, candidate.popularity_score)
-            if existing.license is None:
-                existing.license = candidate.license
-    return sorted(
-        merged.values(),
-        key=lambda item: (-item.popularity_score, item.model_id),
-    )
 
 
-def stage_candidates() -> list[Candidate]:
-    candidates = merge_candidates(
-        fetch_huggingface_hub(),
-        fetch_community_rankings(),
-        fetch_openrouter_index(),
-    )
-    STAGING_FILE.write_text(json.dumps([asdict(c) for c in candidates], indent=2))
+def stage_candidates(
+    sources: dict[str, SourceFetcher] | None = None,
+    deadline: float = DEFAULT_DEADLINE,
+    top_n: int | None = STAGING_TOP_N,
+) -> list[Candidate]:
+    with instrumentation.span("collect"):
+        merger = collect_sources(sources, deadline)
+    with instrumentation.span("rank"):
+        candidates = merger.ranked(top_n)
+    with instrumentation.span("diff"):
+        # The staging file about to be replaced is the previous run's snapshot.
+        previous = {record["model_id"]: record for record in read_staging(STAGING_FILE)}
+        events = diff_staging(previous, [asdict(c) for c in candidates])
+    with instrumentation.span("write"):
+        write_staging(candidates, STAGING_FILE)
+        append_run(change_feed_path(STAGING_FILE), events, file_digest(STAGING_FILE))
+    instrumentation.count("candidates.merged", len(merger))
+    instrumentation.count("candidates.staged", len(candidates))
+    for event in events:
+        instrumentation.count(f"candidates.{event['op']}")
     return candidates
 
 
-def main() -> None:
-    candidates = stage_candidates()
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--deadline", type=float, default=DEFAULT_DEADLINE, help="overall seconds allowed for all sources"
+    )
+    parser.add_argument("--hub-limit", type=int, default=50, help="Hub models to page through (0: no limit)")
+    parser.add_argument("--openrouter-limit", type=int, default=80, help="OpenRouter entries to read (0: no limit)")
+    parser.add_argument(
+        "--top", type=int, default=STAGING_TOP_N, help="stage only the N most popular candidates (0: no limit)"
+    )
+    instrumentation.add_arguments(parser)
+    args = parser.parse_args(argv)
+    run = instrumentation.start_run("ingest_candidates", args.profile, args.profile_stage, STAGING_FILE.parent)
+    sources = {
+        **SOURCES,
+        "huggingface_hub": partial(fetch_huggingface_hub, limit=args.hub_limit or None),
+        "openrouter_index": partial(fetch_openrouter_index, limit=args.openrouter_limit or None),
+    }
+    with run.span("ingest_candidates"):
+        candidates = stage_candidates(sources, deadline=args.deadline, top_n=args.top or None)
     print(f"Wrote {len(candidates)} candidates to {STAGING_FILE}")
+    changes = ", ".join(f"{run.counters[f'candidates.{op}']} {op}" for op in ("added", "changed", "removed"))
+    print(f"Appended {changes} to {change_feed_path(STAGING_FILE)}")
+    print(f"Run report: {instrumentation.write_report(STAGING_FILE)}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,232 @@
+"""Spans, counters and latency histograms shared by the pipeline scripts.
+
+Every script records into one process-wide ``Recorder``; ``start_run`` resets it
+and ``write_report`` dumps it as JSON next to the script's output. Recording is
+thread-safe and cheap enough to leave on for every run.
+"""
+
+from __future__ import annotations
+
+import json
+import sys
+import threading
+import time
+from collections import Counter
+from collections.abc import Iterator
+from contextlib import contextmanager
+from pathlib import Path
+
+PROFILERS = ("cprofile", "pyinstrument")
+# Slowest labelled samples kept per histogram in the report.
+SLOWEST = 5
+
+
+class Histogram:
+    """Latency samples in seconds, each optionally labelled (e.g. with a repo id)."""
+
+    def __init__(self) -> None:
+        self.samples: list[tuple[float, str | None]] = []
+
+    def add(self, seconds: float, label: str | None = None) -> None:
+        self.samples.append((seconds, label))
+
+    def summary(self) -> dict:
+        values = sorted(value for value, _ in self.samples)
+        if not values:
+            return {"count": 0}
+
+        def percentile(q: float) -> float:
+            return values[min(len(values) - 1, int(q * len(values)))]
+
+        slowest = sorted((s for s in self.samples if s[1] is not None), reverse=True)[:SLOWEST]
+        return {
+            "count": len(values),
+            "total_s": round(sum(values), 6),
+            "min_s": round(values[0], 6),
+            "p50_s": round(percentile(0.5), 6),
+            "p90_s": round(percentile(0.9), 6),
+            "p99_s": round(percentile(0.99), 6),
+            "max_s": round(values[-1], 6),
+            "slowest": [[label, round(value, 6)] for value, label in slowest],
+        }
+
+
+class Recorder:
+    """Collects one run's measurements.
+
+    ``profile`` is ``"cprofile"`` or ``"pyinstrument"``; the profiler wraps every
+    span named in ``profile_stages`` (or the outermost span when none are named)
+    and writes its output to ``profile_dir``.
+    """
+
+    def __init__(
+        self,
+        name: str = "run",
+        profile: str | None = None,
+        profile_stages: tuple[str, ...] = (),
+        profile_dir: Path | None = None,
+    ) -> None:
+        self.name = name
+        self.profile = profile
+        self.profile_stages = tuple(profile_stages)
+        self.profile_dir = profile_dir
+        self.started = time.time()
+        self._t0 = time.perf_counter()
+        self.counters: Counter[str] = Counter()
+        self.histograms: dict[str, Histogram] = {}
+        self.spans: list[dict] = []
+        self.errors: list[str] = []
+        self.extra: dict[str, object] = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._profiling = False
+
+    def count(self, name: str, n: int = 1) -> None:
+        with self._lock:
+            self.counters[name] += n
+
+    def observe(self, name: str, seconds: float, label: str | None = None) -> None:
+        with self._lock:
+            self.histograms.setdefault(name, Histogram()).add(seconds, label)
+
+    def error(self, message: str) -> None:
+        """Report a non-fatal failure on stderr and keep it for the run report."""
+        print(message, file=sys.stderr)
+        with self._lock:
+            self.errors.append(message)
+
+    def set(self, key: str, value: object) -> None:
+        with self._lock:
+            self.extra[key] = value
+
+    @contextmanager
+    def span(self, name: str) -> Iterator[None]:
+        """Time a stage; spans nest per thread and are reported as ``outer/inner`` paths."""
+        stack = self._local.__dict__.setdefault("stack", [])
+        path = "/".join([*stack, name])
+        stack.append(name)
+        wanted = name in self.profile_stages if self.profile_stages else len(stack) == 1
+        start = time.perf_counter()
+        try:
+            if self.profile and wanted:
+                with self._profiled(path):
+                    yield
+            else:
+                yield
+        finally:
+            duration = time.perf_counter() - start
+            stack.pop()
+            with self._lock:
+                self.spans.append(
+                    {
+                        "name": path,
+                        "start_s": round(start - self._t0, 6),
+                        "duration_s": round(duration, 6),
+                        "thread": threading.current_thread().name,
+                    }
+                )
+
+    @contextmanager
+    def _profiled(self, path: str) -> Iterator[None]:
+        # Only one profiler can be active per process.
+        with self._lock:
+            if self._profiling:
+                busy = True
+            else:
+                busy, self._profiling = False, True
+        if busy:
+            yield
+            return
+        target = (self.profile_dir or Path.cwd()) / f"{self.name}.{path.replace('/', '.')}"
+        try:
+            if self.profile == "pyinstrument":
+                try:
+                    from pyinstrument import Profiler
+                except ImportError:
+                    self.error("pyinstrument is not installed; skipping profile")
+                    yield
+                    return
+                profiler = Profiler()
+                profiler.start()
+                try:
+                    yield
+                finally:
+                    profiler.stop()
+                    target.with_suffix(target.suffix + ".html").write_text(profiler.output_html())
+            else:
+                import cProfile
+
+                profiler = cProfile.Profile()
+                profiler.enable()
+                try:
+                    yield
+                finally:
+                    profiler.disable()
+                    profiler.dump_stats(target.with_suffix(target.suffix + ".prof"))
+        finally:
+            with self._lock:
+                self._profiling = False
+
+    def report(self) -> dict:
+        with self._lock:
+            return {
+                "run": self.name,
+                "started_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(self.started)),
+                "wall_s": round(time.time() - self.started, 6),
+                "spans": sorted(self.spans, key=lambda s: s["start_s"]),
+                "counters": dict(sorted(self.counters.items())),
+                "histograms": {name: h.summary() for name, h in sorted(self.histograms.items())},
+                "errors": list(self.errors),
+                **self.extra,
+            }
+
+
+_recorder = Recorder()
+
+
+def recorder() -> Recorder:
+    return _recorder
+
+
+def start_run(
+    name: str, profile: str | None = None, profile_stages: tuple[str, ...] = (), profile_dir: Path | None = None
+) -> Recorder:
+    """Replace the process-wide recorder with a fresh one for run ``name``."""
+    global _recorder
+    _recorder = Recorder(name, profile, profile_stages, profile_dir)
+    return _recorder
+
+
+def span(name: str):
+    return _recorder.span(name)
+
+
+def count(name: str, n: int = 1) -> None:
+    _recorder.count(name, n)
+
+
+def observe(name: str, seconds: float, label: str | None = None) -> None:
+    _recorder.observe(name, seconds, label)
+
+
+def error(message: str) -> None:
+    _recorder.error(message)
+
+
+def report_path(output: Path) -> Path:
+    """``data/models.json`` -> ``data/models.run.json``."""
+    return output.with_name(output.name.split(".", 1)[0] + ".run.json")
+
+
+def write_report(output: Path) -> Path:
+    path = report_path(output)
+    path.write_text(json.dumps(_recorder.report(), indent=2) + "\n")
+    return path
+
+
+def add_arguments(parser) -> None:
+    """Add the shared ``--profile`` / ``--profile-stage`` options to a script's parser."""
+    parser.add_argument("--profile", choices=PROFILERS, help="profile the run (or --profile-stage) with this tool")
+    parser.add_argument(
+        "--profile-stage", action="append", default=[], metavar="SPAN", help="profile only this span (repeatable)"
+    )
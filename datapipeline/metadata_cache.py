@@ -0,0 +1,152 @@
+"""On-disk cache of Hub metadata keyed by repo and upstream revision."""
+
+from __future__ import annotations
+
+import json
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+
+CACHE_DIR = Path(__file__).resolve().parent / ".cache"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    repo TEXT NOT NULL,
+    revision TEXT NOT NULL,
+    etag TEXT,
+    validated_at REAL NOT NULL,
+    accessed_at REAL NOT NULL,
+    size INTEGER NOT NULL,
+    payload TEXT NOT NULL,
+    PRIMARY KEY (repo, revision)
+)
+"""
+
+
+@dataclass
+class CacheEntry:
+    repo: str
+    revision: str
+    etag: str | None
+    validated_at: float
+    payload: dict
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    revalidated: int = 0
+    misses: int = 0
+    evicted: int = 0
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False, compare=False)
+
+    def record(self, outcome: str, n: int = 1) -> None:
+        with self._lock:
+            setattr(self, outcome, getattr(self, outcome) + n)
+
+    def as_dict(self) -> dict[str, int]:
+        return {"hits": self.hits, "revalidated": self.revalidated, "misses": self.misses, "evicted": self.evicted}
+
+    def summary(self) -> str:
+        return (
+            f"cache: {self.hits} fresh, {self.revalidated} revalidated, "
+            f"{self.misses} fetched, {self.evicted} evicted"
+        )
+
+
+class MetadataCache:
+    """SQLite-backed store of config.json, parameter totals and derived rows.
+
+    Entries younger than ``ttl`` seconds are trusted outright; older ones must be
+    revalidated against the upstream commit SHA before reuse. ``evict`` drops
+    entries idle for longer than ``max_idle`` and then the least recently used
+    ones until the payload total fits in ``max_bytes``.
+    """
+
+    def __init__(
+        self,
+        path: Path = CACHE_DIR / "metadata.sqlite",
+        ttl: float = 24 * 3600,
+        max_idle: float = 30 * 24 * 3600,
+        max_bytes: int = 64 * 1024 * 1024,
+    ) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.ttl = ttl
+        self.max_idle = max_idle
+        self.max_bytes = max_bytes
+        self.stats = CacheStats()
+        self._lock = threading.Lock()
+        # Sharded refreshes open the cache from several processes at once.
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        # WAL lets shard processes read while one writes; losing the last few
+        # commits on power failure only costs refetches, so skip per-commit fsync.
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(SCHEMA)
+        self._db.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+    def get(self, repo: str) -> CacheEntry | None:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT revision, etag, validated_at, payload FROM entries "
+                "WHERE repo = ? ORDER BY validated_at DESC LIMIT 1",
+                (repo,),
+            ).fetchone()
+            if row is None:
+                return None
+            self._db.execute(
+                "UPDATE entries SET accessed_at = ? WHERE repo = ? AND revision = ?",
+                (time.time(), repo, row[0]),
+            )
+            self._db.commit()
+        return CacheEntry(repo, row[0], row[1], row[2], json.loads(row[3]))
+
+    def is_fresh(self, entry: CacheEntry) -> bool:
+        return time.time() - entry.validated_at < self.ttl
+
+    def put(self, repo: str, revision: str, etag: str | None, payload: dict) -> None:
+        data = json.dumps(payload, sort_keys=True)
+        now = time.time()
+        with self._lock:
+            # Older revisions of the same repo can never be served again.
+            self._db.execute("DELETE FROM entries WHERE repo = ? AND revision != ?", (repo, revision))
+            self._db.execute(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (repo, revision, etag, now, now, len(data), data),
+            )
+            self._db.commit()
+
+    def touch(self, entry: CacheEntry) -> None:
+        """Mark ``entry`` as revalidated against upstream just now."""
+        entry.validated_at = time.time()
+        with self._lock:
+            self._db.execute(
+                "UPDATE entries SET validated_at = ? WHERE repo = ? AND revision = ?",
+                (entry.validated_at, entry.repo, entry.revision),
+            )
+            self._db.commit()
+
+    def evict(self) -> int:
+        with self._lock:
+            removed = self._db.execute(
+                "DELETE FROM entries WHERE accessed_at < ?", (time.time() - self.max_idle,)
+            ).rowcount
+            total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+            if total > self.max_bytes:
+                for repo, revision, size in self._db.execute(
+                    "SELECT repo, revision, size FROM entries ORDER BY accessed_at ASC"
+                ).fetchall():
+                    if total <= self.max_bytes:
+                        break
+                    self._db.execute("DELETE FROM entries WHERE repo = ? AND revision = ?", (repo, revision))
+                    total -= size
+                    removed += 1
+            self._db.commit()
+            self.stats.record("evicted", removed)
+        return removed
@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""Roofline throughput and latency estimates per model, SKU, precision and batch.
+
+Each VM is treated as one tensor-parallel replica across all of its GPUs. A
+decode step must stream the touched weights plus the batch's KV cache from HBM
+and perform ``2 * active_params`` FLOPs per token; it takes whichever of the
+two is slower. Prefill of a ``ctx``-token prompt is normally compute bound.
+MoE models use active parameters for compute and total parameters for memory
+capacity. Peak datasheet numbers are derated by the efficiency factors below.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+from sizing import (
+    BATCH_OPTIONS,
+    BYTES,
+    CTX_OPTIONS,
+    MODEL_BLOCK,
+    PRECISIONS,
+    kv_sequence_bytes,
+    load_inputs,
+)
+
+# Fraction of peak HBM bandwidth / tensor throughput reached in practice.
+MEMORY_EFFICIENCY = 0.8
+COMPUTE_EFFICIENCY = 0.5
+# Same allowance for activations and fragmentation as the fit estimate.
+OVERHEAD = 1.2
+# Concurrent sequences for rows with no per-token cache (pure SSMs), whose state
+# does not grow with context; matches vLLM's default ``max_num_seqs``.
+MAX_SEQUENCES = 256
+
+
+@dataclass
+class PerformanceGrid:
+    """Estimates indexed ``[model, precision, ctx, batch, sku]`` (SKUs in catalog order).
+
+    Cells where the model cannot hold even one sequence on the VM are zero.
+    Models without a KV cache are capped at ``MAX_SEQUENCES`` once the weights fit.
+    """
+
+    models: list[str]
+    precisions: tuple[str, ...]
+    ctx: tuple[int, ...]
+    batch: tuple[int, ...]
+    skus: list[dict]
+    decode_tokens_s: np.ndarray
+    ttft_s: np.ndarray
+    max_sequences: np.ndarray
+
+
+def _peak_tflops(sku: dict, precision: str) -> float:
+    # int8/int4 weights run on integer tensor cores; fp32 is approximated by the
+    # tf32 rate, which is half the fp16 rate on every family in the catalog.
+    if precision in ("int8", "int4"):
+        return sku["int8_tops"]
+    if precision == "fp32":
+        return sku["fp16_tflops"] / 2
+    return sku["fp16_tflops"]
+
+
+def _column(models: list[dict], field: str) -> np.ndarray:
+    return np.array([m[field] for m in models], dtype=np.float64)[:, None, None, None, None]
+
+
+def performance_grid(
+    models: list[dict],
+    skus: list[dict],
+    precisions: tuple[str, ...] = PRECISIONS,
+    ctx: tuple[int, ...] = CTX_OPTIONS,
+    batch: tuple[int, ...] = BATCH_OPTIONS,
+) -> PerformanceGrid:
+    bytes_ = np.array([BYTES[p] for p in precisions], dtype=np.float64)[None, :, None, None, None]
+    ctx_ = np.array(ctx, dtype=np.float64)[None, None, :, None, None]
+    batch_ = np.array(batch, dtype=np.float64)[None, None, None, :, None]
+    gpus = np.array([s["gpus_per_vm"] for s in skus], dtype=np.float64)
+    bandwidth = gpus * np.array([s["mem_bw_gbs"] for s in skus]) * 1e9 * MEMORY_EFFICIENCY
+    flops = gpus[None, :] * np.array([[_peak_tflops(s, p) for s in skus] for p in precisions]) * 1e12
+    flops = (flops * COMPUTE_EFFICIENCY)[None, :, None, None, :]
+    capacity = gpus * np.array([s["vram_gb"] for s in skus]) * 1e9 / OVERHEAD
+
+    shape = (len(models), len(precisions), len(ctx), len(batch), len(skus))
+    decode = np.zeros(shape)
+    ttft = np.zeros(shape)
+    max_seqs = np.zeros(shape, dtype=np.int64)
+    for start in range(0, len(models), MODEL_BLOCK):
+        block = models[start : start + MODEL_BLOCK]
+        params = _column(block, "params_b") * 1e9
+        ratio = _column(block, "moe_active_ratio")
+        active = np.where(ratio > 0, params * ratio, params)
+        layers, hidden = _column(block, "layers"), _column(block, "hidden")
+
+        weight_bytes = params * bytes_
+        kv_per_seq = kv_sequence_bytes(block, ctx_, bytes_)
+        # A batch of MoE tokens touches at most every expert, at least the active set.
+        touched = np.where(ratio > 0, np.minimum(1.0, ratio * batch_), 1.0)
+        step_memory = (weight_bytes * touched + kv_per_seq * batch_) / bandwidth
+        step_compute = 2 * active * batch_ / flops
+        step = np.maximum(step_memory, step_compute)
+
+        prefill_flops = batch_ * (2 * active * ctx_ + 2 * layers * ctx_ * ctx_ * hidden)
+        prefill = np.maximum(prefill_flops / flops, weight_bytes / bandwidth)
+
+        free = np.maximum(capacity - weight_bytes, 0)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            by_cache = np.floor(free / kv_per_seq)
+        seqs = np.where(kv_per_seq > 0, by_cache, np.where(free > 0, MAX_SEQUENCES, 0))
+        fits = seqs >= batch_
+        decode[start : start + len(block)] = np.where(fits, batch_ / step, 0)
+        ttft[start : start + len(block)] = np.where(fits, prefill, 0)
+        max_seqs[start : start + len(block)] = np.broadcast_to(seqs, (len(block), *shape[1:]))
+    return PerformanceGrid(
+        models=[m["model_id"] for m in models],
+        precisions=tuple(precisions),
+        ctx=tuple(ctx),
+        batch=tuple(batch),
+        skus=skus,
+        decode_tokens_s=decode,
+        ttft_s=ttft,
+        max_sequences=max_seqs,
+    )
+
+
+def sku_cost(sku: dict, prices: dict[str, float] | None = None) -> tuple[float, float, str]:
+    """Sort key for "cheapest": hourly price when known, else total VRAM as a proxy."""
+    price = (prices or {}).get(sku["sku"], sku.get("price_per_hour"))
+    return (price if price is not None else float("inf"), sku["gpus_per_vm"] * sku["vram_gb"], sku["sku"])
+
+
+def cheapest_skus(
+    model: dict,
+    skus: list[dict],
+    precision: str,
+    ctx: int,
+    batch: int,
+    min_tokens_s: float,
+    prices: dict[str, float] | None = None,
+) -> list[dict]:
+    """Rank SKUs whose VM sustains ``min_tokens_s`` decode tokens/s at ``batch``."""
+    grid = performance_grid([model], skus, (precision,), (ctx,), (batch,))
+    results = [
+        {
+            "sku": sku["sku"],
+            "gpu_model": sku["gpu_model"],
+            "gpus_per_vm": sku["gpus_per_vm"],
+            "decode_tokens_s": float(grid.decode_tokens_s[0, 0, 0, 0, i]),
+            "ttft_s": float(grid.ttft_s[0, 0, 0, 0, i]),
+            "max_sequences": int(grid.max_sequences[0, 0, 0, 0, i]),
+        }
+        for i, sku in enumerate(skus)
+        if grid.decode_tokens_s[0, 0, 0, 0, i] >= min_tokens_s and grid.decode_tokens_s[0, 0, 0, 0, i] > 0
+    ]
+    by_name = {sku["sku"]: sku for sku in skus}
+    return sorted(results, key=lambda r: sku_cost(by_name[r["sku"]], prices))
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("model_id")
+    parser.add_argument("--precision", default="fp16", choices=PRECISIONS)
+    parser.add_argument("--ctx", type=int, default=4096)
+    parser.add_argument("--batch", type=int, default=1)
+    parser.add_argument("--min-tokens", type=float, default=0.0, help="required decode tokens/s per VM")
+    parser.add_argument("--prices", type=Path, help="JSON object of SKU name -> hourly price")
+    args = parser.parse_args(argv)
+
+    models, skus = load_inputs()
+    model = next((m for m in models if m["model_id"] == args.model_id), None)
+    if model is None:
+        parser.error(f"unknown model {args.model_id}")
+    prices = json.loads(args.prices.read_text()) if args.prices else None
+    ranked = cheapest_skus(model, skus, args.precision, args.ctx, args.batch, args.min_tokens, prices)
+    if not ranked:
+        print("No single VM meets the requested throughput")
+    for r in ranked:
+        print(
+            f"{r['sku']:<28} {r['gpus_per_vm']}x{r['gpu_model']:<5} "
+            f"{r['decode_tokens_s']:>9.1f} tok/s  TTFT {r['ttft_s'] * 1000:>8.1f} ms  "
+            f"max {r['max_sequences']} seqs"
+        )
+
+
+if __name__ == "__main__":
+    main()
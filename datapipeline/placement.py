@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""Multi-VM tensor/pipeline-parallel placement over the SKU catalog.
+
+``estimateWithSku`` only accepts a single VM. This solver also considers layouts
+that split a model into ``pp`` pipeline stages of ``tp`` tensor-parallel GPUs and
+spread them over several VMs of one SKU. Tensor parallelism stays inside a VM
+(it needs NVLink-class bandwidth); pipeline stages may cross VMs. Layers are
+split evenly between stages, so a stage holds ``ceil(layers / pp)`` of them.
+
+Layouts are ranked by: multi-VM layouts without RDMA last, then cost (VM count
+times the hourly price, or total VRAM per VM without prices), then GPU count.
+Within a SKU the solver picks the fewest VMs, then the fewest pipeline stages.
+"""
+
+from __future__ import annotations
+
+import argparse
+import bisect
+import json
+import math
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+from sizing import PRECISIONS, estimate, kv_inputs, load_inputs
+
+# Largest number of VMs a single replica may span.
+MAX_NODES = 16
+
+
+@dataclass(frozen=True)
+class Placement:
+    sku: dict
+    tp: int
+    pp: int
+    nodes: int
+    total_gb: float
+    per_gpu_gb: float
+
+    @property
+    def gpus(self) -> int:
+        return self.tp * self.pp
+
+    @property
+    def rdma(self) -> bool:
+        return bool(self.sku.get("rdma_enabled"))
+
+
+def _unit_cost(sku: dict, prices: dict[str, float] | None) -> float:
+    price = (prices or {}).get(sku["sku"], sku.get("price_per_hour"))
+    return price if price is not None else sku["gpus_per_vm"] * sku["vram_gb"]
+
+
+def _tp_options(gpus_per_vm: int) -> list[int]:
+    """Power-of-two TP degrees that divide the VM, largest first."""
+    options = []
+    tp = 1
+    while tp <= gpus_per_vm:
+        if gpus_per_vm % tp == 0:
+            options.append(tp)
+        tp *= 2
+    return options[::-1]
+
+
+class PlacementSolver:
+    """Answer placement queries against one catalog.
+
+    SKUs are indexed once by VRAM per VM, so each query bisects past every SKU
+    that cannot hold the model even at ``max_nodes`` VMs, then visits the rest
+    in order of their cost lower bound and stops once no SKU can beat the best
+    layout found so far.
+    """
+
+    def __init__(self, skus: list[dict], prices: dict[str, float] | None = None, max_nodes: int = MAX_NODES):
+        self.max_nodes = max_nodes
+        usable = [s for s in skus if s["gpus_per_vm"] > 0 and s["vram_gb"] > 0]
+        self._skus = sorted(usable, key=lambda s: s["gpus_per_vm"] * s["vram_gb"])
+        self._capacity = [s["gpus_per_vm"] * s["vram_gb"] for s in self._skus]
+        self._cost = [_unit_cost(s, prices) for s in self._skus]
+        self._tp = [_tp_options(s["gpus_per_vm"]) for s in self._skus]
+
+    def solve(
+        self,
+        params_b: float,
+        layers: int,
+        hidden: int,
+        ctx: int,
+        batch: int,
+        precision: str,
+        training: bool = False,
+        **kv: float | None,
+    ) -> Placement | None:
+        """``kv`` takes the model row's ``sizing.KV_FIELDS`` (see ``sizing.kv_inputs``)."""
+        total = estimate(params_b, layers, hidden, ctx, batch, precision, training, **kv)["total_gb"]
+        start = bisect.bisect_left(self._capacity, total / self.max_nodes)
+        bounds = []
+        for i in range(start, len(self._skus)):
+            min_nodes = math.ceil(total / self._capacity[i])
+            penalty = min_nodes > 1 and not self._skus[i].get("rdma_enabled")
+            bounds.append(((penalty, min_nodes * self._cost[i]), i))
+        bounds.sort()
+
+        best = best_key = None
+        for bound, i in bounds:
+            if best_key is not None and bound > best_key[:2]:
+                break
+            found = self._layout(i, total, layers)
+            if found is None:
+                continue
+            key = (found.nodes > 1 and not found.rdma, found.nodes * self._cost[i], found.gpus, found.sku["sku"])
+            if best_key is None or key < best_key:
+                best, best_key = found, key
+        return best
+
+    def _layout(self, i: int, total: float, layers: int) -> Placement | None:
+        sku = self._skus[i]
+        gpus_per_vm, vram = sku["gpus_per_vm"], sku["vram_gb"]
+        best = None
+        for tp in self._tp[i]:
+            pp = max(1, math.ceil(total / (tp * vram)))
+            # Uneven layer splits leave the first stages a little heavier.
+            while pp <= layers and total * math.ceil(layers / pp) / layers / tp > vram:
+                pp += 1
+            if pp > layers:
+                continue
+            nodes = math.ceil(tp * pp / gpus_per_vm)
+            if nodes > self.max_nodes:
+                continue
+            if best is None or (nodes, pp, tp) < (best.nodes, best.pp, best.tp):
+                per_gpu = total * math.ceil(layers / pp) / layers / tp
+                best = Placement(sku=sku, tp=tp, pp=pp, nodes=nodes, total_gb=total, per_gpu_gb=per_gpu)
+        return best
+
+
+def solve_catalog(
+    models: list[dict],
+    skus: list[dict],
+    precision: str = "fp16",
+    ctx: int = 4096,
+    batch: int = 1,
+    training: bool = False,
+    prices: dict[str, float] | None = None,
+    max_nodes: int = MAX_NODES,
+) -> dict[str, Placement | None]:
+    solver = PlacementSolver(skus, prices, max_nodes)
+    return {
+        m["model_id"]: solver.solve(
+            m["params_b"], m["layers"], m["hidden"], ctx, batch, precision, training, **kv_inputs(m)
+        )
+        for m in models
+    }
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("model_id", nargs="?", help="solve one model (default: the whole catalog)")
+    parser.add_argument("--precision", default="fp16", choices=PRECISIONS)
+    parser.add_argument("--ctx", type=int, default=4096)
+    parser.add_argument("--batch", type=int, default=1)
+    parser.add_argument("--training", action="store_true")
+    parser.add_argument("--max-nodes", type=int, default=MAX_NODES)
+    parser.add_argument("--prices", type=Path, help="JSON object of SKU name -> hourly price")
+    args = parser.parse_args(argv)
+
+    models, skus = load_inputs()
+    if args.model_id:
+        models = [m for m in models if m["model_id"] == args.model_id]
+        if not models:
+            parser.error(f"unknown model {args.model_id}")
+    prices = json.loads(args.prices.read_text()) if args.prices else None
+    started = time.perf_counter()
+    placements = solve_catalog(models, skus, args.precision, args.ctx, args.batch, args.training, prices, args.max_nodes)
+    elapsed = time.perf_counter() - started
+    for model_id, p in placements.items():
+        if p is None:
+            print(f"{model_id:<48} no placement within {args.max_nodes} VMs")
+            continue
+        print(
+            f"{model_id:<48} {p.nodes}x {p.sku['sku']:<26} TP={p.tp} PP={p.pp} "
+            f"{p.per_gpu_gb:>6.1f}/{p.sku['vram_gb']} GB per GPU{'  RDMA' if p.nodes > 1 and p.rdma else ''}"
+        )
+    print(f"Solved {len(placements)} models in {elapsed * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
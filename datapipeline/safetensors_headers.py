@@ -0,0 +1,77 @@
+"""Exact per-dtype weight sizes from safetensors headers, read with HTTP ranges.
+
+A safetensors file starts with an 8-byte little-endian header length followed by
+a JSON header describing every tensor's dtype and byte span. Reading those few
+kilobytes per shard gives exact on-disk weight sizes, including quantized and
+mixed-dtype checkpoints, without downloading any weights.
+"""
+
+from __future__ import annotations
+
+import json
+import struct
+from collections import Counter
+
+import instrumentation
+from hub_http import HubClient
+from huggingface_hub.utils import EntryNotFoundError
+
+INDEX_FILE = "model.safetensors.index.json"
+SINGLE_FILE = "model.safetensors"
+# First read covers the length prefix and, for almost every checkpoint, the whole
+# header; larger headers cost one more ranged read.
+SPECULATIVE_BYTES = 100_000
+# Largest header the safetensors format accepts; the length prefix is untrusted.
+MAX_HEADER_BYTES = 100_000_000
+
+
+def read_header(client: HubClient, repo: str, filename: str, revision: str | None = None) -> dict:
+    url = client.file_url(repo, filename, revision)
+    head = client.read_range(url, 0, SPECULATIVE_BYTES)
+    if len(head) < 8:
+        raise ValueError(f"{repo}/{filename}: truncated safetensors file")
+    (size,) = struct.unpack("<Q", head[:8])
+    if size > MAX_HEADER_BYTES:
+        raise ValueError(f"{repo}/{filename}: header of {size} bytes exceeds {MAX_HEADER_BYTES}")
+    raw = head[8 : 8 + size]
+    if len(raw) < size:
+        raw += client.read_range(url, 8 + len(raw), size - len(raw))
+    return json.loads(raw)
+
+
+def shard_files(client: HubClient, repo: str, revision: str | None = None) -> list[str]:
+    """Return the safetensors shards of ``repo``, in index order."""
+    try:
+        index = client.get_file(repo, INDEX_FILE, revision).json()
+    except EntryNotFoundError:
+        return [SINGLE_FILE]
+    return list(dict.fromkeys(index.get("weight_map", {}).values()))
+
+
+def tensor_bytes_by_dtype(header: dict) -> Counter[str]:
+    totals: Counter[str] = Counter()
+    for name, tensor in header.items():
+        if name == "__metadata__":
+            continue
+        start, end = tensor["data_offsets"]
+        totals[tensor["dtype"]] += end - start
+    return totals
+
+
+def fetch_weight_bytes(client: HubClient, repo: str, revision: str | None = None) -> dict[str, int] | None:
+    """Sum tensor bytes per dtype across every shard of ``repo``.
+
+    Returns None when ``revision`` has no safetensors files or an unreadable
+    header, both of which hold for as long as the revision does. Other Hub
+    errors are transient and propagate, so callers can retry them later.
+    """
+    try:
+        totals: Counter[str] = Counter()
+        for filename in shard_files(client, repo, revision):
+            totals += tensor_bytes_by_dtype(read_header(client, repo, filename, revision))
+    except EntryNotFoundError:
+        return None
+    except ValueError as e:
+        instrumentation.error(f"Failed to read {repo} safetensors headers: {e}")
+        return None
+    return dict(sorted(totals.items()))
@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""Vectorized port of the UI sizing formulas and the precomputed fit table.
+
+The formulas mirror ``estimate`` / ``estimateWithSku`` in ``src/estimator.ts``
+operation for operation, so both sides produce bit-identical floats. ``fit_grid``
+evaluates them for every model x precision x ctx x batch combination at once
+and picks the same SKU the UI would.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import math
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+
+DATA_DIR = Path(__file__).resolve().parents[1] / "data"
+MODELS_FILE = DATA_DIR / "models.json"
+SKUS_FILE = DATA_DIR / "azure-gpus.json"
+FIT_TABLE_FILE = DATA_DIR / "fit-table.json"
+
+BYTES = {"fp32": 4, "fp16": 2, "bf16": 2, "int8": 1, "int4": 0.5}
+# Same choices the UI offers (src/App.tsx).
+PRECISIONS = ("fp16", "bf16", "fp32", "int8", "int4")
+CTX_OPTIONS = (1024, 2048, 4096, 8192, 16384, 32768, 65536, 131072, 262144)
+BATCH_OPTIONS = (1, 2, 4, 8, 16, 32, 64)
+# Models evaluated per block, bounding the (models, P, C, B, SKUs) temporary.
+MODEL_BLOCK = 256
+# Optional model row fields describing the KV cache (see update_models.kv_fields).
+KV_FIELDS = ("kv_bytes_per_token", "kv_window_bytes_per_token", "sliding_window")
+
+
+def kv_inputs(model: dict) -> dict:
+    """The KV cache fields of a model row, as keyword arguments for ``estimate``."""
+    return {field: model.get(field) for field in KV_FIELDS}
+
+
+def estimate(
+    params_b: float,
+    layers: int,
+    hidden: int,
+    ctx: int,
+    batch: int,
+    precision: str,
+    training: bool = False,
+    kv_bytes_per_token: float | None = None,
+    kv_window_bytes_per_token: float | None = None,
+    sliding_window: int | None = None,
+) -> dict:
+    bytes_ = BYTES[precision]
+    weights = (params_b * 1e9 * bytes_) / 1e9
+    if kv_bytes_per_token is None:
+        # No attention shape known: one key and one value of width ``hidden`` per layer.
+        kv = (2 * layers * ctx * hidden * bytes_ * batch) / 1e9
+    else:
+        # The per-token costs are for a 16-bit cache.
+        window_tokens = min(ctx, sliding_window) if sliding_window else 0
+        per_seq = kv_bytes_per_token * ctx + (kv_window_bytes_per_token or 0) * window_tokens
+        kv = (per_seq * bytes_ / 2 * batch) / 1e9
+    opt = 2.5 * weights if training else 0
+    total = 1.2 * (weights + kv + opt)
+    return {"weights_gb": weights, "kv_gb": kv, "total_gb": total}
+
+
+def estimate_with_sku(
+    params_b: float,
+    layers: int,
+    hidden: int,
+    ctx: int,
+    batch: int,
+    precision: str,
+    skus: list[dict],
+    training: bool = False,
+    **kv: float | None,
+) -> dict:
+    base = estimate(params_b, layers, hidden, ctx, batch, precision, training, **kv)
+    for sku in sorted(skus, key=lambda s: s["vram_gb"]):
+        gpus = math.ceil(base["total_gb"] / sku["vram_gb"])
+        if gpus <= sku["gpus_per_vm"]:
+            return {**base, "gpus": gpus, "sku": sku}
+    return {**base, "gpus": 0, "sku": None}
+
+
+@dataclass
+class FitGrid:
+    """Sizing results indexed ``[model, precision, ctx, batch]``.
+
+    ``sku_index`` points into ``skus`` (catalog order) and is -1 where no single
+    VM fits; ``gpus`` is 0 in that case, as in ``estimateWithSku``.
+    """
+
+    models: list[str]
+    precisions: tuple[str, ...]
+    ctx: tuple[int, ...]
+    batch: tuple[int, ...]
+    skus: list[dict]
+    total_gb: np.ndarray
+    sku_index: np.ndarray
+    gpus: np.ndarray
+
+    def lookup(self, model_id: str, precision: str, ctx: int, batch: int) -> tuple[dict | None, int]:
+        key = (self.models.index(model_id), self.precisions.index(precision), self.ctx.index(ctx), self.batch.index(batch))
+        index = int(self.sku_index[key])
+        return (self.skus[index] if index >= 0 else None), int(self.gpus[key])
+
+
+def _column(models: list[dict], field: str) -> np.ndarray:
+    return np.array([m[field] for m in models], dtype=np.float64)[:, None, None, None]
+
+
+def kv_sequence_bytes(models: list[dict], ctx: np.ndarray, bytes_: np.ndarray) -> np.ndarray:
+    """KV cache bytes of one ``ctx``-token sequence, per model along the first axis.
+
+    Same arithmetic as ``estimate`` (before the batch factor); rows without
+    ``kv_bytes_per_token`` use the ``2 * layers * hidden`` fallback.
+    """
+    shape = (len(models),) + (1,) * (max(np.ndim(ctx), np.ndim(bytes_)) - 1)
+
+    def column(field: str, missing: float) -> np.ndarray:
+        values = [missing if m.get(field) is None else m[field] for m in models]
+        return np.array(values, dtype=np.float64).reshape(shape)
+
+    per_token = column("kv_bytes_per_token", np.nan)
+    window = column("sliding_window", 0)
+    window_tokens = np.where(window > 0, np.minimum(ctx, window), 0)
+    derived = (per_token * ctx + column("kv_window_bytes_per_token", 0) * window_tokens) * bytes_ / 2
+    legacy = 2 * column("layers", 0) * ctx * column("hidden", 0) * bytes_
+    return np.where(np.isnan(per_token), legacy, derived)
+
+
+def total_gb_grid(
+    models: list[dict],
+    precisions: tuple[str, ...] = PRECISIONS,
+    ctx: tuple[int, ...] = CTX_OPTIONS,
+    batch: tuple[int, ...] = BATCH_OPTIONS,
+    training: bool = False,
+) -> np.ndarray:
+    bytes_ = np.array([BYTES[p] for p in precisions], dtype=np.float64)[None, :, None, None]
+    ctx_ = np.array(ctx, dtype=np.float64)[None, None, :, None]
+    batch_ = np.array(batch, dtype=np.float64)[None, None, None, :]
+    weights = (_column(models, "params_b") * 1e9 * bytes_) / 1e9
+    kv = (kv_sequence_bytes(models, ctx_, bytes_) * batch_) / 1e9
+    opt = 2.5 * weights if training else 0
+    total = 1.2 * (weights + kv + opt)
+    return np.broadcast_to(total, (len(models), len(precisions), len(ctx), len(batch)))
+
+
+def fit_grid(
+    models: list[dict],
+    skus: list[dict],
+    precisions: tuple[str, ...] = PRECISIONS,
+    ctx: tuple[int, ...] = CTX_OPTIONS,
+    batch: tuple[int, ...] = BATCH_OPTIONS,
+    training: bool = False,
+) -> FitGrid:
+    total = total_gb_grid(models, precisions, ctx, batch, training)
+    # Stable sort so equal-VRAM SKUs keep catalog order, like Array.prototype.sort.
+    order = np.argsort(np.array([s["vram_gb"] for s in skus], dtype=np.float64), kind="stable")
+    vram = np.array([skus[i]["vram_gb"] for i in order], dtype=np.float64)
+    per_vm = np.array([skus[i]["gpus_per_vm"] for i in order], dtype=np.float64)
+
+    sku_index = np.full(total.shape, -1, dtype=np.int16)
+    gpus = np.zeros(total.shape, dtype=np.int32)
+    for start in range(0, len(models), MODEL_BLOCK):
+        block = total[start : start + MODEL_BLOCK, ..., None]
+        needed = np.ceil(block / vram)
+        fits = needed <= per_vm
+        first = fits.argmax(axis=-1)
+        found = fits.any(axis=-1)
+        chosen = np.take_along_axis(needed, first[..., None], axis=-1)[..., 0]
+        sku_index[start : start + MODEL_BLOCK] = np.where(found, order[first], -1)
+        gpus[start : start + MODEL_BLOCK] = np.where(found, chosen, 0)
+    return FitGrid(
+        models=[m["model_id"] for m in models],
+        precisions=tuple(precisions),
+        ctx=tuple(ctx),
+        batch=tuple(batch),
+        skus=skus,
+        total_gb=np.ascontiguousarray(total),
+        sku_index=sku_index,
+        gpus=gpus,
+    )
+
+
+def fit_table(grid: FitGrid) -> dict:
+    """Compact lookup form: axis values plus flat row-major index arrays."""
+    return {
+        "version": 1,
+        "axes": ["model", "precision", "ctx", "batch"],
+        "models": grid.models,
+        "precisions": list(grid.precisions),
+        "ctx": list(grid.ctx),
+        "batch": list(grid.batch),
+        "skus": [s["sku"] for s in grid.skus],
+        "sku_index": grid.sku_index.ravel().tolist(),
+        "gpus": grid.gpus.ravel().tolist(),
+    }
+
+
+def load_inputs(models_file: Path = MODELS_FILE, skus_file: Path = SKUS_FILE) -> tuple[list[dict], list[dict]]:
+    return json.loads(models_file.read_text()), json.loads(skus_file.read_text())
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--output", type=Path, default=FIT_TABLE_FILE)
+    parser.add_argument("--training", action="store_true", help="include optimizer state as in the UI's training mode")
+    args = parser.parse_args(argv)
+    models, skus = load_inputs()
+    grid = fit_grid(models, skus, training=args.training)
+    args.output.write_text(json.dumps(fit_table(grid), separators=(",", ":")))
+    print(f"Wrote {args.output} ({grid.sku_index.size} configurations)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+"""Local HTTP/JSON service answering "which SKU fits" queries.
+
+``data/models.json`` and ``data/azure-gpus.json`` are loaded once and answered
+from with the ``estimate`` / ``estimate_with_sku`` formulas in ``sizing.py``.
+Computed fits are kept in an LRU cache that belongs to the loaded dataset. The
+files are polled; when either changes, both are read again and swapped in as one
+new dataset (with an empty cache), so a request never mixes old and new data. A
+dataset that fails to load leaves the current one serving.
+
+Endpoints (HTTP/1.1, keep-alive):
+
+- ``GET /fit?model=<id>&precision=fp16&ctx=4096&batch=1&training=0``
+- ``POST /fit`` with one query object, or ``{"queries": [...]}`` for a batch. Each
+  query in a batch gets its own result or ``{"error": ...}``.
+- ``GET /health``: dataset size, reload count and cache statistics.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import functools
+import json
+import sys
+import time
+from pathlib import Path
+from urllib.parse import parse_qsl, urlsplit
+
+import instrumentation
+from sizing import BYTES, MODELS_FILE, SKUS_FILE, estimate_with_sku, kv_inputs
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+CACHE_SIZE = 65536
+POLL_INTERVAL = 1.0
+MAX_BODY = 1 << 20
+MAX_BATCH = 10000
+REASONS = {
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    413: "Payload Too Large",
+    500: "Internal Server Error",
+}
+
+
+class QueryError(ValueError):
+    def __init__(self, message: str, status: int = 400) -> None:
+        super().__init__(message)
+        self.status = status
+
+
+def _file_version(paths: tuple[Path, ...]) -> tuple:
+    stats = [p.stat() for p in paths]
+    return tuple((s.st_mtime_ns, s.st_size) for s in stats)
+
+
+def parse_query(query: dict) -> tuple[str, str, int, int, bool]:
+    """Normalize a query to the cache key ``(model, precision, ctx, batch, training)``."""
+    if not isinstance(query, dict) or not query.get("model"):
+        raise QueryError("query needs a model")
+    precision = query.get("precision", "fp16")
+    if precision not in BYTES:
+        raise QueryError(f"precision must be one of {', '.join(BYTES)}")
+    try:
+        ctx = int(query.get("ctx", 4096))
+        batch = int(query.get("batch", 1))
+    except (TypeError, ValueError):
+        raise QueryError("ctx and batch must be integers") from None
+    if ctx <= 0 or batch <= 0:
+        raise QueryError("ctx and batch must be positive")
+    training = str(query.get("training", False)).lower() in ("1", "true")
+    return str(query["model"]), precision, ctx, batch, training
+
+
+class Dataset:
+    """One immutable load of the data files and the fits computed from it."""
+
+    def __init__(self, models: list[dict], skus: list[dict], version: tuple, cache_size: int = CACHE_SIZE) -> None:
+        self.models = {m["model_id"]: m for m in models}
+        # Pre-sorted once; estimate_with_sku's own sort is then a linear pass.
+        self.skus = sorted(skus, key=lambda s: s["vram_gb"])
+        self.version = version
+        self.loaded_at = time.time()
+        self.fit = functools.lru_cache(maxsize=cache_size)(self._fit)
+
+    def _fit(self, model_id: str, precision: str, ctx: int, batch: int, training: bool) -> dict:
+        model = self.models.get(model_id)
+        if model is None:
+            raise QueryError(f"unknown model {model_id}", 404)
+        fit = estimate_with_sku(
+            model["params_b"], model["layers"], model["hidden"], ctx, batch, precision, self.skus, training,
+            **kv_inputs(model),
+        )
+        return {
+            "model": model_id,
+            "precision": precision,
+            "ctx": ctx,
+            "batch": batch,
+            "training": training,
+            **fit,
+            "sku": fit["sku"]["sku"] if fit["sku"] else None,
+        }
+
+
+def load_dataset(models_file: Path, skus_file: Path, cache_size: int = CACHE_SIZE) -> Dataset:
+    paths = (models_file, skus_file)
+    version = _file_version(paths)
+    models, skus = json.loads(models_file.read_text()), json.loads(skus_file.read_text())
+    if _file_version(paths) != version:
+        raise RuntimeError("data files changed while loading")
+    return Dataset(models, skus, version, cache_size)
+
+
+class SizingService:
+    def __init__(
+        self,
+        models_file: Path = MODELS_FILE,
+        skus_file: Path = SKUS_FILE,
+        cache_size: int = CACHE_SIZE,
+        poll_interval: float = POLL_INTERVAL,
+    ) -> None:
+        self.paths = (models_file, skus_file)
+        self.cache_size = cache_size
+        self.poll_interval = poll_interval
+        self.dataset = load_dataset(models_file, skus_file, cache_size)
+        self.reloads = 0
+        self._watcher: asyncio.Task | None = None
+
+    async def reload_if_changed(self) -> bool:
+        """Swap in a fresh dataset if either file changed; keep serving the old one on failure."""
+        try:
+            if _file_version(self.paths) == self.dataset.version:
+                return False
+            dataset = await asyncio.to_thread(load_dataset, *self.paths, self.cache_size)
+        except Exception as exc:  # noqa: BLE001
+            # Typically a file caught mid-write; the next poll retries. Anything else
+            # must not end the watcher either.
+            instrumentation.error(f"Reload failed, still serving the previous data: {exc}")
+            return False
+        self.dataset = dataset
+        self.reloads += 1
+        print(f"Reloaded {len(dataset.models)} models and {len(dataset.skus)} SKUs", file=sys.stderr)
+        return True
+
+    async def _watch(self) -> None:
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            await self.reload_if_changed()
+
+    def fit(self, query: dict, dataset: Dataset) -> dict:
+        return dataset.fit(*parse_query(query))
+
+    def respond(self, method: str, target: str, body: bytes) -> tuple[int, object]:
+        url = urlsplit(target)
+        dataset = self.dataset  # one dataset for the whole request, even across a reload
+        if url.path == "/health":
+            info = dataset.fit.cache_info()
+            return 200, {
+                "models": len(dataset.models),
+                "skus": len(dataset.skus),
+                "loaded_at": dataset.loaded_at,
+                "reloads": self.reloads,
+                "cache": {"hits": info.hits, "misses": info.misses, "size": info.currsize, "max": info.maxsize},
+            }
+        if url.path != "/fit":
+            return 404, {"error": f"no route {url.path}"}
+        try:
+            if method == "GET":
+                return 200, self.fit(dict(parse_qsl(url.query)), dataset)
+            if method != "POST":
+                return 405, {"error": "use GET or POST"}
+            try:
+                payload = json.loads(body)
+            except ValueError:
+                raise QueryError("body must be JSON") from None
+            if not (isinstance(payload, dict) and "queries" in payload):
+                return 200, self.fit(payload, dataset)
+            queries = payload["queries"]
+            if not isinstance(queries, list):
+                raise QueryError("queries must be a list")
+            if len(queries) > MAX_BATCH:
+                raise QueryError(f"at most {MAX_BATCH} queries per batch", 413)
+        except QueryError as exc:
+            return exc.status, {"error": str(exc)}
+        results = []
+        for query in queries:
+            try:
+                results.append(self.fit(query, dataset))
+            except QueryError as exc:
+                results.append({"error": str(exc)})
+        return 200, {"results": results}
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                method, target, _ = request_line.decode("latin-1").split(" ", 2)
+                headers = {}
+                while (line := await reader.readline()) not in (b"\r\n", b"\n", b""):
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                length = int(headers.get("content-length") or 0)
+                keep_alive = headers.get("connection", "").lower() != "close"
+                if length > MAX_BODY:
+                    status, payload = 413, {"error": f"body over {MAX_BODY} bytes"}
+                    keep_alive = False
+                else:
+                    body = await reader.readexactly(length) if length else b""
+                    try:
+                        status, payload = self.respond(method, target, body)
+                    except Exception as exc:  # noqa: BLE001
+                        # A malformed model or SKU row; answer instead of dropping the connection.
+                        instrumentation.error(f"{method} {target} failed: {exc!r}")
+                        status, payload = 500, {"error": "internal error"}
+                data = json.dumps(payload, separators=(",", ":")).encode()
+                head = (
+                    f"HTTP/1.1 {status} {REASONS[status]}\r\n"
+                    "Content-Type: application/json\r\n"
+                    f"Content-Length: {len(data)}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+                )
+                writer.write(head.encode() + data)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def start(self, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT) -> asyncio.Server:
+        """Listen and start polling the data files; ``port=0`` picks a free port."""
+        server = await asyncio.start_server(self._handle, host, port)
+        self._watcher = asyncio.create_task(self._watch())
+        return server
+
+    async def stop(self) -> None:
+        if self._watcher:
+            self._watcher.cancel()
+
+
+async def _serve(service: SizingService, host: str, port: int) -> None:
+    server = await service.start(host, port)
+    bound = server.sockets[0].getsockname()
+    print(f"Serving {len(service.dataset.models)} models on http://{bound[0]}:{bound[1]}", file=sys.stderr)
+    async with server:
+        await server.serve_forever()
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--models", type=Path, default=MODELS_FILE)
+    parser.add_argument("--skus", type=Path, default=SKUS_FILE)
+    parser.add_argument("--cache-size", type=int, default=CACHE_SIZE, help="fits kept in the LRU cache")
+    parser.add_argument("--poll", type=float, default=POLL_INTERVAL, help="seconds between data file checks")
+    args = parser.parse_args(argv)
+    service = SizingService(args.models, args.skus, args.cache_size, args.poll)
+    try:
+        asyncio.run(_serve(service, args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
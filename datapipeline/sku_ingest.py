@@ -0,0 +1,127 @@
+"""Stream per-region ``az vm list-skus`` dumps into one deduplicated SKU catalog.
+
+A dump is a JSON array with one object per SKU and region. Objects are decoded
+one at a time from fixed-size chunks, so memory is bounded by the largest single
+SKU rather than by the dump, and each dump is parsed in its own process.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+from collections.abc import Iterator
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+CHUNK_SIZE = 64 * 1024
+_decoder = json.JSONDecoder()
+
+
+def iter_json_array(path: Path, chunk_size: int = CHUNK_SIZE) -> Iterator[dict]:
+    """Yield the elements of the top-level JSON array in ``path`` one by one."""
+    with path.open() as fh:
+        buffer = ""
+        pos = 0
+        started = False
+        eof = False
+        while True:
+            # Skip whitespace and separators between elements.
+            while pos < len(buffer) and buffer[pos] in " \t\r\n,":
+                pos += 1
+            if pos < len(buffer):
+                if not started:
+                    if buffer[pos] != "[":
+                        raise ValueError(f"{path}: expected a JSON array")
+                    started = True
+                    pos += 1
+                    continue
+                if buffer[pos] == "]":
+                    return
+                try:
+                    item, end = _decoder.raw_decode(buffer, pos)
+                except json.JSONDecodeError as exc:
+                    if eof:
+                        raise ValueError(f"{path}: truncated or malformed JSON array ({exc.msg})") from exc
+                else:
+                    yield item
+                    pos = end
+                    continue
+            elif eof:
+                if not started:
+                    return
+                raise ValueError(f"{path}: truncated or malformed JSON array")
+            chunk = fh.read(chunk_size)
+            eof = not chunk
+            buffer = buffer[pos:] + chunk
+            pos = 0
+
+
+def _available_zones(info: dict, restrictions: list[dict], region: str) -> list[str]:
+    blocked = {
+        zone
+        for r in restrictions
+        if r.get("type") == "Zone"
+        for loc in (r.get("restrictionInfo") or {}).get("locations") or []
+        if loc.lower() == region
+        for zone in (r.get("restrictionInfo") or {}).get("zones") or []
+    }
+    return sorted(set(info.get("zones") or []) - blocked)
+
+
+def reduce_sku(item: dict) -> dict:
+    """Keep what the catalog needs, with capabilities indexed by name once."""
+    restrictions = item.get("restrictions") or []
+    regions = {}
+    for info in item.get("locationInfo") or []:
+        region = info["location"].lower()
+        reasons = sorted(
+            {
+                r.get("reasonCode") or "Restricted"
+                for r in restrictions
+                if r.get("type") == "Location" and region in (v.lower() for v in r.get("values") or [])
+            }
+        )
+        regions[region] = {"zones": _available_zones(info, restrictions, region), "restrictions": reasons}
+    return {
+        "name": item.get("name"),
+        "family": item.get("family"),
+        "tier": item.get("tier"),
+        "size": item.get("size"),
+        "capabilities": {cap.get("name"): cap.get("value") for cap in item.get("capabilities") or []},
+        "regions": regions,
+    }
+
+
+def parse_dump(path: Path) -> list[dict]:
+    return [reduce_sku(item) for item in iter_json_array(path) if item.get("resourceType", "virtualMachines") == "virtualMachines"]
+
+
+def merge_skus(reduced: list[list[dict]]) -> list[dict]:
+    """Deduplicate SKUs across dumps, union their regions and sort by name.
+
+    Capabilities come from the first dump (in the given order) listing the SKU;
+    Azure reports the same values in every region.
+    """
+    merged: dict[str, dict] = {}
+    for dump in reduced:
+        for sku in dump:
+            existing = merged.setdefault(sku["name"], {**sku, "regions": {}})
+            existing["regions"].update(sku["regions"])
+    for sku in merged.values():
+        sku["regions"] = dict(sorted(sku["regions"].items()))
+    return [merged[name] for name in sorted(merged)]
+
+
+def load_catalog(paths: list[Path], workers: int | None = None) -> list[dict]:
+    """Parse ``paths`` in parallel (one process per dump) and merge them."""
+    paths = sorted(paths)
+    workers = min(len(paths), workers or os.cpu_count() or 1)
+    if workers <= 1:
+        return merge_skus([parse_dump(path) for path in paths])
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return merge_skus(list(pool.map(parse_dump, paths)))
+
+
+def available_regions(sku: dict) -> list[str]:
+    """Regions where the SKU can be deployed by this subscription."""
+    return [region for region, info in sku["regions"].items() if not info["restrictions"]]
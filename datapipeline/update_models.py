@@ -3,14 +3,28 @@
 
 from __future__ import annotations
 
+import argparse
+import hashlib
 import json
+import os
+import sys
+import time
+from collections import defaultdict
+from collections.abc import Callable
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass
 from pathlib import Path
 
-from huggingface_hub import HfApi, hf_hub_download
+import httpx
+import instrumentation
+from change_feed import change_feed_path, changes_since, save_cursor
+from checkpoint import CheckpointJournal
+from hub_http import HubClient, response_revision
 from huggingface_hub.utils import GatedRepoError, HfHubHTTPError
+from ingest_candidates import STAGING_FILE, read_staging
+from metadata_cache import CACHE_DIR, MetadataCache
 from pydantic import BaseModel, Field
-import sys
-
+from safetensors_headers import fetch_weight_bytes
 
 CATALOG = [
     # Deepseek R1
@@ -160,7 +174,14 @@ CATALOG = [
 
 
 OUTPUT_FILE = Path(__file__).resolve().parents[1] / "data" / "models.json"
-STAGING_FILE = Path(__file__).resolve().parent / "staging_candidates.json"
+LISTING_EXPAND = ("sha", "safetensors")
+LISTING_MAX_PAGES = 3
+# Bump when build_row derives rows differently, so cached and journalled rows are redone.
+ROW_VERSION = 2
+# Model types whose layers alternate sliding-window and global attention without
+# saying so in config.json (``sliding_window_pattern`` covers the others).
+SLIDING_WINDOW_PATTERN = {"gemma2": 2}
+
 
 class ModelRow(BaseModel):
     model_id: str
@@ -168,64 +189,249 @@ class ModelRow(BaseModel):
     layers: int
     hidden: int
     moe_active_ratio: float = Field(ge=0, le=1)
-
-
-def fetch_config(repo: str) -> dict | None:
+    # exact tensor bytes per safetensors dtype, e.g. {"BF16": ..., "I32": ...}
+    weight_bytes: dict[str, int] | None = None
+    # attention shape from config.json; kv_lora_rank/qk_rope_head_dim are set for MLA
+    num_key_value_heads: int | None = None
+    head_dim: int | None = None
+    kv_lora_rank: int | None = None
+    qk_rope_head_dim: int | None = None
+    sliding_window: int | None = None
+    num_experts: int | None = None
+    num_experts_per_tok: int | None = None
+    # 16-bit KV cache bytes per token of context, summed over layers that keep every
+    # token and over sliding-window layers (which keep at most sliding_window tokens)
+    kv_bytes_per_token: int | None = Field(default=None, ge=0)
+    kv_window_bytes_per_token: int | None = Field(default=None, ge=0)
+
+
+@dataclass
+class RepoSummary:
+    """What one bulk listing row tells us about a repo without a per-repo call."""
+
+    revision: str | None
+    total: float | None
+
+
+def prefetch_summaries(repos: list[str], client: HubClient, workers: int = 1) -> dict[str, RepoSummary]:
+    """Collect commit SHAs and safetensors totals with one paged listing per author.
+
+    Listings are sorted by downloads, so catalog models usually turn up on the
+    first page; a scan stops once every wanted repo of that author was seen or
+    after ``LISTING_MAX_PAGES`` pages. Repos not found fall back to per-repo calls.
+    """
+    by_author: dict[str, set[str]] = defaultdict(set)
+    for repo in repos:
+        if "/" in repo:
+            by_author[repo.split("/", 1)[0]].add(repo)
+
+    def scan(author: str) -> dict[str, RepoSummary]:
+        wanted = by_author[author]
+        found: dict[str, RepoSummary] = {}
+        try:
+            for model in client.list_models(author, LISTING_EXPAND, max_pages=LISTING_MAX_PAGES):
+                if model.get("id") in wanted:
+                    safetensors = model.get("safetensors") or {}
+                    found[model["id"]] = RepoSummary(model.get("sha"), safetensors.get("total"))
+                    if len(found) == len(wanted):
+                        break
+        except (HfHubHTTPError, httpx.TransportError) as e:
+            instrumentation.error(f"Failed to list models for {author}: {e!r}")
+        return found
+
+    summaries: dict[str, RepoSummary] = {}
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        for found in pool.map(scan, sorted(by_author)):
+            summaries.update(found)
+    return summaries
+
+
+def input_hash(entry: dict, weights: bool = False) -> str:
+    key = {"row_version": ROW_VERSION, **entry}
+    if weights:
+        key["weight_bytes"] = True
+    return hashlib.sha256(json.dumps(key, sort_keys=True).encode()).hexdigest()[:16]
+
+
+def catalog_digest() -> str:
+    """Digest of the manual ``CATALOG``; the change feed only covers staged candidates."""
+    return hashlib.sha256(json.dumps(CATALOG, sort_keys=True).encode()).hexdigest()[:16]
+
+
+def fetch_metadata(repo: str, client: HubClient | None = None, summary: RepoSummary | None = None) -> dict | None:
+    """Fetch config.json, its upstream revision and the parameter total for ``repo``.
+
+    A listing ``summary`` supplies the total when config.json lacks one, so
+    ``model_info`` is only called for repos the bulk listing missed.
+    """
+    client = client or HubClient()
     try:
-        path = hf_hub_download(repo, "config.json")
+        response = client.get_file(repo, "config.json")
     except GatedRepoError:
-        print(f"Skipping {repo}: gated repo", file=sys.stderr)
+        instrumentation.error(f"Skipping {repo}: gated repo")
         return None
-    except HfHubHTTPError as e:
-        print(f"Failed to download {repo} config: {e}", file=sys.stderr)
+    except (HfHubHTTPError, httpx.TransportError) as e:
+        instrumentation.error(f"Failed to download {repo} config: {e!r}")
         return None
-    with open(path, "r") as fh:
-        return json.load(fh)
-
-
-def derive_fields(entry: dict) -> ModelRow:
-    repo = entry["model_id"]
-    cfg = fetch_config(repo)
-    if cfg is None:
-        return ModelRow(**entry)
-    total = cfg.get("num_parameters") or cfg.get("n_params")
-    if total is None:
+    cfg = response.json()
+    revision, etag = response_revision(response)
+    total = cfg.get("num_parameters") or cfg.get("n_params") or (summary.total if summary else None)
+    if total is None and summary is None:
         try:
-            info = HfApi().model_info(repo)
-            total = info.safetensors.get("total_parameters") if info.safetensors else None
-        except HfHubHTTPError:
+            info = client.model_info(repo)
+            total = info.safetensors.get("total") if info.safetensors else None
+        except (HfHubHTTPError, httpx.TransportError):
             total = None
+    return {"revision": revision, "etag": etag, "config": cfg, "total": total}
+
+
+def load_metadata(
+    repo: str, client: HubClient, cache: MetadataCache, summary: RepoSummary | None = None
+) -> dict | None:
+    """Serve ``repo`` metadata from ``cache``, revalidating stale entries by commit SHA.
+
+    The SHA comes from the bulk listing ``summary`` when available, otherwise from
+    a HEAD on config.json.
+    """
+    cached = cache.get(repo)
+    if cached is not None:
+        if cache.is_fresh(cached):
+            cache.stats.record("hits")
+            return cached.payload
+        if summary is not None and summary.revision:
+            revision = summary.revision
+        else:
+            try:
+                revision, _ = client.file_revision(repo, "config.json")
+            except (HfHubHTTPError, httpx.TransportError):
+                revision = None
+        if revision == cached.revision:
+            cache.touch(cached)
+            cache.stats.record("revalidated")
+            return cached.payload
+    cache.stats.record("misses")
+    meta = fetch_metadata(repo, client, summary)
+    if meta is not None and meta["revision"]:
+        cache.put(repo, meta["revision"], meta["etag"], meta)
+    return meta
+
+
+def kv_fields(cfg: dict) -> dict:
+    """Attention shape from config.json and the KV cache bytes per token it implies.
+
+    GQA caches ``2 * num_key_value_heads * head_dim`` values per layer and token;
+    MLA caches one compressed latent of ``kv_lora_rank + qk_rope_head_dim``. Only
+    self-attention layers count (not Mamba or cross-attention layers), and layers
+    with a sliding window are summed separately.
+    """
+    text = cfg.get("text_config") or cfg
+    attn = text.get("attn_config") or {}
+    ffn = text.get("ffn_config") or {}
+    layers = text.get("num_hidden_layers") or text.get("n_layers") or 0
+    hidden = text.get("hidden_size") or text.get("d_model")
+    heads = text.get("num_attention_heads") or text.get("n_heads")
+    kv_heads = text.get("num_key_value_heads") or attn.get("kv_n_heads") or heads
+    window = text.get("sliding_window") if text.get("use_sliding_window", True) else None
+    mla = bool(text.get("kv_lora_rank"))
+    fields = {
+        "num_key_value_heads": kv_heads,
+        "head_dim": text.get("head_dim") or (hidden // heads if heads and hidden and not mla else None),
+        "kv_lora_rank": text.get("kv_lora_rank"),
+        "qk_rope_head_dim": text.get("qk_rope_head_dim") if mla else None,
+        "num_experts": (
+            text.get("num_local_experts") or text.get("n_routed_experts") or text.get("num_experts")
+            or ffn.get("moe_num_experts")
+        ),
+        "num_experts_per_tok": text.get("num_experts_per_tok") or ffn.get("moe_top_k"),
+    }
+    if text.get("model_type") in ("mamba", "mamba2"):
+        return {**fields, "kv_bytes_per_token": 0}
+    if mla:
+        per_layer = fields["kv_lora_rank"] + (fields["qk_rope_head_dim"] or 0)
+    elif kv_heads and fields["head_dim"]:
+        per_layer = 2 * kv_heads * fields["head_dim"]
+    else:
+        return fields
+    if not layers:
+        return fields
+    attention = layers - len(text.get("cross_attention_layers") or [])
+    if text.get("attn_layer_period"):
+        attention = len(range(text.get("attn_layer_offset", 0), layers, text["attn_layer_period"]))
+    windowed = 0
+    if window:
+        pattern = text.get("sliding_window_pattern") or SLIDING_WINDOW_PATTERN.get(text.get("model_type"))
+        windowed = attention - attention // pattern if pattern else attention
+    fields["kv_bytes_per_token"] = 2 * per_layer * (attention - windowed)
+    if windowed:
+        fields.update(sliding_window=window, kv_window_bytes_per_token=2 * per_layer * windowed)
+    return fields
+
+
+def build_row(entry: dict, cfg: dict, total: float | None, weight_bytes: dict[str, int] | None = None) -> ModelRow:
     params_b = round(float(total) / 1e9, 1) if total else entry.get("params_b", 0)
     layers = cfg.get("num_hidden_layers") or cfg.get("n_layer") or entry.get("layers")
     hidden = cfg.get("hidden_size") or cfg.get("n_embd") or cfg.get("d_model") or entry.get("hidden")
     moe_active = cfg.get("moe_active_expert_size")
     ratio = round(moe_active / total, 2) if moe_active and total else entry.get("moe_active_ratio", 0)
-    return ModelRow(model_id=repo, params_b=params_b, layers=layers, hidden=hidden, moe_active_ratio=ratio)
+    return ModelRow(
+        model_id=entry["model_id"],
+        params_b=params_b,
+        layers=layers,
+        hidden=hidden,
+        moe_active_ratio=ratio,
+        weight_bytes=weight_bytes,
+        **kv_fields(cfg),
+    )
+
+
+def derive_fields(
+    entry: dict,
+    client: HubClient | None = None,
+    cache: MetadataCache | None = None,
+    summary: RepoSummary | None = None,
+    weights: bool = False,
+) -> ModelRow:
+    client = client or HubClient()
+    repo = entry["model_id"]
+    meta = load_metadata(repo, client, cache, summary) if cache else fetch_metadata(repo, client, summary)
+    if meta is None:
+        return ModelRow(**entry)
+    cacheable = True
+    if weights and "weight_bytes" not in meta:
+        # Read headers at the revision config.json came from; forces a re-derive below.
+        try:
+            meta = {**meta, "weight_bytes": fetch_weight_bytes(client, repo, meta["revision"]), "input_hash": None}
+        except (HfHubHTTPError, httpx.TransportError) as e:
+            # Transient: leave the cache as it was so the next run reads the headers again.
+            instrumentation.error(f"Failed to read {repo} safetensors headers: {e}")
+            cacheable = False
+    key = input_hash(entry, weights)
+    if meta.get("input_hash") == key:
+        return ModelRow(**meta["row"])
+    row = build_row(entry, meta["config"], meta["total"], meta.get("weight_bytes") if weights else None)
+    if cache and meta["revision"] and cacheable:
+        cache.put(repo, meta["revision"], meta["etag"], {**meta, "input_hash": key, "row": row.model_dump()})
+    return row
 
 
 def load_candidate_catalog() -> list[dict]:
     catalog_map = {entry["model_id"]: entry for entry in CATALOG}
     entries: list[dict] = []
     seen: set[str] = set()
-    if STAGING_FILE.exists():
-        try:
-            candidates = json.loads(STAGING_FILE.read_text())
-        except json.JSONDecodeError:
-            candidates = []
-        for candidate in candidates:
-            model_id = candidate.get("model_id")
-            if not model_id or model_id in seen:
-                continue
-            seen.add(model_id)
-            entry = {
-                "model_id": model_id,
-                "params_b": 0.0,
-                "layers": 0,
-                "hidden": 0,
-                "moe_active_ratio": 0.0,
-            }
-            entry.update(catalog_map.get(model_id, {}))
-            entries.append(entry)
+    for candidate in read_staging(STAGING_FILE):
+        model_id = candidate.get("model_id")
+        if not model_id or model_id in seen:
+            continue
+        seen.add(model_id)
+        entry = {
+            "model_id": model_id,
+            "params_b": 0.0,
+            "layers": 0,
+            "hidden": 0,
+            "moe_active_ratio": 0.0,
+        }
+        entry.update(catalog_map.get(model_id, {}))
+        entries.append(entry)
     for model_id, entry in catalog_map.items():
         if model_id in seen:
             continue
@@ -233,13 +439,242 @@ def load_candidate_catalog() -> list[dict]:
     return entries
 
 
-def main() -> None:
+def derive_rows(
+    entries: list[dict],
+    client: HubClient,
+    workers: int = 1,
+    cache: MetadataCache | None = None,
+    summaries: dict[str, RepoSummary] | None = None,
+    weights: bool = False,
+    on_row: Callable[[dict, ModelRow], None] | None = None,
+) -> list[ModelRow]:
+    """Derive rows for ``entries``, keeping catalog order regardless of ``workers``.
+
+    ``on_row`` is called with each entry and its row as soon as the row is ready.
+    """
+    summaries = summaries or {}
+
+    def derive(entry: dict) -> ModelRow:
+        started = time.perf_counter()
+        row = derive_fields(entry, client, cache, summaries.get(entry["model_id"]), weights)
+        instrumentation.observe("repo", time.perf_counter() - started, entry["model_id"])
+        if on_row is not None:
+            on_row(entry, row)
+        return row
+
+    if workers <= 1:
+        return [derive(entry) for entry in entries]
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(derive, entries))
+
+
+def derive_into_journal(
+    entries: list[dict],
+    journal: CheckpointJournal,
+    shard: int,
+    client: HubClient,
+    workers: int = 1,
+    cache: MetadataCache | None = None,
+    summaries: dict[str, RepoSummary] | None = None,
+    weights: bool = False,
+) -> None:
+    """Derive ``entries`` and checkpoint every row to ``journal`` shard ``shard``."""
+    with journal.writer(shard) as writer:
+
+        def record(entry: dict, row: ModelRow) -> None:
+            writer.append(entry["model_id"], input_hash(entry), row.model_dump(exclude_none=True))
+
+        derive_rows(entries, client, workers, cache, summaries, weights, on_row=record)
+
+
+def _derive_shard(
+    shard: int,
+    entries: list[dict],
+    journal: CheckpointJournal,
+    summaries: dict[str, RepoSummary],
+    settings: dict,
+) -> dict:
+    """Process-pool worker: derive one shard with its own client and cache connection."""
+    run = instrumentation.start_run(f"update_models.shard-{shard}")
+    client = HubClient(endpoint=settings["endpoint"], rate=settings["rate"], retries=settings["retries"])
+    cache = MetadataCache(settings["cache_path"], ttl=settings["ttl"]) if settings["cache_path"] else None
+    derive_into_journal(entries, journal, shard, client, settings["workers"], cache, summaries, settings["weights"])
+    stats = None
+    if cache is not None:
+        stats = cache.stats.as_dict()
+        cache.close()
+    return {"counters": dict(run.counters), "errors": run.errors, "requests": client.request_count, "cache": stats}
+
+
+def derive_sharded(
+    entries: list[dict],
+    journal: CheckpointJournal,
+    processes: int,
+    summaries: dict[str, RepoSummary] | None,
+    settings: dict,
+) -> list[dict]:
+    """Spread ``entries`` round-robin over ``processes`` worker processes.
+
+    Each worker journals its own shard; rows are put back in catalog order when
+    the journal is merged, so the result does not depend on the shard count.
+    """
+    summaries = summaries or {}
+    shards = [entries[i::processes] for i in range(processes)]
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        futures = [
+            pool.submit(
+                _derive_shard,
+                shard,
+                chunk,
+                journal,
+                {e["model_id"]: summaries[e["model_id"]] for e in chunk if e["model_id"] in summaries},
+                settings,
+            )
+            for shard, chunk in enumerate(shards)
+            if chunk
+        ]
+        return [future.result() for future in futures]
+
+
+def merge_journal(
+    entries: list[dict], journal: CheckpointJournal, previous: dict[str, dict] | None = None
+) -> list[dict]:
+    """Validate journaled rows and return them in catalog order.
+
+    Journaled rows derived from a different catalog entry are stale and skipped;
+    entries that were not rederived this run take their row from ``previous``.
+    """
+    hashes = {entry["model_id"]: input_hash(entry) for entry in entries}
+    done = journal.load(hashes)
     rows = []
-    for entry in load_candidate_catalog():
-        row = derive_fields(entry)
-        rows.append(row.model_dump())
-    OUTPUT_FILE.write_text(json.dumps(rows, indent=2))
+    for entry in entries:
+        record = done.get(entry["model_id"])
+        if record and record[0] == hashes[entry["model_id"]]:
+            row = record[1]
+        else:
+            row = (previous or {})[entry["model_id"]]
+        rows.append(ModelRow(**row).model_dump(exclude_none=True))
+    return rows
+
+
+def incremental_targets(entries: list[dict], changed: set[str], path: Path = OUTPUT_FILE) -> tuple[list[dict], dict]:
+    """Entries to rederive given the ids the change feed reports, and the rows to keep for the rest.
+
+    Entries without a row in ``path`` (new ones, or a catalog that grew) are
+    always rederived; rows for ids no longer in the catalog are dropped when the
+    rows are merged back in catalog order.
+    """
+    previous = {row["model_id"]: row for row in json.loads(path.read_text())}
+    targets = [e for e in entries if e["model_id"] in changed or e["model_id"] not in previous]
+    return targets, previous
+
+
+def write_rows(rows: list[dict], path: Path = OUTPUT_FILE) -> None:
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(json.dumps(rows, indent=2))
+    tmp.replace(path)
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--workers", type=int, default=1, help="concurrent Hub fetches (default: 1)")
+    parser.add_argument("--rate", type=float, default=None, help="max requests per second per host")
+    parser.add_argument("--retries", type=int, default=3, help="retries on 429/5xx and connection errors")
+    parser.add_argument("--cache-dir", type=Path, default=CACHE_DIR, help="metadata cache location")
+    parser.add_argument("--no-cache", action="store_true", help="always refetch every repo")
+    parser.add_argument("--ttl-hours", type=float, default=24.0, help="trust cached metadata this long before revalidating")
+    parser.add_argument("--no-bulk", action="store_true", help="skip per-author listings; query every repo individually")
+    parser.add_argument(
+        "--weight-bytes", action="store_true", help="read safetensors headers for exact per-dtype weight sizes"
+    )
+    parser.add_argument(
+        "--processes", type=int, default=1, help="shard the catalog over N processes (0: one per CPU core)"
+    )
+    parser.add_argument(
+        "--fresh", action="store_true", help="discard rows checkpointed by an interrupted run instead of resuming"
+    )
+    parser.add_argument(
+        "--full", action="store_true", help="rederive every row instead of only those the change feed reports"
+    )
+    instrumentation.add_arguments(parser)
+    args = parser.parse_args(argv)
+
+    run = instrumentation.start_run("update_models", args.profile, args.profile_stage, OUTPUT_FILE.parent)
+    processes = args.processes or os.cpu_count() or 1
+    client = HubClient(rate=args.rate, retries=args.retries)
+    cache_path = None if args.no_cache else args.cache_dir / "metadata.sqlite"
+    cache = MetadataCache(cache_path, ttl=args.ttl_hours * 3600) if cache_path else None
+    journal = CheckpointJournal(args.cache_dir / "journal", {"weight_bytes": args.weight_bytes})
+    cursor = args.cache_dir / "change_feed.cursor"
+    # Rows derived under other settings or another CATALOG cannot be carried over by an incremental run.
+    cursor_state = {"row_version": ROW_VERSION, "weight_bytes": args.weight_bytes, "catalog": catalog_digest()}
+    if args.fresh:
+        journal.clear()
+    with run.span("update_models"):
+        with run.span("load_catalog"):
+            entries = load_candidate_catalog()
+            changed, feed_offset = changes_since(
+                change_feed_path(STAGING_FILE), cursor, STAGING_FILE, cursor_state
+            )
+            targets, previous = entries, None
+            if changed is not None and not args.full and OUTPUT_FILE.exists():
+                targets, previous = incremental_targets(entries, changed, OUTPUT_FILE)
+                print(f"Incremental: {len(targets)} of {len(entries)} entries changed since the last refresh")
+            done = journal.load()
+            pending = [e for e in targets if done.get(e["model_id"], (None,))[0] != input_hash(e)]
+        if len(pending) < len(targets):
+            print(f"Resuming: {len(targets) - len(pending)} of {len(targets)} rows already checkpointed")
+        summaries = None
+        if not args.no_bulk and pending:
+            with run.span("prefetch"):
+                summaries = prefetch_summaries([e["model_id"] for e in pending], client, args.workers)
+        try:
+            with run.span("derive"):
+                if processes > 1 and len(pending) > 1:
+                    settings = {
+                        "endpoint": client.endpoint,
+                        "rate": args.rate / processes if args.rate else None,
+                        "retries": args.retries,
+                        "cache_path": cache_path,
+                        "ttl": args.ttl_hours * 3600,
+                        "workers": args.workers,
+                        "weights": args.weight_bytes,
+                    }
+                    for result in derive_sharded(pending, journal, processes, summaries, settings):
+                        for name, n in result["counters"].items():
+                            run.count(name, n)
+                        run.errors.extend(result["errors"])
+                        client.request_count += result["requests"]
+                        for outcome, n in (result["cache"] or {}).items():
+                            cache.stats.record(outcome, n)
+                else:
+                    derive_into_journal(pending, journal, 0, client, args.workers, cache, summaries, args.weight_bytes)
+        except KeyboardInterrupt:
+            print(
+                f"Interrupted; {len(journal.load())} rows checkpointed in {journal.directory}. Rerun to resume.",
+                file=sys.stderr,
+            )
+            raise SystemExit(130)
+        with run.span("merge"):
+            rows = merge_journal(entries, journal, previous)
+        with run.span("write"):
+            write_rows(rows, OUTPUT_FILE)
+        journal.clear()
+        if feed_offset:
+            save_cursor(cursor, feed_offset, STAGING_FILE, cursor_state)
+        if cache is not None:
+            cache.evict()
+            cache.close()
+    run.count("rows", len(rows))
+    run.count("rows.resumed", len(targets) - len(pending))
+    run.count("rows.unchanged", len(entries) - len(targets))
+    if cache is not None:
+        run.set("cache", cache.stats.as_dict())
     print(f"Wrote {OUTPUT_FILE}")
+    print(f"{client.request_count} Hub requests")
+    if cache is not None:
+        print(cache.stats.summary())
+    print(f"Run report: {instrumentation.write_report(OUTPUT_FILE)}")
 
 
 if __name__ == "__main__":
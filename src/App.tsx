@@ -1,7 +1,6 @@
 import { useEffect, useMemo, useState, useRef } from 'react';
 import CalculationDetails from './CalculationDetails';
-import models from '../data/models.json';
-import skus from '../data/azure-gpus.json';
+import { decodeTable, loadCatalog } from './catalog';
 import type { EstimateFullInput, Precision, AzureGpuSku } from './estimator';
 import { estimateWithSku } from './estimator';
 
@@ -12,6 +11,9 @@ interface ModelInfo {
   hidden: number;
   moe_active_ratio: number;
   ctx_len?: number;
+  kv_bytes_per_token?: number;
+  kv_window_bytes_per_token?: number;
+  sliding_window?: number;
 }
 
 type SortOption = 'size_desc' | 'size_asc' | 'name';
@@ -36,7 +38,15 @@ const ctxIndexFor = (v: number): number => {
 
 const MAX_MEM = 160; // for progress bar scaling
 
-function App() {
+// Written by datapipeline/export_artifacts.py into public/catalog/.
+const CATALOG_URL = `${import.meta.env.BASE_URL}catalog/`;
+
+interface SizerProps {
+  models: ModelInfo[];
+  skus: AzureGpuSku[];
+}
+
+function Sizer({ models, skus }: SizerProps) {
   // read configuration from query parameters before initializing state
   const query = useMemo(() => {
     const params = new URLSearchParams(window.location.search);
@@ -50,7 +60,7 @@ function App() {
 
     const queryModel = params.get('model');
     if (queryModel) {
-      const found = (models as ModelInfo[]).find((m) => {
+      const found = models.find((m) => {
         const slug = m.model_id.split('/').pop()?.toLowerCase() ?? m.model_id.toLowerCase();
         return slug === queryModel.toLowerCase() || m.model_id.toLowerCase() === queryModel.toLowerCase();
       });
@@ -60,7 +70,7 @@ function App() {
       }
     }
 
-    const modelInfo = (models as ModelInfo[]).find((m) => m.model_id === result.modelId);
+    const modelInfo = models.find((m) => m.model_id === result.modelId);
     if (modelInfo?.ctx_len) {
       result.ctxIndex = ctxIndexFor(modelInfo.ctx_len);
     }
@@ -87,7 +97,7 @@ function App() {
       result.search = result.modelId.split('/').pop() ?? result.modelId;
     }
     return result;
-  }, []);
+  }, [models]);
 
   const [modelId, setModelId] = useState<string>(query.modelId);
   const [precision, setPrecision] = useState<Precision>(query.precision);
@@ -105,8 +115,8 @@ function App() {
   const lastUpdated = useMemo(() => new Date().toLocaleDateString(), []);
 
   const selectedModel = useMemo(() => {
-    return (models as ModelInfo[]).find((m) => m.model_id === modelId)!;
-  }, [modelId]);
+    return models.find((m) => m.model_id === modelId)!;
+  }, [models, modelId]);
 
   const maxCtxIdx = useMemo(
     () => ctxIndexFor(selectedModel.ctx_len ?? ctxOptions[ctxOptions.length - 1]),
@@ -153,7 +163,7 @@ function App() {
   }, [modelId, precision, ctx]);
 
   const sortedModels = useMemo(() => {
-    const arr = (models as ModelInfo[]).slice();
+    const arr = models.slice();
     switch (sortOption) {
       case 'size_asc':
         arr.sort((a, b) => a.params_b - b.params_b);
@@ -166,7 +176,7 @@ function App() {
         break;
     }
     return arr;
-  }, [sortOption]);
+  }, [models, sortOption]);
 
   const filteredModels = useMemo(() => {
     const term = search.toLowerCase();
@@ -195,10 +205,13 @@ function App() {
       params_b: model.params_b,
       layers: model.layers,
       hidden: model.hidden,
+      kv_bytes_per_token: model.kv_bytes_per_token,
+      kv_window_bytes_per_token: model.kv_window_bytes_per_token,
+      sliding_window: model.sliding_window,
       ctx,
       batch: 1,
       precision,
-      skus: skus as unknown as AzureGpuSku[],
+      skus,
     };
     setResult(estimateWithSku(input));
   };
@@ -559,4 +572,29 @@ function App() {
   );
 }
 
+function App() {
+  const [catalog, setCatalog] = useState<SizerProps | null>(null);
+  const [error, setError] = useState<string | null>(null);
+
+  useEffect(() => {
+    loadCatalog(CATALOG_URL)
+      .then((loaded) =>
+        setCatalog({
+          models: decodeTable<ModelInfo>(loaded.tables.models),
+          skus: decodeTable<AzureGpuSku>(loaded.tables.skus),
+        })
+      )
+      .catch((e: unknown) => setError(e instanceof Error ? e.message : String(e)));
+  }, []);
+
+  if (!catalog) {
+    return (
+      <div className="container mx-auto px-4 py-8 max-w-7xl text-center text-white" role="status">
+        {error ? `Could not load the model catalog: ${error}` : 'Loading model catalog…'}
+      </div>
+    );
+  }
+  return <Sizer models={catalog.models} skus={catalog.skus} />;
+}
+
 export default App;
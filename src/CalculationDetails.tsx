@@ -6,6 +6,9 @@ interface ModelDetails {
   layers: number;
   hidden: number;
   moe_active_ratio: number;
+  kv_bytes_per_token?: number;
+  kv_window_bytes_per_token?: number;
+  sliding_window?: number;
 }
 
 interface Props {
@@ -26,6 +29,16 @@ const BYTES: Record<Precision, number> = {
 
 function CalculationDetails({ onClose, model, ctx, precision, result }: Props) {
   const bytes = BYTES[precision];
+  // Per-token costs are stored for a 16-bit cache and scale with the precision.
+  const windowTokens = model.sliding_window ? Math.min(ctx, model.sliding_window) : 0;
+  const kvFormula =
+    model.kv_bytes_per_token == null
+      ? `2 × ${model.layers} × ${ctx} × ${model.hidden} × ${bytes} × 1 / 1e9`
+      : `(${model.kv_bytes_per_token} × ${ctx}` +
+        (model.kv_window_bytes_per_token && windowTokens
+          ? ` + ${model.kv_window_bytes_per_token} × ${windowTokens}`
+          : '') +
+        `) bytes/token × ${bytes} / 2 × 1 / 1e9`;
 
   return (
     <div className="relative bg-gradient-to-br from-yellow-50 to-yellow-100 p-4 rounded-xl border-l-4 border-yellow-500 shadow-lg fade-in mb-4">
@@ -60,8 +73,7 @@ function CalculationDetails({ onClose, model, ctx, precision, result }: Props) {
           {result.weights_gb.toFixed(2)} GB
         </li>
         <li>
-          KV cache: 2 × {model.layers} × {ctx} × {model.hidden} × {bytes} × 1 /
-          1e9 = {result.kv_gb.toFixed(2)} GB
+          KV cache: {kvFormula} = {result.kv_gb.toFixed(2)} GB
         </li>
         <li>
           20% overhead → total {result.total_gb.toFixed(2)} GB
@@ -0,0 +1,64 @@
+// Decoder for the columnar catalog written by datapipeline/export_artifacts.py.
+
+export type Column =
+  | unknown[]
+  | { dict: string[]; codes: number[]; sep?: string; rest?: string[] };
+
+export interface ColumnarTable {
+  rows: number;
+  columns: Record<string, Column>;
+}
+
+export interface Catalog {
+  format: number;
+  tables: Record<string, ColumnarTable>;
+}
+
+export interface CatalogManifest {
+  format: number;
+  catalog: {
+    sha256: string;
+    files: Record<string, { path: string; bytes: number }>;
+  };
+  tables: Record<string, number>;
+}
+
+export const CATALOG_FORMAT = 1;
+
+export function decodeColumn(column: Column): unknown[] {
+  if (Array.isArray(column)) return column;
+  const values = column.codes.map((code) => (code >= 0 ? column.dict[code] : null));
+  if (column.sep !== undefined && column.rest) {
+    const { sep, rest } = column;
+    return values.map((head, i) => `${head}${sep}${rest[i]}`);
+  }
+  return values;
+}
+
+// Null fields are dropped, matching the row JSON files.
+export function decodeTable<T>(table: ColumnarTable): T[] {
+  const columns = Object.entries(table.columns).map(
+    ([field, column]) => [field, decodeColumn(column)] as const,
+  );
+  const rows: T[] = [];
+  for (let i = 0; i < table.rows; i++) {
+    const row: Record<string, unknown> = {};
+    for (const [field, values] of columns) {
+      if (values[i] !== null && values[i] !== undefined) row[field] = values[i];
+    }
+    rows.push(row as T);
+  }
+  return rows;
+}
+
+// Fetch the manifest (short-lived) and then the content-hashed catalog it names,
+// which can be cached forever. The static host picks the .br/.gz variant via
+// Content-Encoding, so the identity path is requested.
+export async function loadCatalog(baseUrl: string): Promise<Catalog> {
+  const manifest = (await (await fetch(`${baseUrl}manifest.json`, { cache: 'no-cache' })).json()) as CatalogManifest;
+  if (manifest.format !== CATALOG_FORMAT) {
+    throw new Error(`Unsupported catalog format ${manifest.format}`);
+  }
+  const response = await fetch(`${baseUrl}${manifest.catalog.files.identity.path}`);
+  return (await response.json()) as Catalog;
+}
@@ -8,6 +8,11 @@ export interface EstimateInput {
   batch: number;
   precision: Precision;
   training?: boolean;
+  // 16-bit KV cache bytes per token from the model row; without them the
+  // cache is sized as one key and one value of width `hidden` per layer.
+  kv_bytes_per_token?: number;
+  kv_window_bytes_per_token?: number;
+  sliding_window?: number;
 }
 
 const BYTES: Record<Precision, number> = {
@@ -42,9 +47,15 @@ export interface EstimateFullInput extends EstimateInput {
 export function estimate(input: EstimateInput): Omit<EstimateOutput, 'gpus' | 'sku'> {
   const bytes = BYTES[input.precision];
   const W = (input.params_b * 1e9 * bytes) / 1e9;
-  const K =
-    (2 * input.layers * input.ctx * input.hidden * bytes * input.batch) /
-    1e9;
+  let K: number;
+  if (input.kv_bytes_per_token == null) {
+    K = (2 * input.layers * input.ctx * input.hidden * bytes * input.batch) / 1e9;
+  } else {
+    const windowTokens = input.sliding_window ? Math.min(input.ctx, input.sliding_window) : 0;
+    const perSeq =
+      input.kv_bytes_per_token * input.ctx + (input.kv_window_bytes_per_token ?? 0) * windowTokens;
+    K = ((perSeq * bytes) / 2 * input.batch) / 1e9;
+  }
   const opt = input.training ? 2.5 * W : 0;
   const total = 1.2 * (W + K + opt);
   return { weights_gb: W, kv_gb: K, total_gb: total };
@@ -0,0 +1,22 @@
+import { test } from 'node:test';
+import assert from 'node:assert';
+import { readFileSync } from 'node:fs';
+import { decodeColumn, decodeTable } from '../src/catalog.ts';
+import type { Catalog, CatalogManifest } from '../src/catalog.ts';
+
+const readJson = (path: string) => JSON.parse(readFileSync(new URL(path, import.meta.url), 'utf8'));
+
+test('decodes interned and prefix-interned columns', () => {
+  assert.deepStrictEqual(decodeColumn({ dict: ['A100', 'H100'], codes: [1, 0, -1] }), ['H100', 'A100', null]);
+  assert.deepStrictEqual(
+    decodeColumn({ dict: ['meta-llama', 'org'], codes: [0, 1], sep: '/', rest: ['Llama-3.1-8B', 'x'] }),
+    ['meta-llama/Llama-3.1-8B', 'org/x'],
+  );
+});
+
+test('exported catalog decodes back to the row JSON files', () => {
+  const manifest = readJson('../public/catalog/manifest.json') as CatalogManifest;
+  const catalog = readJson(`../public/catalog/${manifest.catalog.files.identity.path}`) as Catalog;
+  assert.deepStrictEqual(decodeTable(catalog.tables.models), readJson('../data/models.json'));
+  assert.deepStrictEqual(decodeTable(catalog.tables.skus), readJson('../data/azure-gpus.json'));
+});
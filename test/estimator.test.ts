@@ -1,6 +1,8 @@
 import { test } from 'node:test';
 import assert from 'node:assert';
+import { readFileSync } from 'node:fs';
 import { estimateWithSku } from '../src/estimator.ts';
+import type { AzureGpuSku, EstimateInput } from '../src/estimator.ts';
 
 test('selects SKU with least VRAM per GPU', () => {
   const skus = [
@@ -18,3 +20,27 @@ test('selects SKU with least VRAM per GPU', () => {
   });
   assert.equal(result.sku?.sku, 'small');
 });
+
+test('matches the Python sizing engine on the shared parity fixture', () => {
+  const fixture = JSON.parse(
+    readFileSync(new URL('./fixtures/sizing-parity.json', import.meta.url), 'utf8'),
+  ) as {
+    skus: AzureGpuSku[];
+    cases: (EstimateInput & {
+      expected: { weights_gb: number; kv_gb: number; total_gb: number; gpus: number; sku: string | null };
+    })[];
+  };
+  for (const { expected, ...input } of fixture.cases) {
+    const result = estimateWithSku({ ...input, skus: fixture.skus });
+    assert.deepStrictEqual(
+      {
+        weights_gb: result.weights_gb,
+        kv_gb: result.kv_gb,
+        total_gb: result.total_gb,
+        gpus: result.gpus,
+        sku: result.sku?.sku ?? null,
+      },
+      expected,
+    );
+  }
+});
@@ -0,0 +1,298 @@
+"""Local stand-in for the Hugging Face Hub and OpenRouter endpoints used by the data pipeline.
+
+The tests configure it repo by repo; the pipeline benchmarks also give it a
+synthetic ``catalog`` generated from each model's index on demand, so a
+50k-model catalog costs no more memory than a 100-model one. Point the pipeline
+at it with ``HF_ENDPOINT=<url>`` and ``OPENROUTER_ENDPOINT=<url>``.
+"""
+
+from __future__ import annotations
+
+import json
+import random
+import re
+import threading
+import time
+import zlib
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Self
+from urllib.parse import parse_qs, urlencode, urlsplit
+
+RESOLVE = re.compile(r"^/(?P<repo>[^/]+/[^/]+)/resolve/(?P<revision>[^/]+)/(?P<filename>.+)$")
+MODEL_INFO = re.compile(r"^/api/models/(?P<repo>[^/]+/[^/]+)$")
+MODEL_ID = re.compile(r"^org-\d+/model-(?P<index>\d+)$")
+# A ``failures`` code that closes the connection without any response.
+DROP = 0
+LISTING = "/api/models"
+OPENROUTER = "/api/v1/models"
+# The Hub caps listing pages at 1000 entries whatever ``limit`` asks for.
+PAGE_SIZE = 1000
+MODELS_PER_AUTHOR = 100
+ERROR_STATUS = (429, 503)
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 256
+
+
+class HubStub:
+    """Serve ``configs`` as config.json files and ``infos`` as model_info payloads.
+
+    ``failures`` maps a request path to a list of status codes returned (in order)
+    before the real response, ``DROP`` closing the connection instead; ``gated`` lists repos answering 403 GatedRepo and
+    ``revisions`` overrides the commit SHA served for a repo and ``files`` maps
+    ``(repo, filename)`` to raw bytes served with ``Range`` support. The ``/api/models``
+    listing pages through every configured repo of an author plus ``filler``
+    unrelated repos listed ahead of them.
+
+    ``catalog`` adds that many synthetic models (``org-<n>/model-<index>``, most
+    downloaded first) to the listings, config files and model_info, and
+    ``openrouter`` entries (default: a tenth of the catalog) to the OpenRouter
+    index. Repos outside the synthetic catalog (such as the curated ``CATALOG`` in
+    update_models) then borrow a synthetic config, but are not listed under their
+    author. A fraction ``error_rate`` of the requests the pipeline retries (config
+    files, model info, author listings) answer 429 or 503 first; the
+    text-generation listing and OpenRouter index are fetched without retries and
+    are never failed. ``requests`` counts requests per endpoint kind.
+    """
+
+    def __init__(
+        self,
+        configs=None,
+        infos=None,
+        gated=(),
+        failures=None,
+        latency=0.0,
+        revisions=None,
+        filler=0,
+        files=None,
+        catalog=0,
+        openrouter=None,
+        error_rate=0.0,
+        seed=0,
+    ):
+        self.configs = dict(configs or {})
+        self.revisions = dict(revisions or {})
+        self.filler = filler
+        self.files = dict(files or {})
+        self.bytes_sent: Counter[str] = Counter()
+        self.infos = dict(infos or {})
+        self.gated = set(gated)
+        self.failures = {path: list(codes) for path, codes in (failures or {}).items()}
+        self.latency = latency
+        self.size = catalog
+        self.openrouter = catalog // 10 if openrouter is None else openrouter
+        self.authors = max(1, -(-catalog // MODELS_PER_AUTHOR))
+        self.error_rate = error_rate
+        self._random = random.Random(seed)
+        self.hits: Counter[str] = Counter()
+        self.methods: Counter[tuple[str, str]] = Counter()
+        self.requests: Counter[str] = Counter()
+        self.times: list[float] = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+        self.server = _Server(("127.0.0.1", 0), self._handler())
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def __enter__(self) -> Self:
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+    def reset(self) -> None:
+        """Forget the requests served so far."""
+        with self._lock:
+            self.hits.clear()
+            self.methods.clear()
+            self.requests.clear()
+            self.times.clear()
+
+    def model_id(self, index: int) -> str:
+        return f"org-{index % self.authors}/model-{index:05d}"
+
+    def config(self, index: int) -> dict:
+        return {
+            "num_hidden_layers": 16 + index % 64,
+            "hidden_size": 1024 * (1 + index % 8),
+            "num_parameters": (1 + index % 70) * 1_000_000_000,
+        }
+
+    def _index(self, repo: str) -> int | None:
+        """Synthetic catalog index behind ``repo``; repos outside the catalog borrow one."""
+        if not self.size:
+            return None
+        match = MODEL_ID.match(repo)
+        if match is None:
+            return zlib.crc32(repo.encode()) % self.size
+        index = int(match["index"])
+        return index if index < self.size else None
+
+    def _summary(self, index: int) -> dict:
+        total = self.config(index)["num_parameters"]
+        return {"sha": f"{index:040x}", "safetensors": {"parameters": {"BF16": total}, "total": total}}
+
+    def _page(self, query: dict[str, list[str]], count: int, render) -> tuple[int, dict[str, str], bytes]:
+        """One listing page of ``render(i)`` for ``i < count``, with a ``Link`` to the next one."""
+        offset = int(query.get("offset", ["0"])[0])
+        limit = min(int(query.get("limit", [str(PAGE_SIZE)])[0]), PAGE_SIZE)
+        page = [render(i) for i in range(offset, min(offset + limit, count))]
+        headers = {}
+        if offset + limit < count:
+            next_query = urlencode({**{k: v[0] for k, v in query.items()}, "offset": offset + limit})
+            headers["Link"] = f'<{self.url}{LISTING}?{next_query}>; rel="next"'
+        return 200, headers, json.dumps(page).encode()
+
+    def _listing(self, query: dict[str, list[str]]) -> tuple[int, dict[str, str], bytes]:
+        author = query.get("author", [None])[0]
+        if author is None:
+            # The text-generation listing ingest_candidates pages through.
+            def candidate(i: int) -> dict:
+                return {"id": self.model_id(i), "downloads": self.size - i, "tags": ["text-generation", "license:apache-2.0"]}
+
+            return self._page(query, self.size, candidate)
+        repos = [f"{author}/filler-{i}" for i in range(self.filler)]
+        repos += sorted(repo for repo in {*self.configs, *self.infos} if repo.split("/", 1)[0] == author)
+        author_index = re.fullmatch(r"org-(\d+)", author)
+        synthetic = range(int(author_index[1]), self.size, self.authors) if author_index else range(0)
+
+        def render(i: int) -> dict:
+            if i >= len(repos):
+                index = synthetic[i - len(repos)]
+                return {"id": self.model_id(index), **self._summary(index)}
+            repo = repos[i]
+            return {
+                "id": repo,
+                "sha": self.revisions.get(repo, "0" * 40),
+                "safetensors": self.infos.get(repo, {}).get("safetensors"),
+            }
+
+        return self._page(query, len(repos) + len(synthetic), render)
+
+    def _openrouter(self) -> tuple[int, dict[str, str], bytes]:
+        data = [
+            {"id": f"vendor/{i}", "hugging_face_id": self.model_id(i), "architecture": {"input_modalities": ["text"]}}
+            for i in range(min(self.openrouter, self.size))
+        ]
+        return 200, {}, json.dumps({"data": data}).encode()
+
+    def _file(self, repo: str, filename: str, byte_range: str | None) -> tuple[int, dict[str, str], bytes]:
+        data = self.files[(repo, filename)]
+        headers = {"X-Repo-Commit": self.revisions.get(repo, "0" * 40), "Accept-Ranges": "bytes"}
+        match = re.fullmatch(r"bytes=(\d+)-(\d*)", byte_range or "")
+        if not match:
+            return 200, headers, data
+        start = int(match[1])
+        end = min(int(match[2]) if match[2] else len(data) - 1, len(data) - 1)
+        headers["Content-Range"] = f"bytes {start}-{end}/{len(data)}"
+        return 206, headers, data[start : end + 1]
+
+    def _injected_failure(self, path: str) -> int | None:
+        """Next status queued in ``failures`` for ``path``, or a random one at ``error_rate``."""
+        pending = self.failures.get(path)
+        if pending:
+            return pending.pop(0)
+        kind = _kind(path)
+        if self.error_rate and kind not in ("listing", "openrouter") and self._random.random() < self.error_rate:
+            return self._random.choice(ERROR_STATUS)
+        return None
+
+    def _respond(self, method: str, path: str, byte_range: str | None = None) -> tuple[int, dict[str, str], bytes]:
+        with self._lock:
+            self.hits[path] += 1
+            self.methods[(method, path)] += 1
+            self.requests[_kind(path)] += 1
+            self.times.append(time.monotonic())
+            failure = self._injected_failure(path)
+            if failure is not None:
+                return failure, {"Retry-After": "0"}, b"{}"
+        url = urlsplit(path)
+        if url.path == OPENROUTER:
+            return self._openrouter()
+        if url.path == LISTING:
+            return self._listing(parse_qs(url.query))
+        match = RESOLVE.match(path)
+        if match:
+            repo = match["repo"]
+            if repo in self.gated:
+                return 403, {"X-Error-Code": "GatedRepo"}, b'{"error": "gated"}'
+            if (repo, match["filename"]) in self.files:
+                return self._file(repo, match["filename"], byte_range)
+            if match["filename"] == "config.json":
+                index = None if repo in self.configs else self._index(repo)
+                if repo in self.configs or index is not None:
+                    body = json.dumps(self.configs[repo] if index is None else self.config(index)).encode()
+                    commit = self.revisions.get(repo, "0" * 40) if index is None else f"{index:040x}"
+                    return 200, {"X-Repo-Commit": commit, "ETag": f'"{zlib.crc32(body):x}"'}, body
+            return 404, {"X-Error-Code": "EntryNotFound"}, b'{"error": "not found"}'
+        match = MODEL_INFO.match(path)
+        if match and match["repo"] in self.infos:
+            return 200, {}, json.dumps({"id": match["repo"], **self.infos[match["repo"]]}).encode()
+        index = self._index(match["repo"]) if match else None
+        if index is not None:
+            return 200, {}, json.dumps({"id": match["repo"], **self._summary(index)}).encode()
+        return 404, {"X-Error-Code": "RepoNotFound"}, b'{"error": "not found"}'
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Headers and body go out in separate writes; without this, keep-alive
+            # connections stall on delayed ACKs.
+            disable_nagle_algorithm = True
+
+            def log_message(self, *args) -> None:
+                pass
+
+            def do_HEAD(self) -> None:
+                self._serve(send_body=False)
+
+            def do_GET(self) -> None:
+                self._serve(send_body=True)
+
+            def _serve(self, send_body: bool) -> None:
+                with stub._lock:
+                    stub.in_flight += 1
+                    stub.max_in_flight = max(stub.max_in_flight, stub.in_flight)
+                try:
+                    if stub.latency:
+                        time.sleep(stub.latency)
+                    status, headers, body = stub._respond(self.command, self.path, self.headers.get("Range"))
+                    if status == DROP:
+                        self.close_connection = True
+                        return
+                    self.send_response(status)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(body)))
+                    for name, value in headers.items():
+                        self.send_header(name, value)
+                    self.end_headers()
+                    if send_body:
+                        self.wfile.write(body)
+                        with stub._lock:
+                            stub.bytes_sent[self.path] += len(body)
+                finally:
+                    with stub._lock:
+                        stub.in_flight -= 1
+
+        return Handler
+
+
+def _kind(path: str) -> str:
+    """Bucket a request path for the per-endpoint request counts."""
+    url = urlsplit(path)
+    if url.path == OPENROUTER:
+        return "openrouter"
+    if url.path == LISTING:
+        return "author_listing" if "author" in parse_qs(url.query) else "listing"
+    if RESOLVE.match(url.path):
+        return "file"
+    if MODEL_INFO.match(url.path):
+        return "model_info"
+    return "other"
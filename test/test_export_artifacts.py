@@ -0,0 +1,64 @@
+import gzip
+import json
+import sys
+
+import export_artifacts
+import sizing
+
+
+def test_catalog_round_trips_row_files():
+    models, skus = sizing.load_inputs()
+    catalog = export_artifacts.build_catalog(models, skus)
+    assert export_artifacts.decode_table(catalog["tables"]["models"]) == models
+    assert export_artifacts.decode_table(catalog["tables"]["skus"]) == skus
+    columns = catalog["tables"]["skus"]["columns"]
+    assert set(columns["gpu_model"]) == {"dict", "codes"}
+    assert catalog["tables"]["models"]["columns"]["model_id"]["sep"] == "/"
+
+
+def test_sparse_fields_are_null_filled_and_dropped_again():
+    rows = [{"model_id": "a/x", "ctx_len": 4096}, {"model_id": "a/y"}]
+    table = export_artifacts.encode_table(rows)
+    assert table["columns"]["ctx_len"] == [4096, None]
+    assert export_artifacts.decode_table(table) == rows
+
+
+def test_export_writes_hashed_variants_and_prunes_old_ones(tmp_path):
+    models, skus = sizing.load_inputs()
+    first = export_artifacts.export_catalog(export_artifacts.build_catalog(models, skus), tmp_path)
+    again = export_artifacts.export_catalog(export_artifacts.build_catalog(models, skus), tmp_path)
+    assert again == first
+    files = first["catalog"]["files"]
+    identity = (tmp_path / files["identity"]["path"]).read_bytes()
+    assert gzip.decompress((tmp_path / files["gzip"]["path"]).read_bytes()) == identity
+    assert first["catalog"]["sha256"].startswith(files["identity"]["path"].split(".")[1])
+
+    second = export_artifacts.export_catalog(export_artifacts.build_catalog(models[:3], skus), tmp_path)
+    names = sorted(p.name for p in tmp_path.iterdir())
+    assert names == sorted([*(f["path"] for f in second["catalog"]["files"].values()), "manifest.json"])
+    assert json.loads((tmp_path / "manifest.json").read_text())["tables"] == {"models": 3, "skus": len(skus)}
+
+
+def test_brotli_variant_is_optional(tmp_path, monkeypatch, capsys):
+    monkeypatch.setitem(sys.modules, "brotli", None)
+    manifest = export_artifacts.export_catalog(export_artifacts.build_catalog([], []), tmp_path)
+    assert set(manifest["catalog"]["files"]) == {"identity", "gzip"}
+    assert "brotli is not installed" in capsys.readouterr().err
+
+
+def test_catalog_stays_small_at_100x():
+    models, skus = sizing.load_inputs()
+    scaled = [{**m, "model_id": f"{m['model_id']}-{i}"} for i in range(100) for m in models]
+    catalog = export_artifacts.build_catalog(scaled, skus)
+    columnar = json.dumps(catalog, separators=(",", ":")).encode()
+    rows = json.dumps(scaled, indent=2).encode()
+    assert len(columnar) < len(rows) / 2
+    assert len(gzip.compress(columnar)) < 256 * 1024
+
+
+def test_committed_export_matches_row_files(tmp_path):
+    models, skus = sizing.load_inputs()
+    catalog = export_artifacts.build_catalog(models, skus)
+    assert export_artifacts.check_export(catalog) == []
+    assert "stale" in export_artifacts.check_export(export_artifacts.build_catalog(models[:3], skus))[0]
+    assert export_artifacts.check_export(catalog, tmp_path)[0].startswith("cannot read")
@@ -0,0 +1,59 @@
+import json
+
+import generate_golden_dataset
+import pytest
+from gpu_resolver import GpuResolver
+
+FAMILIES = {
+    "Standard NCASv3_T4 Family": ("T4", 16),
+    "StandardNCADSA100v4Family": ("A100", 40),
+    "StandardNCadsH100v5Family": ("H100", 80),
+    "standard NDAMSv4_A100Family": ("A100", 80),
+    "standardNDSH100v5Family": ("H100", 80),
+    "StandardNVADSA10v5Family": ("A10", 24),
+    "standardNVSv4Family": ("MI25", 16),
+}
+
+
+def test_known_families_resolve_by_family():
+    resolver = GpuResolver.from_file()
+    for family, (model, vram) in FAMILIES.items():
+        spec = resolver.resolve("Standard_X", family).spec
+        assert (spec.gpu_model, spec.vram_gb) == (model, vram)
+
+
+@pytest.mark.parametrize(
+    "name, model, interconnect",
+    [
+        ("Standard_ND96isr_H200_v5", "H200", "NVLink 4"),
+        ("Standard_ND96isr_MI300X_v5", "MI300X", "Infinity Fabric"),
+        ("Standard_ND128isr_NDR_GB200_v6", "GB200", "NVLink 5"),
+    ],
+)
+def test_new_hardware_resolves_by_name(name, model, interconnect):
+    resolution = GpuResolver.from_file().resolve(name, "someNewFamily")
+    fields = resolution.spec.fields()
+    assert (fields["gpu_model"], fields["interconnect"]) == (model, interconnect)
+    assert fields["fp8_tflops"] > fields["fp16_tflops"] > 0
+    assert resolution.docs_url.startswith("https://")
+
+
+def test_rules_must_name_a_known_gpu():
+    with pytest.raises(ValueError, match="unknown GPU"):
+        GpuResolver({"gpus": {}, "rules": [{"name": "x", "gpu": "B300"}]})
+
+
+def test_unresolved_skus_are_reported(tmp_path, monkeypatch, capsys):
+    raw = json.loads(generate_golden_dataset.RAW_FILE.read_text())[:2]
+    raw[1] = {**raw[1], "name": "Standard_NX8_Z9_v1", "family": "standardNXZ9v1Family"}
+    dump = tmp_path / "vms.json"
+    dump.write_text(json.dumps(raw))
+    monkeypatch.setattr(generate_golden_dataset, "INTERMEDIATE_FILE", tmp_path / "parsed_gpus.json")
+    monkeypatch.setattr(generate_golden_dataset, "OUTPUT_FILE", tmp_path / "azure-gpus.json")
+
+    with pytest.raises(SystemExit, match="1 SKUs"):
+        generate_golden_dataset.main([str(dump), "--processes", "1", "--strict"])
+    assert "Standard_NX8_Z9_v1" in capsys.readouterr().err
+    report = json.loads((tmp_path / "azure-gpus.run.json").read_text())
+    assert report["unresolved_skus"] == [{"sku": "Standard_NX8_Z9_v1", "family": "standardNXZ9v1Family"}]
+    assert [g["sku"] for g in json.loads((tmp_path / "azure-gpus.json").read_text())] == [raw[0]["name"]]
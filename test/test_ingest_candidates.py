@@ -0,0 +1,172 @@
+import json
+import time
+
+import ingest_candidates
+from change_feed import (
+    change_feed_path,
+    changes_since,
+    diff_staging,
+    read_feed,
+    save_cursor,
+)
+from hub_stub import HubStub
+from ingest_candidates import Candidate
+
+
+def _source(model_ids, source, score=1.0, delay=0.0):
+    def fetch(deadline=None):
+        time.sleep(delay)
+        return [Candidate(m, m.split("/")[0], None, source, score, [source]) for m in model_ids]
+
+    return fetch
+
+
+def test_sources_run_concurrently_and_merge_in_registry_order(tmp_path, monkeypatch):
+    monkeypatch.setattr(ingest_candidates, "STAGING_FILE", tmp_path / "staging.jsonl")
+    sources = {
+        "a": _source(["org/x", "org/y"], "a", delay=0.2),
+        "b": _source(["org/y"], "b", score=5.0, delay=0.2),
+        "c": _source(["org/z"], "c", delay=0.2),
+    }
+    start = time.monotonic()
+    staged = ingest_candidates.stage_candidates(sources, deadline=5)
+    assert time.monotonic() - start < 0.5
+    assert [(c.model_id, c.source) for c in staged] == [("org/y", "a+b"), ("org/x", "a"), ("org/z", "c")]
+    lines = (tmp_path / "staging.jsonl").read_text().splitlines()
+    assert [json.loads(line)["model_id"] for line in lines] == ["org/y", "org/x", "org/z"]
+
+
+def test_slow_source_is_dropped_at_deadline(tmp_path, monkeypatch, capsys):
+    monkeypatch.setattr(ingest_candidates, "STAGING_FILE", tmp_path / "staging.jsonl")
+    sources = {"fast": _source(["org/x"], "fast"), "slow": _source(["org/y"], "slow", delay=5)}
+    start = time.monotonic()
+    staged = ingest_candidates.stage_candidates(sources, deadline=0.3)
+    assert time.monotonic() - start < 1
+    assert [c.model_id for c in staged] == ["org/x"]
+    assert "Source slow missed the 0.3s deadline; staging is partial" in capsys.readouterr().err
+
+
+def test_failing_source_does_not_block_others(tmp_path, monkeypatch, capsys):
+    monkeypatch.setattr(ingest_candidates, "STAGING_FILE", tmp_path / "staging.jsonl")
+
+    def broken(deadline=None):
+        raise RuntimeError("boom")
+
+    staged = ingest_candidates.stage_candidates({"ok": _source(["org/x"], "ok"), "broken": broken}, deadline=5)
+    assert [c.model_id for c in staged] == ["org/x"]
+    assert "Source broken failed: boom" in capsys.readouterr().err
+
+
+def test_default_registry_holds_builtin_sources():
+    assert list(ingest_candidates.SOURCES) == ["huggingface_hub", "community_rankings", "openrouter_index"]
+
+
+def test_partial_results_from_slow_source_are_kept(tmp_path, monkeypatch):
+    monkeypatch.setattr(ingest_candidates, "STAGING_FILE", tmp_path / "staging.jsonl")
+
+    def trickle(deadline=None):
+        for i in range(1000):
+            yield Candidate(f"org/m{i}", "org", None, "trickle", float(i), [])
+            time.sleep(0.001 if i < 300 else 1)
+
+    staged = ingest_candidates.stage_candidates({"trickle": trickle}, deadline=0.6)
+    assert 256 <= len(staged) < 1000
+
+
+def test_merger_license_precedence_ignores_arrival_order():
+    early = Candidate("org/x", "org", "mit", "a", 1.0, ["t1"])
+    late = Candidate("org/x", "org", "apache-2.0", "b", 2.0, ["t0"])
+    for order in ([(early, 0), (late, 1)], [(late, 1), (early, 0)]):
+        merger = ingest_candidates.CandidateMerger()
+        for candidate, rank in order:
+            merger.add(candidate, rank)
+        [merged] = merger.ranked()
+        assert (merged.license, merged.source, merged.tags, merged.popularity_score) == ("mit", "a+b", ["t0", "t1"], 2.0)
+
+
+def test_top_n_matches_full_ranking_prefix():
+    candidates = [Candidate(f"org/m{i % 50}", "org", None, "s", float(i % 7), []) for i in range(200)]
+    full = ingest_candidates.merge_candidates(candidates)
+    assert ingest_candidates.merge_candidates(candidates, top_n=10) == full[:10]
+
+
+def test_staging_keeps_only_the_top_n(tmp_path, monkeypatch):
+    monkeypatch.setattr(ingest_candidates, "STAGING_FILE", tmp_path / "staging.jsonl")
+    sources = {"a": _source(["org/x"], "a", score=1.0), "b": _source(["org/y"], "b", score=2.0)}
+    ingest_candidates.stage_candidates(sources, top_n=1)
+    assert [row["model_id"] for row in ingest_candidates.read_staging(tmp_path / "staging.jsonl")] == ["org/y"]
+
+
+def test_staging_round_trips_as_jsonl(tmp_path):
+    path = tmp_path / "staging.jsonl"
+    ingest_candidates.write_staging((Candidate(f"org/m{i}", "org", None, "s", 0.0, []) for i in range(3)), path)
+    with path.open("a") as fh:
+        fh.write("not json\n")
+    assert [row["model_id"] for row in ingest_candidates.read_staging(path)] == ["org/m0", "org/m1", "org/m2"]
+
+
+def test_diff_reports_added_removed_and_meaningful_changes():
+    previous = {
+        "org/a": {"model_id": "org/a", "license": None, "popularity_score": 100.0, "tags": ["x"]},
+        "org/b": {"model_id": "org/b", "license": "mit", "popularity_score": 100.0, "tags": ["x"]},
+        "org/c": {"model_id": "org/c", "license": None, "popularity_score": 1.0, "tags": []},
+    }
+    current = [
+        {"model_id": "org/a", "license": None, "popularity_score": 105.0, "tags": ["x"]},  # under the threshold
+        {"model_id": "org/b", "license": "apache-2.0", "popularity_score": 200.0, "tags": ["y"]},
+        {"model_id": "org/d", "license": None, "popularity_score": 1.0, "tags": []},
+    ]
+    assert diff_staging(previous, current) == [
+        {
+            "op": "changed",
+            "model_id": "org/b",
+            "changes": {
+                "popularity_score": [100.0, 200.0],
+                "license": ["mit", "apache-2.0"],
+                "tags": {"added": ["y"], "removed": ["x"]},
+            },
+        },
+        {"op": "added", **current[2]},
+        {"op": "removed", "model_id": "org/c"},
+    ]
+
+
+def test_staging_runs_append_to_the_change_feed(tmp_path, monkeypatch):
+    staging = tmp_path / "staging.jsonl"
+    monkeypatch.setattr(ingest_candidates, "STAGING_FILE", staging)
+    feed, cursor = change_feed_path(staging), tmp_path / "cursor"
+    ingest_candidates.stage_candidates({"a": _source(["org/x", "org/y"], "a")})
+    assert changes_since(feed, cursor, staging) == (None, feed.stat().st_size)
+    save_cursor(cursor, feed.stat().st_size, staging)
+
+    ingest_candidates.stage_candidates({"a": _source(["org/y", "org/z"], "a")})
+    events, _ = read_feed(feed)
+    assert [e["op"] for e in events] == ["run", "added", "added", "run", "added", "removed"]
+    assert changes_since(feed, cursor, staging)[0] == {"org/z"}
+    assert changes_since(feed, cursor, staging, {"row_version": 3})[0] is None
+
+
+def test_builtin_sources_page_through_hub_and_openrouter(monkeypatch):
+    from huggingface_hub import constants
+
+    with HubStub(catalog=2500, openrouter=30) as stub:
+        monkeypatch.setattr(constants, "ENDPOINT", stub.url)
+        monkeypatch.setattr(ingest_candidates, "OPENROUTER_ENDPOINT", stub.url)
+        hub = list(ingest_candidates.fetch_huggingface_hub(limit=None))
+        openrouter = list(ingest_candidates.fetch_openrouter_index(limit=None))
+    assert [c.model_id for c in hub[:2]] == [stub.model_id(0), stub.model_id(1)]
+    assert len(hub) == 2500
+    assert stub.requests["listing"] == 3
+    assert len(openrouter) == 30 and openrouter[0].tags == ["text", "vendor-index"]
+
+
+def test_hub_requests_are_bounded_by_the_deadline(monkeypatch):
+    from huggingface_hub import constants
+
+    with HubStub(catalog=10, latency=2.0) as stub:
+        monkeypatch.setattr(constants, "ENDPOINT", stub.url)
+        started = time.monotonic()
+        hub = list(ingest_candidates.fetch_huggingface_hub(deadline=ingest_candidates.Deadline(0.3)))
+        elapsed = time.monotonic() - started
+    assert hub == []
+    assert elapsed < 1.0
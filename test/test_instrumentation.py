@@ -0,0 +1,67 @@
+import json
+import threading
+
+import instrumentation
+import update_models
+from hub_http import HubClient
+from hub_stub import HubStub
+from test_update_models import CONFIGS, ENTRIES
+
+
+def test_nested_spans_are_reported_as_paths():
+    run = instrumentation.Recorder("test")
+
+    def work():
+        with run.span("worker"):
+            pass
+
+    with run.span("outer"):
+        with run.span("inner"):
+            pass
+        worker = threading.Thread(target=work)
+        worker.start()
+        worker.join()
+    spans = run.report()["spans"]
+    assert [s["name"] for s in spans] == ["outer", "outer/inner", "worker"]
+    assert spans[1]["start_s"] >= spans[0]["start_s"]
+
+
+def test_histogram_percentiles_and_slowest_labels():
+    histogram = instrumentation.Histogram()
+    for i in range(100):
+        histogram.add(i / 100, f"repo-{i}")
+    summary = histogram.summary()
+    assert (summary["count"], summary["p50_s"], summary["p99_s"], summary["max_s"]) == (100, 0.5, 0.99, 0.99)
+    assert [label for label, _ in summary["slowest"]] == ["repo-99", "repo-98", "repo-97", "repo-96", "repo-95"]
+
+
+def test_errors_reach_stderr_and_report(capsys):
+    run = instrumentation.start_run("test")
+    instrumentation.error("Source x failed: boom")
+    assert "Source x failed: boom" in capsys.readouterr().err
+    assert run.report()["errors"] == ["Source x failed: boom"]
+
+
+def test_hub_requests_retries_and_per_repo_latency(tmp_path):
+    run = instrumentation.start_run("test")
+    path = "/org/model-0/resolve/main/config.json"
+    with HubStub(configs=CONFIGS, failures={path: [503]}) as hub:
+        update_models.derive_rows(ENTRIES[:3], HubClient(endpoint=hub.url, backoff=0))
+    report = run.report()
+    assert report["counters"]["http.requests"] == 4
+    assert report["counters"]["http.retries"] == 1
+    assert report["counters"]["http.status.503"] == 1
+    assert report["counters"]["http.bytes"] > 0
+    assert report["histograms"]["repo"]["count"] == 3
+    assert report["histograms"]["http.GET"]["count"] == 4
+
+    written = instrumentation.write_report(tmp_path / "models.json")
+    assert written == tmp_path / "models.run.json"
+    assert json.loads(written.read_text())["run"] == "test"
+
+
+def test_cprofile_hook_wraps_named_stage(tmp_path):
+    run = instrumentation.start_run("test", "cprofile", ("derive",), tmp_path)
+    with run.span("main"), run.span("derive"):
+        sum(range(1000))
+    assert [p.name for p in tmp_path.iterdir()] == ["test.main.derive.prof"]
@@ -0,0 +1,87 @@
+import performance
+import pytest
+from performance import COMPUTE_EFFICIENCY, MEMORY_EFFICIENCY
+
+SKUS = [
+    {"sku": "small", "gpu_model": "X", "gpus_per_vm": 1, "vram_gb": 24, "mem_bw_gbs": 1000, "fp16_tflops": 100, "int8_tops": 200},
+    {"sku": "big", "gpu_model": "Y", "gpus_per_vm": 8, "vram_gb": 80, "mem_bw_gbs": 3000, "fp16_tflops": 1000, "int8_tops": 2000},
+]
+DENSE = {"model_id": "dense", "params_b": 7.0, "layers": 32, "hidden": 4096, "moe_active_ratio": 0.0}
+MOE = {"model_id": "moe", "params_b": 56.0, "layers": 32, "hidden": 4096, "moe_active_ratio": 0.25}
+
+
+def _cell(model, precision="fp16", ctx=4096, batch=1, sku=0):
+    grid = performance.performance_grid([model], SKUS, (precision,), (ctx,), (batch,))
+    return grid.decode_tokens_s[0, 0, 0, 0, sku], grid.ttft_s[0, 0, 0, 0, sku], grid.max_sequences[0, 0, 0, 0, sku]
+
+
+def test_batch_one_decode_is_bandwidth_bound():
+    decode, _, _ = _cell(DENSE)
+    bytes_per_step = 7e9 * 2 + 2 * 32 * 4096 * 4096 * 2
+    assert decode == pytest.approx(1000e9 * MEMORY_EFFICIENCY / bytes_per_step)
+
+
+def test_large_batch_decode_becomes_compute_bound():
+    tiny_kv = {**DENSE, "layers": 1, "hidden": 64}
+    decode, _, _ = _cell(tiny_kv, ctx=1024, batch=1024, sku=1)
+    assert decode == pytest.approx(8 * 1000e12 * COMPUTE_EFFICIENCY / (2 * 7e9))
+
+
+def test_prefill_ttft_scales_with_prompt_compute():
+    _, ttft, _ = _cell(DENSE, ctx=8192)
+    flops = 2 * 7e9 * 8192 + 2 * 32 * 8192 * 8192 * 4096
+    assert ttft == pytest.approx(flops / (100e12 * COMPUTE_EFFICIENCY))
+
+
+def test_moe_uses_active_params_for_compute_and_total_for_memory():
+    dense_56 = {**MOE, "moe_active_ratio": 0.0}
+    moe_decode, moe_ttft, moe_seqs = _cell(MOE, batch=1, sku=1)
+    dense_decode, dense_ttft, dense_seqs = _cell(dense_56, batch=1, sku=1)
+    assert moe_seqs == dense_seqs
+    assert moe_ttft < dense_ttft / 3
+    assert moe_decode > 3 * dense_decode
+
+
+def test_max_sequences_and_non_fitting_cells():
+    _, _, seqs = _cell(DENSE, sku=0)
+    kv_per_seq = 2 * 32 * 4096 * 4096 * 2
+    assert seqs == (24e9 / 1.2 - 14e9) // kv_per_seq
+    decode, ttft, seqs = _cell(DENSE, batch=64, sku=0)
+    assert (decode, ttft) == (0, 0) and seqs < 64
+
+
+def test_ssm_without_kv_cache_has_finite_max_sequences(recwarn):
+    ssm = {**DENSE, "kv_bytes_per_token": 0}
+    decode, _, seqs = _cell(ssm, ctx=32768, sku=1)
+    assert seqs == performance.MAX_SEQUENCES and decode > 0
+    ranked = performance.cheapest_skus(ssm, SKUS, "fp16", 32768, 1, 0.0)
+    assert [r["max_sequences"] for r in ranked] == [performance.MAX_SEQUENCES] * 2
+    assert _cell({**ssm, "params_b": 100.0}, sku=0)[2] == 0
+    assert not [w for w in recwarn if issubclass(w.category, RuntimeWarning)]
+
+
+def test_gqa_cache_admits_more_sequences():
+    gqa = {**DENSE, "kv_bytes_per_token": 2 * 2 * 8 * 128 * 32}
+    _, _, seqs = _cell(gqa, sku=1)
+    assert seqs == (8 * 80e9 / 1.2 - 14e9) // (2 * 8 * 128 * 32 * 2 * 4096)
+    assert seqs > 3 * _cell(DENSE, sku=1)[2]
+
+
+def test_int8_decodes_faster_than_fp16():
+    assert _cell(DENSE, precision="int8")[0] > _cell(DENSE, precision="fp16")[0]
+
+
+def test_cheapest_sku_meeting_throughput():
+    ranked = performance.cheapest_skus(DENSE, SKUS, "fp16", 4096, 1, min_tokens_s=10)
+    assert [r["sku"] for r in ranked] == ["small", "big"]
+    ranked = performance.cheapest_skus(DENSE, SKUS, "fp16", 4096, 1, min_tokens_s=100)
+    assert [r["sku"] for r in ranked] == ["big"]
+    priced = performance.cheapest_skus(DENSE, SKUS, "fp16", 4096, 1, 10, prices={"big": 1.0, "small": 2.0})
+    assert [r["sku"] for r in priced] == ["big", "small"]
+
+
+def test_catalog_grid_covers_every_sku():
+    models, skus = performance.load_inputs()
+    grid = performance.performance_grid(models[:5], skus)
+    assert grid.decode_tokens_s.shape == (5, 5, 9, 7, len(skus))
+    assert (grid.decode_tokens_s >= 0).all() and grid.decode_tokens_s.max() > 0
@@ -0,0 +1,57 @@
+import time
+
+import placement
+import sizing
+
+SKUS = [
+    {"sku": "a10", "gpu_model": "A10", "gpus_per_vm": 2, "vram_gb": 24, "rdma_enabled": False},
+    {"sku": "pcie", "gpu_model": "A100", "gpus_per_vm": 4, "vram_gb": 80, "rdma_enabled": False},
+    {"sku": "ib", "gpu_model": "H100", "gpus_per_vm": 8, "vram_gb": 80, "rdma_enabled": True},
+]
+LLAMA_405B = {"model_id": "405b", "params_b": 405, "layers": 126, "hidden": 16384}
+
+
+def _solve(model, skus=SKUS, precision="fp16", ctx=4096, batch=1, **kwargs):
+    solver = placement.PlacementSolver(skus, **kwargs)
+    return solver.solve(model["params_b"], model["layers"], model["hidden"], ctx, batch, precision)
+
+
+def test_single_vm_fit_matches_estimate_with_sku():
+    small = {"params_b": 7, "layers": 32, "hidden": 4096}
+    p = _solve(small)
+    single = sizing.estimate_with_sku(7, 32, 4096, 4096, 1, "fp16", SKUS)
+    assert (p.sku["sku"], p.nodes, p.tp * p.pp) == (single["sku"]["sku"], 1, single["gpus"])
+
+
+def test_405b_fp16_spans_rdma_vms():
+    assert sizing.estimate_with_sku(405, 126, 16384, 4096, 1, "fp16", SKUS)["sku"] is None
+    p = _solve(LLAMA_405B)
+    assert (p.sku["sku"], p.nodes, p.tp, p.pp, p.rdma) == ("ib", 2, 8, 2, True)
+    assert p.per_gpu_gb <= 80
+    assert p.per_gpu_gb * p.tp * p.pp >= p.total_gb
+
+
+def test_rdma_preferred_over_cheaper_multi_vm_layout():
+    prices = {"pcie": 1.0, "ib": 100.0}
+    assert _solve(LLAMA_405B, prices=prices).sku["sku"] == "ib"
+    no_rdma = [s for s in SKUS if s["sku"] != "ib"]
+    p = _solve(LLAMA_405B, skus=no_rdma, prices=prices)
+    assert (p.sku["sku"], p.nodes, p.rdma) == ("pcie", 4, False)
+
+
+def test_stage_holds_ceil_layers_over_pp():
+    p = _solve(LLAMA_405B)
+    assert p.per_gpu_gb == p.total_gb * -(-126 // p.pp) / 126 / p.tp
+
+
+def test_no_placement_beyond_max_nodes():
+    assert _solve(LLAMA_405B, max_nodes=1) is None
+
+
+def test_catalog_solves_quickly():
+    models, skus = sizing.load_inputs()
+    started = time.perf_counter()
+    placements = placement.solve_catalog(models, skus)
+    assert time.perf_counter() - started < 1.0
+    assert placements["deepseek-ai/DeepSeek-R1"].nodes > 1
+    assert placements["meta-llama/Llama-3.1-405B"].nodes > 1
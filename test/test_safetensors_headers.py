@@ -0,0 +1,99 @@
+import json
+import struct
+
+import update_models
+from hub_http import HubClient
+from hub_stub import DROP, HubStub
+from metadata_cache import MetadataCache
+from safetensors_headers import MAX_HEADER_BYTES, fetch_weight_bytes
+
+WEIGHT_PADDING = 2_000_000
+
+
+def _safetensors(tensors, header_padding=0):
+    """Build a safetensors blob; ``tensors`` maps name -> (dtype, nbytes)."""
+    header, offset = {"__metadata__": {"format": "pt", "pad": "x" * header_padding}}, 0
+    for name, (dtype, nbytes) in tensors.items():
+        header[name] = {"dtype": dtype, "shape": [nbytes], "data_offsets": [offset, offset + nbytes]}
+        offset += nbytes
+    raw = json.dumps(header).encode()
+    return struct.pack("<Q", len(raw)) + raw + b"\0" * (offset + WEIGHT_PADDING)
+
+
+def test_sharded_checkpoint_sums_bytes_per_dtype_with_range_reads():
+    files = {
+        ("org/quant", "model.safetensors.index.json"): json.dumps(
+            {"weight_map": {"a": "model-00001-of-00002.safetensors", "b": "model-00002-of-00002.safetensors"}}
+        ).encode(),
+        ("org/quant", "model-00001-of-00002.safetensors"): _safetensors({"a.qweight": ("I32", 4096), "a.scales": ("F16", 256)}),
+        ("org/quant", "model-00002-of-00002.safetensors"): _safetensors({"b.weight": ("BF16", 1024)}, header_padding=150_000),
+    }
+    with HubStub(files=files) as hub:
+        weight_bytes = fetch_weight_bytes(HubClient(endpoint=hub.url), "org/quant")
+    assert weight_bytes == {"BF16": 1024, "F16": 256, "I32": 4096}
+    shard = "/org/quant/resolve/main/model-00001-of-00002.safetensors"
+    assert hub.bytes_sent[shard] <= 100_000
+    large_header = "/org/quant/resolve/main/model-00002-of-00002.safetensors"
+    assert hub.hits[large_header] == 2
+    assert sum(hub.bytes_sent.values()) < 300_000
+
+
+def test_single_file_checkpoint_without_index():
+    files = {("org/small", "model.safetensors"): _safetensors({"w": ("BF16", 64), "b": ("F32", 8)})}
+    with HubStub(files=files) as hub:
+        assert fetch_weight_bytes(HubClient(endpoint=hub.url), "org/small") == {"BF16": 64, "F32": 8}
+
+
+def test_repo_without_safetensors_yields_none():
+    with HubStub() as hub:
+        assert fetch_weight_bytes(HubClient(endpoint=hub.url), "org/pytorch-only") is None
+
+
+def test_weight_bytes_stage_is_added_to_model_row():
+    entry = {"model_id": "org/small", "params_b": 1.0, "layers": 1, "hidden": 1, "moe_active_ratio": 0.0}
+    files = {("org/small", "model.safetensors"): _safetensors({"w": ("BF16", 64)})}
+    configs = {"org/small": {"num_hidden_layers": 2, "hidden_size": 8, "num_parameters": 32}}
+    with HubStub(configs=configs, files=files) as hub:
+        client = HubClient(endpoint=hub.url)
+        plain = update_models.derive_fields(entry, client)
+        row = update_models.derive_fields(entry, client, weights=True)
+    assert plain.weight_bytes is None
+    assert "weight_bytes" not in plain.model_dump(exclude_none=True)
+    assert row.weight_bytes == {"BF16": 64}
+
+
+def test_oversized_header_length_is_rejected_without_reading_it():
+    blob = struct.pack("<Q", MAX_HEADER_BYTES + 1) + b"{}" + b"\0" * WEIGHT_PADDING
+    with HubStub(files={("org/bad", "model.safetensors"): blob}) as hub:
+        assert fetch_weight_bytes(HubClient(endpoint=hub.url), "org/bad") is None
+    assert hub.hits["/org/bad/resolve/main/model.safetensors"] == 1
+
+
+def test_transient_header_failure_is_retried_and_stage_off_drops_weight_bytes(tmp_path):
+    entry = {"model_id": "org/small", "params_b": 1.0, "layers": 1, "hidden": 1, "moe_active_ratio": 0.0}
+    files = {("org/small", "model.safetensors"): _safetensors({"w": ("BF16", 64)})}
+    configs = {"org/small": {"num_hidden_layers": 2, "hidden_size": 8, "num_parameters": 32}}
+    revision = "a" * 40
+    shard = f"/org/small/resolve/{revision}/model.safetensors"
+    cache = MetadataCache(tmp_path / "metadata.sqlite")
+    with HubStub(configs=configs, files=files, failures={shard: [503]}, revisions={"org/small": revision}) as hub:
+        client = HubClient(endpoint=hub.url, retries=0)
+        failed = update_models.derive_fields(entry, client, cache, weights=True)
+        row = update_models.derive_fields(entry, client, cache, weights=True)
+        plain = update_models.derive_fields(entry, client, cache)
+        again = update_models.derive_fields(entry, client, cache, weights=True)
+    assert failed.weight_bytes is None
+    assert row.weight_bytes == again.weight_bytes == {"BF16": 64}
+    assert plain.weight_bytes is None
+    assert hub.hits[shard] == 2
+
+
+def test_dropped_header_read_keeps_the_config_derived_row():
+    entry = {"model_id": "org/small", "params_b": 1.0, "layers": 1, "hidden": 1, "moe_active_ratio": 0.0}
+    files = {("org/small", "model.safetensors"): _safetensors({"w": ("BF16", 64)})}
+    configs = {"org/small": {"num_hidden_layers": 2, "hidden_size": 8, "num_parameters": 32}}
+    shard = f"/org/small/resolve/{'0' * 40}/model.safetensors"
+    with HubStub(configs=configs, files=files, failures={shard: [DROP]}) as hub:
+        row = update_models.derive_fields(entry, HubClient(endpoint=hub.url, retries=0), weights=True)
+    assert hub.hits[shard] == 1
+    assert (row.layers, row.hidden, row.weight_bytes) == (2, 8, None)
@@ -0,0 +1,107 @@
+import json
+from pathlib import Path
+
+import numpy as np
+import sizing
+
+FIXTURE = Path(__file__).with_name("fixtures") / "sizing-parity.json"
+
+
+def parity_cases(models, skus):
+    """Inputs + expected outputs shared with test/estimator.test.ts."""
+    cases = []
+    windowed = [m for m in models if m.get("sliding_window")][:1]
+    for m in models[::16] + windowed:
+        for precision in sizing.PRECISIONS:
+            for ctx in (4096, 32768, 262144):
+                for batch in (1, 8, 64):
+                    for training in (False, True) if (ctx, batch) == (4096, 1) else (False,):
+                        inputs = {k: m[k] for k in ("params_b", "layers", "hidden")}
+                        inputs.update({k: v for k, v in sizing.kv_inputs(m).items() if v is not None})
+                        inputs.update(ctx=ctx, batch=batch, precision=precision, training=training)
+                        result = sizing.estimate_with_sku(**inputs, skus=skus)
+                        expected = {k: result[k] for k in ("weights_gb", "kv_gb", "total_gb", "gpus")}
+                        expected["sku"] = result["sku"]["sku"] if result["sku"] else None
+                        cases.append({**inputs, "expected": expected})
+    return cases
+
+
+def write_fixture():
+    """Regenerate with ``PYTHONPATH=datapipeline python test/test_sizing.py``."""
+    models, skus = sizing.load_inputs()
+    cases = ",\n".join(json.dumps(case) for case in parity_cases(models, skus))
+    FIXTURE.write_text(f'{{"skus": {json.dumps(skus)},\n"cases": [\n{cases}\n]}}\n')
+
+
+def test_grid_matches_fixture_shared_with_typescript():
+    fixture = json.loads(FIXTURE.read_text())
+    skus = fixture["skus"]
+    for training in (False, True):
+        cases = [c for c in fixture["cases"] if c["training"] is training]
+        for case in cases:
+            model = {"model_id": "m", **{k: v for k, v in case.items() if k not in ("expected", "training")}}
+            grid = sizing.fit_grid([model], skus, (case["precision"],), (case["ctx"],), (case["batch"],), training)
+            sku, gpus = grid.lookup("m", case["precision"], case["ctx"], case["batch"])
+            expected = case["expected"]
+            assert grid.total_gb[0, 0, 0, 0] == expected["total_gb"]
+            assert (sku["sku"] if sku else None, gpus) == (expected["sku"], expected["gpus"])
+
+
+def test_grid_matches_scalar_port_on_catalog():
+    models, skus = sizing.load_inputs()
+    grid = sizing.fit_grid(models, skus)
+    for m_idx, model in enumerate(models):
+        for p_idx, precision in enumerate(grid.precisions):
+            for c_idx, ctx in enumerate(grid.ctx):
+                for b_idx, batch in enumerate(grid.batch):
+                    expected = sizing.estimate_with_sku(
+                        model["params_b"], model["layers"], model["hidden"], ctx, batch, precision, skus,
+                        **sizing.kv_inputs(model),
+                    )
+                    index = grid.sku_index[m_idx, p_idx, c_idx, b_idx]
+                    assert grid.total_gb[m_idx, p_idx, c_idx, b_idx] == expected["total_gb"]
+                    assert (skus[index] if index >= 0 else None) == expected["sku"]
+                    assert grid.gpus[m_idx, p_idx, c_idx, b_idx] == expected["gpus"]
+
+
+def test_equal_vram_keeps_catalog_order_and_blocks_agree(monkeypatch):
+    skus = [
+        {"sku": "wide", "gpus_per_vm": 8, "vram_gb": 80},
+        {"sku": "one", "gpus_per_vm": 1, "vram_gb": 40},
+        {"sku": "also-wide", "gpus_per_vm": 8, "vram_gb": 80},
+    ]
+    models = [{"model_id": f"m{i}", "params_b": float(i), "layers": 32, "hidden": 4096} for i in range(1, 200, 3)]
+    whole = sizing.fit_grid(models, skus)
+    monkeypatch.setattr(sizing, "MODEL_BLOCK", 7)
+    blocked = sizing.fit_grid(models, skus)
+    assert np.array_equal(whole.sku_index, blocked.sku_index)
+    assert np.array_equal(whole.gpus, blocked.gpus)
+    assert set(np.unique(whole.sku_index)) <= {-1, 0, 1}
+
+
+def test_fit_table_is_flat_row_major():
+    models, skus = sizing.load_inputs()
+    grid = sizing.fit_grid(models[:3], skus)
+    table = sizing.fit_table(grid)
+    shape = (3, len(table["precisions"]), len(table["ctx"]), len(table["batch"]))
+    assert len(table["sku_index"]) == np.prod(shape)
+    flat = np.ravel_multi_index((2, 1, 3, 0), shape)
+    assert table["sku_index"][flat] == grid.sku_index[2, 1, 3, 0]
+    assert table["gpus"][flat] == grid.gpus[2, 1, 3, 0]
+
+
+def test_architecture_aware_kv_only_shrinks_catalog_fits():
+    models, skus = sizing.load_inputs()
+    legacy = [{k: v for k, v in m.items() if k not in sizing.KV_FIELDS} for m in models]
+    new, old = sizing.fit_grid(models, skus), sizing.fit_grid(legacy, skus)
+    assert (new.total_gb <= old.total_gb).all()
+    assert not ((old.sku_index >= 0) & (new.sku_index < 0)).any()
+    assert ((new.sku_index >= 0) & (old.sku_index < 0)).sum() > 0
+
+    sku, gpus = new.lookup("meta-llama/Llama-3.3-70B-Instruct", "fp16", 32768, 1)
+    assert (sku["sku"], gpus) == ("Standard_ND96amsr_A100_v4", 3)
+    assert old.lookup("meta-llama/Llama-3.3-70B-Instruct", "fp16", 32768, 1)[1] == 4
+
+
+if __name__ == "__main__":
+    write_fixture()
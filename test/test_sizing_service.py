@@ -0,0 +1,120 @@
+import asyncio
+import json
+import os
+import shutil
+
+import sizing
+from sizing_service import SizingService
+
+
+def _service(tmp_path):
+    for path in (sizing.MODELS_FILE, sizing.SKUS_FILE):
+        shutil.copy(path, tmp_path / path.name)
+    return SizingService(tmp_path / sizing.MODELS_FILE.name, tmp_path / sizing.SKUS_FILE.name, poll_interval=0.01)
+
+
+def test_fits_match_estimate_with_sku_and_are_cached(tmp_path):
+    service = _service(tmp_path)
+    models, skus = sizing.load_inputs()
+    model = models[0]
+    query = {"model": model["model_id"], "precision": "int8", "ctx": 8192, "batch": 4}
+    expected = sizing.estimate_with_sku(
+        model["params_b"], model["layers"], model["hidden"], 8192, 4, "int8", skus, **sizing.kv_inputs(model)
+    )
+
+    status, fit = service.respond("POST", "/fit", json.dumps(query).encode())
+    assert status == 200
+    assert fit["sku"] == (expected["sku"]["sku"] if expected["sku"] else None)
+    assert (fit["gpus"], fit["total_gb"]) == (expected["gpus"], expected["total_gb"])
+
+    status, again = service.respond("GET", "/fit?model={model}&precision=int8&ctx=8192&batch=4".format(**query), b"")
+    assert again is fit
+    assert service.respond("GET", "/health", b"")[1]["cache"]["hits"] == 1
+
+
+def test_batch_reports_errors_per_query(tmp_path):
+    service = _service(tmp_path)
+    model_id = next(iter(service.dataset.models))
+    body = {"queries": [{"model": model_id}, {"model": "nobody/nothing"}, {"model": model_id, "precision": "fp4"}]}
+    status, payload = service.respond("POST", "/fit", json.dumps(body).encode())
+    assert status == 200
+    first, missing, bad = payload["results"]
+    assert first["model"] == model_id and first["ctx"] == 4096
+    assert missing == {"error": "unknown model nobody/nothing"}
+    assert "precision" in bad["error"]
+    assert service.respond("GET", "/fit?model=nobody/nothing", b"")[0] == 404
+    assert service.respond("POST", "/fit", b"{")[0] == 400
+
+
+def test_http_round_trip_and_atomic_reload(tmp_path):
+    service = _service(tmp_path)
+    models_file = service.paths[0]
+
+    async def get(port, path):
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write(f"GET {path} HTTP/1.1\r\nHost: x\r\nConnection: close\r\n\r\n".encode())
+        response = await reader.read()
+        writer.close()
+        head, _, body = response.partition(b"\r\n\r\n")
+        return int(head.split()[1]), json.loads(body)
+
+    async def scenario():
+        server = await service.start(port=0)
+        port = server.sockets[0].getsockname()[1]
+        status, health = await get(port, "/health")
+        assert (status, health["reloads"]) == (200, 0)
+
+        models = json.loads(models_file.read_text())
+        models_file.write_text("[")  # caught mid-write: keep serving the old data
+        assert not await service.reload_if_changed()
+        tmp = models_file.with_suffix(".tmp")
+        tmp.write_text(json.dumps(models[:3]))
+        os.replace(tmp, models_file)
+        for _ in range(200):
+            await asyncio.sleep(0.01)
+            if service.reloads:
+                break
+        status, health = await get(port, "/health")
+        await service.stop()
+        server.close()
+        await server.wait_closed()
+        return health
+
+    health = asyncio.run(scenario())
+    assert (health["models"], health["reloads"]) == (3, 1)
+
+
+def test_bad_rows_answer_500_and_bad_reloads_keep_serving(tmp_path):
+    service = _service(tmp_path)
+    models_file = service.paths[0]
+    model_id = next(iter(service.dataset.models))
+    del service.dataset.models[model_id]["layers"]
+
+    async def scenario():
+        server = await service.start(port=0)
+        port = server.sockets[0].getsockname()[1]
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        responses = []
+        for path in (f"/fit?model={model_id}", "/health"):
+            writer.write(f"GET {path} HTTP/1.1\r\nHost: x\r\n\r\n".encode())
+            status = int((await reader.readline()).split()[1])
+            length = 0
+            while (line := await reader.readline()) != b"\r\n":
+                if line.lower().startswith(b"content-length:"):
+                    length = int(line.split(b":")[1])
+            responses.append((status, json.loads(await reader.readexactly(length))))
+        writer.close()
+
+        models_file.write_text("[1]")
+        assert not await service.reload_if_changed()
+        await asyncio.sleep(0.05)
+        watching = not service._watcher.done()
+        await service.stop()
+        server.close()
+        await server.wait_closed()
+        return responses, watching
+
+    (error, health), watching = asyncio.run(scenario())
+    assert error == (500, {"error": "internal error"})
+    assert health[0] == 200 and watching
+    assert model_id in service.dataset.models
@@ -0,0 +1,55 @@
+import json
+from pathlib import Path
+
+import generate_golden_dataset
+import pytest
+import sku_ingest
+
+FIXTURES = Path(__file__).parent / "fixtures" / "vm_skus"
+
+
+def test_streaming_parser_matches_json_load_across_chunk_boundaries():
+    path = FIXTURES / "eastus.json"
+    expected = json.loads(path.read_text())
+    assert list(sku_ingest.iter_json_array(path, chunk_size=7)) == expected
+    assert list(sku_ingest.iter_json_array(FIXTURES / "westeurope.json")) == []
+
+
+def test_truncated_dump_is_rejected(tmp_path):
+    path = tmp_path / "broken.json"
+    path.write_text((FIXTURES / "eastus.json").read_text()[:-200])
+    with pytest.raises(ValueError, match=r"broken\.json: truncated or malformed JSON array"):
+        list(sku_ingest.iter_json_array(path, chunk_size=64))
+
+
+def test_catalog_is_deduplicated_with_per_region_availability():
+    catalog = sku_ingest.load_catalog(sorted(FIXTURES.glob("*.json")), workers=2)
+    by_name = {sku["name"]: sku for sku in catalog}
+    assert list(by_name) == ["Standard_NC24ads_A100_v4", "Standard_NC4as_T4_v3", "Standard_ND96isr_H100_v5"]
+
+    a100 = by_name["Standard_NC24ads_A100_v4"]
+    assert a100["capabilities"]["GPUs"] == "1"
+    assert a100["regions"] == {
+        "eastus": {"zones": ["1", "3"], "restrictions": []},
+        "swedencentral": {"zones": ["1", "2", "3"], "restrictions": []},
+    }
+    h100 = by_name["Standard_ND96isr_H100_v5"]
+    assert h100["regions"]["swedencentral"] == {"zones": [], "restrictions": ["NotAvailableForSubscription"]}
+    assert sku_ingest.available_regions(h100) == ["eastus"]
+    assert by_name["Standard_NC4as_T4_v3"]["regions"] == {"eastus": {"zones": [], "restrictions": []}}
+
+
+def test_golden_dataset_lists_available_regions(tmp_path, monkeypatch):
+    monkeypatch.setattr(generate_golden_dataset, "DUMP_DIR", FIXTURES)
+    monkeypatch.setattr(generate_golden_dataset, "INTERMEDIATE_FILE", tmp_path / "parsed_gpus.json")
+    monkeypatch.setattr(generate_golden_dataset, "OUTPUT_FILE", tmp_path / "azure-gpus.json")
+    generate_golden_dataset.main(["--processes", "1"])
+
+    golden = json.loads((tmp_path / "azure-gpus.json").read_text())
+    assert {g["sku"]: g["regions"] for g in golden} == {
+        "Standard_NC24ads_A100_v4": ["eastus", "swedencentral"],
+        "Standard_NC4as_T4_v3": ["eastus"],
+        "Standard_ND96isr_H100_v5": ["eastus"],
+    }
+    parsed = json.loads((tmp_path / "parsed_gpus.json").read_text())
+    assert parsed[-1]["availability"]["swedencentral"]["restrictions"] == ["NotAvailableForSubscription"]
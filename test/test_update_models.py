@@ -0,0 +1,321 @@
+import json
+import time
+from functools import partial
+
+import ingest_candidates
+import pytest
+import update_models
+from checkpoint import CheckpointJournal
+from hub_http import HostRateLimiter, HubClient
+from hub_stub import DROP, HubStub
+from ingest_candidates import Candidate
+from metadata_cache import MetadataCache
+
+ENTRIES = [
+    {"model_id": f"org/model-{i}", "params_b": 1.0, "layers": 1, "hidden": 1, "moe_active_ratio": 0.0}
+    for i in range(12)
+]
+CONFIGS = {
+    entry["model_id"]: {"num_hidden_layers": 10 + i, "hidden_size": 256 * (i + 1), "num_parameters": (i + 1) * 1e9}
+    for i, entry in enumerate(ENTRIES)
+}
+
+
+def test_parallel_rows_match_sequential_order():
+    with HubStub(configs=CONFIGS, latency=0.05) as hub:
+        client = HubClient(endpoint=hub.url, backoff=0)
+        sequential = update_models.derive_rows(ENTRIES, client, workers=1)
+        parallel = update_models.derive_rows(ENTRIES, client, workers=6)
+    assert parallel == sequential
+    assert [row.model_id for row in parallel] == [entry["model_id"] for entry in ENTRIES]
+    assert parallel[3].layers == 13
+    assert hub.max_in_flight > 1
+
+
+def test_worker_limit_bounds_concurrency():
+    with HubStub(configs=CONFIGS, latency=0.05) as hub:
+        update_models.derive_rows(ENTRIES, HubClient(endpoint=hub.url), workers=3)
+    assert hub.max_in_flight <= 3
+
+
+def test_retries_on_rate_limit_and_server_errors():
+    path = "/org/model-0/resolve/main/config.json"
+    with HubStub(configs=CONFIGS, failures={path: [429, 503]}) as hub:
+        row = update_models.derive_fields(ENTRIES[0], HubClient(endpoint=hub.url, backoff=0))
+    assert hub.hits[path] == 3
+    assert row.layers == 10
+
+
+def test_gives_up_after_retries_and_keeps_catalog_values(capsys):
+    path = "/org/model-0/resolve/main/config.json"
+    with HubStub(configs=CONFIGS, failures={path: [503] * 5}) as hub:
+        row = update_models.derive_fields(ENTRIES[0], HubClient(endpoint=hub.url, retries=2, backoff=0))
+    assert hub.hits[path] == 3
+    assert row.model_dump(exclude_none=True) == ENTRIES[0]
+    assert "Failed to download org/model-0" in capsys.readouterr().err
+
+
+def test_unreachable_repo_keeps_catalog_values_without_failing_the_refresh(capsys):
+    path = "/org/model-0/resolve/main/config.json"
+    with HubStub(configs=CONFIGS, failures={path: [DROP, DROP]}) as hub:
+        rows = update_models.derive_rows(ENTRIES[:2], HubClient(endpoint=hub.url, retries=1, backoff=0), workers=2)
+    assert hub.hits[path] == 2
+    assert rows[0].model_dump(exclude_none=True) == ENTRIES[0]
+    assert rows[1].layers == 11
+    assert "Failed to download org/model-0" in capsys.readouterr().err
+
+
+def test_gated_repo_falls_back_to_catalog_entry():
+    with HubStub(configs=CONFIGS, gated={"org/model-1"}) as hub:
+        row = update_models.derive_fields(ENTRIES[1], HubClient(endpoint=hub.url))
+    assert row.model_dump(exclude_none=True) == ENTRIES[1]
+
+
+def test_model_info_fills_missing_parameter_count():
+    configs = {"org/model-0": {"num_hidden_layers": 4, "hidden_size": 64}}
+    infos = {"org/model-0": {"safetensors": {"parameters": {"BF16": 7e9}, "total": 7e9}}}
+    with HubStub(configs=configs, infos=infos) as hub:
+        row = update_models.derive_fields(ENTRIES[0], HubClient(endpoint=hub.url))
+    assert hub.hits["/api/models/org/model-0"] == 1
+    assert (row.layers, row.params_b) == (4, 7.0)
+
+
+def test_rate_limiter_spaces_requests_per_host():
+    limiter = HostRateLimiter(rate=20)
+    start = time.monotonic()
+    for _ in range(5):
+        limiter.wait("hub")
+    limiter.wait("other")
+    assert time.monotonic() - start == pytest.approx(0.2, abs=0.08)
+
+
+def test_cache_serves_fresh_entries_without_requests(tmp_path):
+    cache = MetadataCache(tmp_path / "meta.sqlite")
+    with HubStub(configs=CONFIGS) as hub:
+        client = HubClient(endpoint=hub.url)
+        first = update_models.derive_rows(ENTRIES, client, cache=cache)
+        requests = sum(hub.hits.values())
+        second = update_models.derive_rows(ENTRIES, client, cache=cache)
+        assert sum(hub.hits.values()) == requests
+    assert first == second
+    assert (cache.stats.misses, cache.stats.hits) == (len(ENTRIES), len(ENTRIES))
+
+
+def test_stale_entries_revalidate_by_commit_sha(tmp_path):
+    cache = MetadataCache(tmp_path / "meta.sqlite", ttl=0)
+    with HubStub(configs=CONFIGS) as hub:
+        client = HubClient(endpoint=hub.url)
+        update_models.derive_rows(ENTRIES[:2], client, cache=cache)
+        hub.revisions[ENTRIES[1]["model_id"]] = "1" * 40
+        hub.configs[ENTRIES[1]["model_id"]] = {"num_hidden_layers": 99, "hidden_size": 64}
+        rows = update_models.derive_rows(ENTRIES[:2], client, cache=cache)
+    assert hub.methods[("GET", "/org/model-0/resolve/main/config.json")] == 1
+    assert hub.methods[("HEAD", "/org/model-0/resolve/main/config.json")] == 1
+    assert rows[1].layers == 99
+    assert (cache.stats.revalidated, cache.stats.misses) == (1, 3)
+
+
+def test_cache_rederives_row_when_catalog_entry_changes(tmp_path):
+    cache = MetadataCache(tmp_path / "meta.sqlite")
+    entry = {"model_id": "org/model-0", "params_b": 1.0, "layers": 1, "hidden": 1, "moe_active_ratio": 0.3}
+    with HubStub(configs={"org/model-0": {"num_hidden_layers": 4, "hidden_size": 64}}) as hub:
+        client = HubClient(endpoint=hub.url)
+        update_models.derive_fields(entry, client, cache)
+        row = update_models.derive_fields({**entry, "moe_active_ratio": 0.5}, client, cache)
+    assert row.moe_active_ratio == 0.5
+    assert hub.hits["/org/model-0/resolve/main/config.json"] == 1
+
+
+def test_cache_evicts_idle_and_oversized_entries(tmp_path):
+    cache = MetadataCache(tmp_path / "meta.sqlite", max_bytes=200)
+    for i in range(5):
+        cache.put(f"org/model-{i}", "a" * 40, None, {"config": {"pad": "x" * 50}})
+    assert cache.evict() == 3
+    assert cache.get("org/model-0") is None
+    assert cache.get("org/model-4") is not None
+    cache.max_idle = -1
+    assert cache.evict() == 2
+
+
+def _listing_counts(hub):
+    return sum(count for path, count in hub.hits.items() if path.startswith("/api/models?"))
+
+
+def test_bulk_listing_replaces_model_info_calls():
+    configs = {f"org{i % 3}/model-{i}": {"num_hidden_layers": 4, "hidden_size": 64} for i in range(9)}
+    infos = {repo: {"safetensors": {"parameters": {"BF16": 3e9}, "total": 3e9}} for repo in configs}
+    entries = [{**ENTRIES[0], "model_id": repo} for repo in configs]
+    with HubStub(configs=configs, infos=infos, filler=5) as hub:
+        client = HubClient(endpoint=hub.url)
+        per_repo = update_models.derive_rows(entries, client)
+        per_repo_requests = client.request_count
+
+        client = HubClient(endpoint=hub.url)
+        summaries = update_models.prefetch_summaries(list(configs), client, workers=3)
+        bulk = update_models.derive_rows(entries, client, summaries=summaries)
+    assert bulk == per_repo
+    assert {row.params_b for row in bulk} == {3.0}
+    assert per_repo_requests == 2 * len(entries)
+    assert client.request_count == len(entries) + 3
+
+
+def test_bulk_listing_follows_pages_and_falls_back_for_misses(monkeypatch):
+    monkeypatch.setattr(update_models, "LISTING_MAX_PAGES", 2)
+    configs = {"org/model-0": {"num_hidden_layers": 4, "hidden_size": 64}}
+    infos = {"org/model-0": {"safetensors": {"parameters": {"BF16": 3e9}, "total": 3e9}}}
+    with HubStub(configs=configs, infos=infos, filler=2500) as hub:
+        client = HubClient(endpoint=hub.url)
+        summaries = update_models.prefetch_summaries(["org/model-0"], client)
+        row = update_models.derive_fields(ENTRIES[0], client, summary=summaries.get("org/model-0"))
+    assert summaries == {}
+    assert _listing_counts(hub) == 2
+    assert hub.hits["/api/models/org/model-0"] == 1
+    assert row.params_b == 3.0
+
+
+def test_bulk_revision_revalidates_cache_without_head(tmp_path):
+    cache = MetadataCache(tmp_path / "meta.sqlite", ttl=0)
+    with HubStub(configs=CONFIGS) as hub:
+        client = HubClient(endpoint=hub.url)
+        update_models.derive_rows(ENTRIES, client, cache=cache)
+        before = client.request_count
+        summaries = update_models.prefetch_summaries(list(CONFIGS), client)
+        update_models.derive_rows(ENTRIES, client, cache=cache, summaries=summaries)
+    assert client.request_count - before == 1
+    assert cache.stats.revalidated == len(ENTRIES)
+
+
+def _run_main(monkeypatch, tmp_path, hub, *args, staging=None, catalog=ENTRIES):
+    monkeypatch.setattr(update_models, "HubClient", partial(HubClient, endpoint=hub.url))
+    monkeypatch.setattr(update_models, "CATALOG", catalog)
+    monkeypatch.setattr(update_models, "STAGING_FILE", staging or tmp_path / "missing.jsonl")
+    monkeypatch.setattr(update_models, "OUTPUT_FILE", tmp_path / "models.json")
+    update_models.main(["--cache-dir", str(tmp_path / "cache"), "--no-cache", "--no-bulk", *args])
+    return json.loads((tmp_path / "models.json").read_text())
+
+
+def test_interrupted_refresh_resumes_from_journal(tmp_path, monkeypatch):
+    derive_fields = update_models.derive_fields
+
+    def interrupt_at_eight(entry, *args):
+        if entry["model_id"] == "org/model-8":
+            raise KeyboardInterrupt
+        return derive_fields(entry, *args)
+
+    with HubStub(configs=CONFIGS) as hub:
+        with monkeypatch.context() as patch:
+            patch.setattr(update_models, "derive_fields", interrupt_at_eight)
+            with pytest.raises(SystemExit):
+                _run_main(monkeypatch, tmp_path, hub)
+        journal = tmp_path / "cache" / "journal" / "shard-0.jsonl"
+        with journal.open("a") as fh:
+            fh.write('{"model_id": "org/model-9", "inp')
+        rows = _run_main(monkeypatch, tmp_path, hub)
+    assert [row["model_id"] for row in rows] == [entry["model_id"] for entry in ENTRIES]
+    assert rows[3]["layers"] == 13
+    assert all(hub.hits[f"/{e['model_id']}/resolve/main/config.json"] == 1 for e in ENTRIES)
+    assert not journal.exists()
+
+
+def test_changed_entry_is_not_resumed(tmp_path):
+    journal = CheckpointJournal(tmp_path, {"weight_bytes": False})
+    with journal.writer(0) as writer:
+        writer.append("org/model-0", update_models.input_hash(ENTRIES[0]), {"model_id": "org/model-0"})
+    assert journal.load()["org/model-0"][0] != update_models.input_hash({**ENTRIES[0], "layers": 2})
+    assert CheckpointJournal(tmp_path, {"weight_bytes": True}).load() == {}
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_merge_prefers_fresh_rows_over_stale_shards(tmp_path):
+    journal = CheckpointJournal(tmp_path, {"weight_bytes": False})
+    entry = ENTRIES[0]
+    stale = {**entry, "layers": 99}
+    for shard, source in ((2, entry), (10, stale)):
+        with journal.writer(shard) as writer:
+            writer.append(entry["model_id"], update_models.input_hash(source), source)
+    assert [p.name for p in journal._shards()] == ["shard-2.jsonl", "shard-10.jsonl"]
+    assert journal.load()[entry["model_id"]][1]["layers"] == 99
+    [row] = update_models.merge_journal([entry], journal)
+    assert row["layers"] == 1
+    [row] = update_models.merge_journal([{**entry, "layers": 7}], journal, {entry["model_id"]: {**entry, "layers": 7}})
+    assert row["layers"] == 7
+
+
+def test_process_shards_merge_in_catalog_order(tmp_path, monkeypatch):
+    with HubStub(configs=CONFIGS) as hub:
+        sequential = update_models.derive_rows(ENTRIES, HubClient(endpoint=hub.url))
+        rows = _run_main(monkeypatch, tmp_path, hub, "--processes", "3", "--workers", "2")
+    assert rows == [row.model_dump(exclude_none=True) for row in sequential]
+    assert sorted((tmp_path / "cache" / "journal").iterdir()) == []
+
+
+def test_refresh_rederives_only_ids_in_the_change_feed(tmp_path, monkeypatch):
+    staging = tmp_path / "staging.jsonl"
+    monkeypatch.setattr(ingest_candidates, "STAGING_FILE", staging)
+    ids = [entry["model_id"] for entry in ENTRIES]
+
+    def stage(model_ids, tags=()):
+        def fetch(deadline=None):
+            return [Candidate(m, "org", None, "s", 1.0, list(tags) if m == ids[1] else []) for m in model_ids]
+
+        ingest_candidates.stage_candidates({"s": fetch})
+
+    def config_hits():
+        return [hub.hits[f"/{m}/resolve/main/config.json"] for m in ids[:9]]
+
+    with HubStub(configs=CONFIGS) as hub:
+        stage(ids[:8])
+        first = _run_main(monkeypatch, tmp_path, hub, staging=staging, catalog=[])
+        stage(ids[1:9], tags=["new-tag"])  # model-0 removed, model-1 retagged, model-8 added
+        second = _run_main(monkeypatch, tmp_path, hub, staging=staging, catalog=[])
+        assert config_hits() == [1, 2, 1, 1, 1, 1, 1, 1, 1]
+        assert [row["model_id"] for row in second] == ids[1:9]
+        assert second[1:7] == first[2:8]
+
+        staging.write_text(staging.read_text().replace(ids[2], ids[10]))  # edited outside the feed
+        _run_main(monkeypatch, tmp_path, hub, staging=staging, catalog=[])
+        assert config_hits()[1:] == [3, 1, 2, 2, 2, 2, 2, 2]
+        _run_main(monkeypatch, tmp_path, hub, "--full", staging=staging, catalog=[])
+        assert config_hits()[1:] == [4, 1, 3, 3, 3, 3, 3, 3]
+        edited = [{**ENTRIES[3], "model_id": ids[3], "moe_active_ratio": 0.5}]
+        rows = _run_main(monkeypatch, tmp_path, hub, staging=staging, catalog=edited)
+        assert config_hits()[1:] == [5, 1, 4, 4, 4, 4, 4, 4]
+        assert next(row for row in rows if row["model_id"] == ids[3])["moe_active_ratio"] == 0.5
+
+
+def test_kv_fields_follow_attention_architecture():
+    llama = {"num_hidden_layers": 80, "hidden_size": 8192, "num_attention_heads": 64, "num_key_value_heads": 8}
+    assert update_models.kv_fields(llama)["kv_bytes_per_token"] == 2 * 2 * 8 * 128 * 80
+
+    r1 = {**llama, "num_hidden_layers": 61, "num_attention_heads": 128, "num_key_value_heads": 128,
+          "kv_lora_rank": 512, "qk_rope_head_dim": 64, "n_routed_experts": 256, "num_experts_per_tok": 8}
+    mla = update_models.kv_fields(r1)
+    assert mla["kv_bytes_per_token"] == 2 * (512 + 64) * 61
+    assert (mla["head_dim"], mla["num_experts"], mla["num_experts_per_tok"]) == (None, 256, 8)
+
+    gemma = {"model_type": "gemma2", "num_hidden_layers": 46, "hidden_size": 4608, "num_attention_heads": 32,
+             "num_key_value_heads": 16, "head_dim": 128, "sliding_window": 4096}
+    local = update_models.kv_fields(gemma)
+    assert local["kv_bytes_per_token"] == local["kv_window_bytes_per_token"] == 2 * 2 * 16 * 128 * 23
+    assert local["sliding_window"] == 4096
+    assert "sliding_window" not in update_models.kv_fields({**llama, "sliding_window": 4096, "use_sliding_window": False})
+
+    jamba = {**llama, "num_hidden_layers": 32, "attn_layer_period": 8, "attn_layer_offset": 4}
+    assert update_models.kv_fields(jamba)["kv_bytes_per_token"] == 2 * 2 * 8 * 128 * 4
+    assert update_models.kv_fields({"model_type": "mamba2", "num_hidden_layers": 64})["kv_bytes_per_token"] == 0
+    assert "kv_bytes_per_token" not in update_models.kv_fields({"num_hidden_layers": 4})
+
+
+def test_catalog_kv_costs_agree_with_row_layers():
+    # Cross-attention (Llama-3.2-Vision) and Mamba (Jamba) layers hold no KV cache.
+    partial_attention = ("Vision", "Jamba")
+    for row in json.loads(update_models.OUTPUT_FILE.read_text()):
+        heads, head_dim = row.get("num_key_value_heads"), row.get("head_dim")
+        if not (heads and head_dim and row.get("kv_bytes_per_token")):
+            continue
+        per_token = row["kv_bytes_per_token"] + row.get("kv_window_bytes_per_token", 0)
+        attention_layers = per_token / (2 * 2 * heads * head_dim)
+        if any(name in row["model_id"] for name in partial_attention):
+            assert attention_layers < row["layers"], row["model_id"]
+        else:
+            assert attention_layers == row["layers"], row["model_id"]